@@ -5,12 +5,12 @@ from rest_framework.response import Response
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from .serializers import RegisterSerializer
 from users.models import CustomUser
+from notifications.outbox import queue_email
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,7 +35,7 @@ class PasswordResetRequestView(APIView):
             user = CustomUser.objects.get(email=email)
             token = default_token_generator.make_token(user)
             uid = urlsafe_base64_encode(force_bytes(user.pk))
-            send_mail(
+            queue_email(
                 subject="BetAdvisor — Réinitialisation mot de passe",
                 message=(
                     f"Bonjour {user.username},\n\n"
@@ -48,9 +48,8 @@ class PasswordResetRequestView(APIView):
                 ),
                 from_email=settings.DEFAULT_FROM_EMAIL,
                 recipient_list=[email],
-                fail_silently=True,
             )
-            logger.info(f"Password reset email sent to {email}")
+            logger.info(f"Password reset email queued for {email}")
         except CustomUser.DoesNotExist:
             logger.info(f"Password reset requested for non-existent email: {email}")
 
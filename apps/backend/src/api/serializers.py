@@ -1,9 +1,7 @@
 import bleach
-from decimal import Decimal
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Count, Case, When, F, Q, DecimalField, Value
-from bets.models import BetTicket
+from gamification.models import UserGlobalStats, UserProfileStats
 
 User = get_user_model()
 
@@ -28,9 +26,44 @@ def validate_image_size(image):
     return image
 
 
+# Relations UserProfileSerializer reads; select_related them to serve a profile in one query.
+PROFILE_RELATED = ('profile_stats', 'global_stats', 'tipster_profile')
+
+
+class UserProfileListSerializer(serializers.ListSerializer):
+    """
+    many=True for UserProfileSerializer: loads what the page needs in bulk
+    (profile relations not already select_related, and the viewer's follows
+    among these users) so a page costs the same number of queries for 1 or
+    50 users.
+    """
+
+    def to_representation(self, data):
+        from django.db.models import prefetch_related_objects
+        from social.models import Follow
+
+        users = list(data.all() if hasattr(data, 'all') else data)
+        missing = [
+            name for name in PROFILE_RELATED
+            if users and not User._meta.get_field(name).is_cached(users[0])
+        ]
+        if missing:
+            prefetch_related_objects(users, *missing)
+
+        request = self.context.get('request')
+        followed_ids = set()
+        if users and request and request.user.is_authenticated:
+            followed_ids = set(
+                Follow.objects.filter(follower=request.user, followed__in=users).order_by().values_list('followed_id', flat=True)
+            )
+        self.child.context['followed_ids'] = followed_ids
+        return super().to_representation(users)
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     stats = serializers.SerializerMethodField()
     avatar_url = serializers.SerializerMethodField()
+    avatar_urls = serializers.SerializerMethodField()
     bio = serializers.CharField(read_only=True, default='')
     follower_count = serializers.SerializerMethodField()
     is_followed_by_me = serializers.SerializerMethodField()
@@ -43,53 +76,43 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = User
         fields = [
             'id', 'username', 'email', 'bio', 'stats',
-            'avatar_url', 'follower_count', 'is_followed_by_me',
+            'avatar_url', 'avatar_urls', 'follower_count', 'is_followed_by_me',
             'is_tipster', 'subscription_price', 'sport_stats',
             'badges', 'halo_color',
         ]
+        list_serializer_class = UserProfileListSerializer
 
     def get_avatar_url(self, obj):
         return obj.avatar_url
 
+    def get_avatar_urls(self, obj):
+        return obj.avatar_urls
+
     def get_subscription_price(self, obj):
         """Return tipster's subscription price if applicable."""
         if hasattr(obj, 'tipster_profile'):
             return str(obj.tipster_profile.subscription_price)
         return None
 
-    def get_stats(self, obj):
-        """Calcul dynamique des Unit Economics (ROI, Winrate) via DB aggregations."""
-        agg = BetTicket.objects.filter(author=obj).exclude(status='PENDING').aggregate(
-            total_bets=Count('id'),
-            wins=Count('id', filter=Q(status='WON')),
-            total_stake=Sum('stake'),
-            won_revenue=Sum(
-                Case(
-                    When(status='WON', then=F('stake') * F('odds') - F('stake')),
-                    default=Value(Decimal('0.00')),
-                    output_field=DecimalField(),
-                )
-            ),
-            lost_stakes=Sum(
-                Case(
-                    When(status='LOST', then=F('stake')),
-                    default=Value(Decimal('0.00')),
-                    output_field=DecimalField(),
-                )
-            ),
-        )
+    @staticmethod
+    def _profile_stats(obj):
+        """UserProfileStats row (select_related by the views), or None before any activity."""
+        try:
+            return obj.profile_stats
+        except UserProfileStats.DoesNotExist:
+            return None
 
-        total_bets = agg['total_bets'] or 0
+    def get_stats(self, obj):
+        """Unit Economics (ROI, Winrate) from the maintained UserProfileStats row."""
+        profile_stats = self._profile_stats(obj)
+        total_bets = profile_stats.settled_bets if profile_stats else 0
         if total_bets == 0:
             return {"roi": 0, "win_rate": 0, "total_bets": 0, "total_profit": 0}
 
-        wins = agg['wins'] or 0
-        win_rate = (wins / total_bets) * 100
+        win_rate = (profile_stats.wins / total_bets) * 100
 
-        won_revenue = agg['won_revenue'] or Decimal('0.00')
-        lost_stakes = agg['lost_stakes'] or Decimal('0.00')
-        net_profit = won_revenue - lost_stakes
-        total_stake = agg['total_stake'] or Decimal('0.00')
+        net_profit = profile_stats.won_revenue - profile_stats.lost_stakes
+        total_stake = profile_stats.total_stake
 
         roi = (float(net_profit) / float(total_stake) * 100) if total_stake > 0 else 0
 
@@ -102,43 +125,29 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     def get_follower_count(self, obj):
         """Count of users following this profile"""
-        return obj.followers.count()
+        profile_stats = self._profile_stats(obj)
+        return profile_stats.follower_count if profile_stats else 0
 
     def get_is_followed_by_me(self, obj):
         """Check if the current user follows this profile"""
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
+        followed_ids = self.context.get('followed_ids')
+        if followed_ids is not None:
+            # Loaded in one query by UserProfileListSerializer.
+            return obj.pk in followed_ids
+        # Self-follow is not allowed, no need to ask the database.
+        if request and request.user.is_authenticated and request.user.pk != obj.pk:
             from social.models import Follow
             return Follow.objects.filter(follower=request.user, followed=obj).exists()
         return False
 
     def get_sport_stats(self, obj):
-        try:
-            from gamification.models import UserSportStats
-            stats = UserSportStats.objects.filter(user=obj).select_related('sport')
-            return [{
-                'sport': s.sport.name,
-                'total_bets': s.total_bets,
-                'wins': s.wins,
-                'winrate': round(s.winrate, 1),
-                'roi': round(float(s.roi), 1),
-            } for s in stats]
-        except Exception:
-            return []
+        profile_stats = self._profile_stats(obj)
+        return profile_stats.sport_stats if profile_stats else []
 
     def get_badges(self, obj):
-        try:
-            from gamification.models import UserBadge
-            badges = UserBadge.objects.filter(user=obj).only(
-                'badge_name', 'description', 'awarded_at'
-            ).order_by('-awarded_at')
-            return [{
-                'badge_name': b.badge_name,
-                'description': b.description,
-                'awarded_at': b.awarded_at.isoformat() if b.awarded_at else None,
-            } for b in badges]
-        except Exception:
-            return []
+        profile_stats = self._profile_stats(obj)
+        return profile_stats.badges if profile_stats else []
 
     def get_halo_color(self, obj):
         try:
@@ -147,6 +156,38 @@ class UserProfileSerializer(serializers.ModelSerializer):
             return 'none'
 
 
+class UserSearchSerializer(serializers.ModelSerializer):
+    """Slim result row for GET /api/users/search/ (no per-viewer fields, so results can be cached)."""
+    avatar_url = serializers.SerializerMethodField()
+    is_verified = serializers.SerializerMethodField()
+    reputation_score = serializers.SerializerMethodField()
+    halo_color = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'avatar_url', 'is_tipster', 'is_verified', 'reputation_score', 'halo_color']
+
+    def get_avatar_url(self, obj):
+        return obj.avatar_variant_url('small')
+
+    def get_is_verified(self, obj):
+        return obj.is_tipster and obj.tipster_profile.is_verified
+
+    def _global_stats(self, obj):
+        try:
+            return obj.global_stats
+        except UserGlobalStats.DoesNotExist:
+            return None
+
+    def get_reputation_score(self, obj):
+        stats = self._global_stats(obj)
+        return stats.reputation_score if stats else 0
+
+    def get_halo_color(self, obj):
+        stats = self._global_stats(obj)
+        return stats.profile_halo_color if stats else 'none'
+
+
 class ProfileUpdateSerializer(serializers.ModelSerializer):
     """Serializer for PUT /api/me/profile/ — avatar + bio update."""
 
@@ -1,8 +1,15 @@
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework import status
 from bets.models import BetTicket
+from social.models import Follow
+from gamification.models import UserGlobalStats
+from users.models import TipsterProfile
+from api.serializers import UserProfileSerializer
 from decimal import Decimal
 
 User = get_user_model()
@@ -61,3 +68,100 @@ class ApiTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         # Should verify list length, etc.
         self.assertTrue(len(response.data['results']) >= 2)
+
+
+class UserProfileListSerializerTests(TestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username='viewer', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.viewer)
+
+    def _create_tipsters(self, count, start=0):
+        tipsters = []
+        for i in range(start, start + count):
+            tipster = User.objects.create_user(username=f'tipster{i:02d}', password='password')
+            bet = BetTicket.objects.create(author=tipster, match_title='A vs B', selection='A', odds=Decimal('2.00'), stake=Decimal('10.00'))
+            bet.settle('WON' if i % 2 else 'LOST')
+            if i % 3 == 0:
+                Follow.objects.create(follower=self.viewer, followed=tipster)
+            tipsters.append(tipster)
+        return tipsters
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_independent_of_page_size(self):
+        self._create_tipsters(3)
+        small = self._count_queries('/api/users/?search=tipster')
+        self._create_tipsters(7, start=3)
+        self.assertEqual(self._count_queries('/api/users/?search=tipster'), small)
+
+    def test_list_matches_single_profile(self):
+        tipsters = self._create_tipsters(4)
+        listed = {u['id']: u for u in self.client.get('/api/users/?search=tipster').json()['results']}
+        for tipster in tipsters:
+            self.assertEqual(listed[str(tipster.pk)], self.client.get(f'/api/users/{tipster.pk}/').json())
+        self.assertTrue(listed[str(tipsters[0].pk)]['is_followed_by_me'])
+        self.assertFalse(listed[str(tipsters[1].pk)]['is_followed_by_me'])
+
+    def test_plain_list_without_select_related(self):
+        tipsters = self._create_tipsters(2)
+        request = APIRequestFactory().get('/')
+        request.user = self.viewer
+        # Users, then one query per relation and one for the viewer's follows.
+        with self.assertNumQueries(5):
+            data = UserProfileSerializer(User.objects.filter(pk__in=[t.pk for t in tipsters]), many=True, context={'request': request}).data
+        self.assertEqual(sorted(u['stats']['total_bets'] for u in data), [1, 1])
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.viewer = User.objects.create_user(username='viewer', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.viewer)
+
+    def _create_user(self, username, reputation=None, bio='', tipster_bio=None):
+        user = User.objects.create_user(username=username, password='password', bio=bio)
+        if reputation is not None:
+            UserGlobalStats.objects.update_or_create(user=user, defaults={'reputation_score': reputation})
+        if tipster_bio is not None:
+            TipsterProfile.objects.create(user=user, bio=tipster_bio, is_verified=True)
+        return user
+
+    def _search(self, q):
+        response = self.client.get('/api/users/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ranks_username_match_then_reputation(self):
+        self._create_user('kingbet', reputation=50)
+        self._create_user('the_kingbet_fan', reputation=90)
+        self._create_user('kingbetter', reputation=80)
+        self._create_user('nobody', bio='I follow kingbet every day')
+        self.assertEqual(
+            [u['username'] for u in self._search('kingbet')],
+            ['kingbet', 'kingbetter', 'the_kingbet_fan', 'nobody'],
+        )
+
+    def test_matches_tipster_bio_with_slim_payload(self):
+        self._create_user('tennis_pro', reputation=85, tipster_bio='Tennis ATP value bets')
+        results = self._search('atp value')
+        self.assertEqual(len(results), 1)
+        self.assertEqual(set(results[0]), {'id', 'username', 'avatar_url', 'is_tipster', 'is_verified', 'reputation_score', 'halo_color'})
+        self.assertTrue(results[0]['is_tipster'])
+        self.assertTrue(results[0]['is_verified'])
+        self.assertEqual(results[0]['reputation_score'], 85)
+
+    def test_short_prefix_is_cached(self):
+        self._create_user('alpha')
+        self._create_user('Alpine')
+        self.assertEqual(len(self._search('al')), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self._search('AL')), 2)
+
+    def test_empty_query(self):
+        self.assertEqual(self._search('  '), [])
@@ -4,14 +4,17 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.decorators import action
 from django_filters.rest_framework import DjangoFilterBackend
+from django.contrib.auth import get_user_model
 
 from bets.models import BetTicket
 from bets.serializers import BetTicketSerializer, BetCreateSerializer, BetSettleSerializer
-from .serializers import UserProfileSerializer, ProfileUpdateSerializer
+from core.conditional import conditional_response, latest, namespace_marker
+from .serializers import PROFILE_RELATED, UserProfileSerializer, ProfileUpdateSerializer
 
 import logging
 
 logger = logging.getLogger(__name__)
+User = get_user_model()
 
 
 class BetViewSet(viewsets.ModelViewSet):
@@ -35,6 +38,14 @@ class BetViewSet(viewsets.ModelViewSet):
         # On attache automatiquement l'auteur au ticket créé
         serializer.save(author=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        # Feed polled by the app: 304 until a bet, like, comment or subscription changes.
+        return conditional_response(
+            request,
+            version=namespace_marker('feed'),
+            build=lambda: super(BetViewSet, self).list(request, *args, **kwargs),
+        )
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def settle(self, request, pk=None):
         """Settle a bet (only by the author). POST /api/bets/{id}/settle/ {outcome: WON|LOST|VOID}"""
@@ -94,8 +105,21 @@ class MyProfileView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        serializer = UserProfileSerializer(request.user, context={'request': request})
-        return Response(serializer.data)
+        user = User.objects.select_related(*PROFILE_RELATED).get(pk=request.user.pk)
+        related = [getattr(user, name, None) for name in ('profile_stats', 'global_stats')]
+        tipster_profile = getattr(user, 'tipster_profile', None)
+        # The related rows are already loaded: the marker costs no extra query.
+        version = (
+            user.modified,
+            *(row.modified if row else None for row in related),
+            str(tipster_profile.subscription_price) if tipster_profile else None,
+        )
+        return conditional_response(
+            request,
+            version=version,
+            last_modified=latest(user.modified, *(row.modified for row in related if row)),
+            build=lambda: Response(UserProfileSerializer(user, context={'request': request}).data),
+        )
 
 
 class MyProfileUpdateView(APIView):
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import BetTicket
-from .prediction_models import Prediction
+from .prediction_models import FixtureCheck, Prediction
 
 @admin.register(BetTicket)
 class BetTicketAdmin(admin.ModelAdmin):
@@ -14,9 +14,21 @@ class BetTicketAdmin(admin.ModelAdmin):
 
 @admin.register(Prediction)
 class PredictionAdmin(admin.ModelAdmin):
-    list_display = ('match_title', 'sport', 'prediction_type', 'prediction_value', 'outcome', 'api_fixture_id', 'resolved_at')
-    list_filter = ('sport', 'prediction_type', 'outcome')
-    search_fields = ('match_title', 'prediction_value')
-    readonly_fields = ('resolved_at', 'actual_result', 'created', 'modified')
+    list_display = ('match_title', 'sport', 'prediction_type', 'prediction_value', 'market_side', 'outcome', 'api_fixture_id', 'resolved_at')
+    list_filter = ('sport', 'prediction_type', 'outcome', 'market_side')
+    search_fields = ('match_title', 'prediction_value', 'market_error')
+    readonly_fields = ('resolved_at', 'actual_result', 'created', 'modified', *Prediction.MARKET_FIELDS)
     raw_id_fields = ('bet_ticket',)
     date_hierarchy = 'created'
+
+    def save_model(self, request, obj, form, change):
+        # prediction_value or the type may have been edited.
+        obj.parse_market()
+        super().save_model(request, obj, form, change)
+
+@admin.register(FixtureCheck)
+class FixtureCheckAdmin(admin.ModelAdmin):
+    list_display = ('api_fixture_id', 'sport', 'kickoff', 'next_check_at', 'attempts', 'last_status', 'last_checked_at', 'leased_by')
+    list_filter = ('sport', 'last_status')
+    search_fields = ('api_fixture_id',)
+    ordering = ('next_check_at',)
@@ -0,0 +1,199 @@
+"""
+Deterministic stand-in for API-Sports / API-Tennis, for offline settlement
+load tests.
+
+`FakeSportsAPI` is a plain WSGI app serving the endpoints `bets.sports_api`
+calls, under one path prefix per sport (matching API_SPORTS_BASE_URL):
+
+    /football/fixtures?id=…|date=…      /football/fixtures/events?fixture=…
+    /tennis/games?id=…|date=…           /<sport>/games?id=…|date=…
+    /_stats                             request counters since start
+
+Every fixture is derived from (seed, sport, id), so the same id always has the
+same teams, status and score. Latency, random 500s and a per-key requests per
+minute limit (HTTP 429 + Retry-After) are configurable. Run it with
+`manage.py fake_sports_api`.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qs
+
+from bets.sports_api import API_SPORTS_HOSTS
+
+SPORTS = {sport.lower(): sport for sport in API_SPORTS_HOSTS} | {'tennis': 'TENNIS'}
+
+TEAMS = {
+    'FOOTBALL': ['PSG', 'Marseille', 'Lyon', 'Monaco', 'Real Madrid', 'Barcelona', 'Liverpool', 'Man City', 'Bayern Munich', 'Inter'],
+    'TENNIS': ['Djokovic', 'Alcaraz', 'Sinner', 'Medvedev', 'Zverev', 'Rune', 'Swiatek', 'Sabalenka'],
+    'BASKETBALL': ['Lakers', 'Celtics', 'Warriors', 'Bucks', 'Heat', 'Nuggets', 'Suns', 'Knicks'],
+}
+DEFAULT_TEAMS = ['Home Club', 'Away Club', 'United', 'City', 'Athletic', 'Rovers']
+PLAYERS = ['Mbappé', 'Haaland', 'Kane', 'Salah', 'Vinicius', 'Lewandowski', 'Dembélé', 'Griezmann']
+
+# Points scored per side in a finished game, by sport.
+SCORE_RANGES = {
+    'FOOTBALL': (0, 4), 'HOCKEY': (0, 6), 'HANDBALL': (20, 35), 'BASKETBALL': (85, 130),
+    'VOLLEYBALL': (0, 3), 'RUGBY': (5, 40), 'BASEBALL': (0, 9),
+}
+
+
+@dataclass
+class FakeAPIConfig:
+    seed: int = 0
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    # Requests per minute per API key; 0 disables the limit.
+    rate_limit: int = 0
+    finished_ratio: float = 0.8
+    cancelled_ratio: float = 0.02
+    fixtures_per_day: int = 50
+
+
+class FakeSportsAPI:
+    def __init__(self, config=None):
+        self.config = config or FakeAPIConfig()
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    # ─── Generated data ─────────────────────────────────────
+    def _rng(self, sport, fixture_id):
+        return random.Random(f"{self.config.seed}:{sport}:{fixture_id}")
+
+    def fixture(self, sport, fixture_id, day=None):
+        """The fixture `fixture_id` of `sport`, in the API's response shape."""
+        rng = self._rng(sport, fixture_id)
+        home, away = rng.sample(TEAMS.get(sport, DEFAULT_TEAMS), 2)
+        day = day or date(2026, 1, 1) + timedelta(days=rng.randrange(365))
+        kickoff = datetime(day.year, day.month, day.day, rng.randrange(12, 22), tzinfo=timezone.utc)
+
+        roll = rng.random()
+        if roll < self.config.cancelled_ratio:
+            status = 'PST'
+        elif roll < self.config.cancelled_ratio + self.config.finished_ratio:
+            status = 'FT'
+        else:
+            status = 'NS'
+
+        low, high = SCORE_RANGES.get(sport, (0, 3))
+        score = (rng.randint(low, high), rng.randint(low, high)) if status == 'FT' else (None, None)
+        if sport == 'TENNIS' and status == 'FT':
+            winner_sets = 2 if rng.random() < 0.8 else 3
+            loser_sets = rng.randint(0, winner_sets - 1)
+            score = (winner_sets, loser_sets) if rng.random() < 0.5 else (loser_sets, winner_sets)
+
+        teams = {'home': {'id': rng.randrange(1, 5000), 'name': home}, 'away': {'id': rng.randrange(1, 5000), 'name': away}}
+        if sport == 'FOOTBALL':
+            return {
+                'fixture': {'id': fixture_id, 'date': kickoff.isoformat(), 'status': {'short': status}},
+                'league': {'id': 61, 'name': 'Fake League'},
+                'teams': teams,
+                'goals': {'home': score[0], 'away': score[1]},
+            }
+        game = {'id': fixture_id, 'date': kickoff.isoformat(), 'status': {'short': status}, 'teams': teams}
+        if sport == 'TENNIS':
+            game['scores'] = {'home': score[0], 'away': score[1]}
+            game['periods'] = {}
+        else:
+            game['scores'] = {'home': {'total': score[0]}, 'away': {'total': score[1]}}
+        return game
+
+    def events(self, fixture_id):
+        """Goal events of a football fixture, consistent with its score."""
+        fixture = self.fixture('FOOTBALL', fixture_id)
+        rng = self._rng('FOOTBALL-events', fixture_id)
+        events = []
+        for side in ('home', 'away'):
+            for _ in range(fixture['goals'][side] or 0):
+                events.append({
+                    'time': {'elapsed': rng.randint(1, 90)},
+                    'team': {'name': fixture['teams'][side]['name']},
+                    'player': {'name': rng.choice(PLAYERS)},
+                    'type': 'Goal',
+                    'detail': 'Normal Goal',
+                })
+        return sorted(events, key=lambda event: event['time']['elapsed'])
+
+    def fixtures_on(self, sport, day):
+        base = int(day.strftime('%Y%m%d')) * 1000
+        return [self.fixture(sport, base + i, day=day) for i in range(self.config.fixtures_per_day)]
+
+    # ─── WSGI ───────────────────────────────────────────────
+    def _rate_limited(self, key):
+        """Seconds to wait if `key` is over its per-minute limit, else 0."""
+        if not self.config.rate_limit:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.setdefault(key, deque())
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self.config.rate_limit:
+                return max(1, math.ceil(60 - (now - window[0])))
+            window.append(now)
+        return 0
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _query(self, sport, endpoint, params):
+        if endpoint == 'fixtures/events' and sport == 'FOOTBALL':
+            return self.events(int(params['fixture']))
+        if endpoint == ('fixtures' if sport == 'FOOTBALL' else 'games'):
+            if 'id' in params:
+                return [self.fixture(sport, int(params['id']))]
+            if 'date' in params:
+                return self.fixtures_on(sport, date.fromisoformat(params['date']))
+        return None
+
+    def __call__(self, environ, start_response):
+        def respond(status, body, headers=()):
+            start_response(status, [('Content-Type', 'application/json'), *headers])
+            return [json.dumps(body).encode()]
+
+        path = environ.get('PATH_INFO', '').strip('/')
+        if path == '_stats':
+            with self._lock:
+                return respond('200 OK', dict(self.stats))
+
+        self._count('requests')
+        if self.config.latency_ms or self.config.jitter_ms:
+            time.sleep(max(0.0, random.gauss(self.config.latency_ms, self.config.jitter_ms)) / 1000)
+
+        retry_after = self._rate_limited(environ.get('HTTP_X_APISPORTS_KEY', ''))
+        if retry_after:
+            self._count('rate_limited')
+            return respond('429 Too Many Requests', {'message': 'Too many requests'}, [('Retry-After', str(retry_after))])
+
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            self._count('errors')
+            return respond('500 Internal Server Error', {'message': 'Simulated upstream error'})
+
+        sport_slug, _, endpoint = path.partition('/')
+        params = {key: values[0] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+        sport = SPORTS.get(sport_slug)
+        try:
+            response = self._query(sport, endpoint, params) if sport else None
+        except (KeyError, ValueError) as e:
+            self._count('bad_requests')
+            return respond('200 OK', {'get': endpoint, 'parameters': params, 'errors': {'parameters': str(e)}, 'results': 0, 'response': []})
+        if response is None:
+            self._count('not_found')
+            return respond('404 Not Found', {'message': f"Unknown endpoint: /{path}"})
+
+        self._count('ok')
+        return respond('200 OK', {
+            'get': endpoint,
+            'parameters': params,
+            'errors': [],
+            'results': len(response),
+            'response': response,
+        })
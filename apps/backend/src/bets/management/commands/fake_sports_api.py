@@ -0,0 +1,72 @@
+"""
+Serve the deterministic fake API-Sports server (bets.fake_sports_api) locally,
+so settlement can be load-tested without network access or API quota.
+
+Usage:
+    python manage.py fake_sports_api --port 8089
+    python manage.py fake_sports_api --latency-ms 150 --jitter-ms 50 --error-rate 0.02 --rate-limit 300
+
+Then point the app at it:
+    API_SPORTS_BASE_URL=http://127.0.0.1:8089 API_SPORTS_KEY=fake python manage.py settle_predictions
+
+GET /_stats returns request / 429 / error counters.
+"""
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.management.base import BaseCommand
+
+from bets.fake_sports_api import FakeAPIConfig, FakeSportsAPI
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake API-Sports server with configurable latency, errors and rate limits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8089)
+        parser.add_argument('--seed', type=int, default=0, help='Same seed, same fixtures and scores.')
+        parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean response latency.')
+        parser.add_argument('--jitter-ms', type=float, default=0.0, help='Standard deviation of the latency.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with HTTP 500.')
+        parser.add_argument('--rate-limit', type=int, default=0, help='Requests per minute per API key before HTTP 429 (0 = unlimited).')
+        parser.add_argument('--finished-ratio', type=float, default=0.8, help='Share of fixtures that are finished (FT).')
+        parser.add_argument('--cancelled-ratio', type=float, default=0.02, help='Share of fixtures that are postponed.')
+        parser.add_argument('--fixtures-per-day', type=int, default=50)
+        parser.add_argument('--verbose', action='store_true', help='Log every request.')
+
+    def handle(self, *args, **options):
+        config = FakeAPIConfig(
+            seed=options['seed'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit=options['rate_limit'],
+            finished_ratio=options['finished_ratio'],
+            cancelled_ratio=options['cancelled_ratio'],
+            fixtures_per_day=options['fixtures_per_day'],
+        )
+        app = FakeSportsAPI(config)
+        handler = WSGIRequestHandler if options['verbose'] else QuietHandler
+        server = make_server(options['host'], options['port'], app, server_class=ThreadingWSGIServer, handler_class=handler)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Fake sports API on http://{options['host']}:{options['port']} — "
+            f"export API_SPORTS_BASE_URL=http://{options['host']}:{options['port']}"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Stats: {dict(app.stats)}")
@@ -1,20 +1,37 @@
 """
-Adaptive settlement cron — runs every 10 minutes.
-Only queries APIs for sports that have PENDING predictions.
+Kickoff-aware settlement — checks only fixtures that should be over.
 
-Usage:
-    python manage.py settle_predictions
+Fixtures with PENDING predictions are queued in FixtureCheck with their
+expected end (bets/scheduling.py); each run fetches the due ones, settles the
+finished or cancelled ones and re-schedules the others with backoff.
+
+Pending predictions of the due fixtures are streamed in (sport, fixture)
+order (`.iterator()`, backed by a partial index on PENDING rows) and settled
+one fixture at a time: each group is resolved and written before the next
+one is read, so memory does not grow with the backlog. Predictions are
+scored from their stored markets, the whole fixture at once
+(bets/markets.py).
 
-Cron setup (every 10 min):
-    */10 * * * * cd /app && python manage.py settle_predictions
+Several workers (containers, nodes) can run at once: each leases the due
+fixtures it takes, so they settle disjoint fixtures and a crashed worker's
+fixtures are taken over once its leases expire (see bets/scheduling.py).
+
+Usage:
+    python manage.py settle_predictions               # due fixtures, then exit
+    python manage.py settle_predictions --loop        # run forever (worker container)
 """
 import logging
-from collections import defaultdict
-from datetime import timedelta
+import os
+import socket
+import time
+from itertools import groupby
 
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections, transaction
 from django.utils import timezone
 
+from bets import scheduling
+from bets.markets import evaluate_markets
 from bets.prediction_models import Prediction
 from bets.sports_api import (
     get_football_fixture,
@@ -23,140 +40,218 @@ from bets.sports_api import (
     get_fixture_by_sport,
     is_match_finished,
     is_match_cancelled,
+    extract_kickoff,
     extract_score,
-    verify_prediction,
     SportsAPIError,
+    SportsAPIRateLimited,
 )
 
 logger = logging.getLogger(__name__)
 
+RESOLVED_FIELDS = ['outcome', 'actual_result', 'resolved_at', 'modified', *Prediction.MARKET_FIELDS]
+
 
 class Command(BaseCommand):
-    help = 'Settle pending predictions by checking sports API results (adaptive cron).'
+    help = 'Settle pending predictions whose fixtures are due (kickoff-aware schedule).'
 
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
             action='store_true',
-            help='Print what would be settled without saving.',
+            help='Print what would be settled without saving (the queue is still updated).',
         )
+        parser.add_argument('--loop', action='store_true', help='Keep settling due fixtures.')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between runs.')
+        parser.add_argument('--limit', type=int, default=200, help='Most fixtures checked per run.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Predictions fetched per database round trip.')
+        parser.add_argument('--worker-id', default='', help='Lease owner name (default: host:pid).')
 
     def handle(self, *args, **options):
-        dry_run = options['dry_run']
+        self.worker_id = options['worker_id'] or f'{socket.gethostname()}:{os.getpid()}'
+        while True:
+            close_old_connections()
+            self._run(options)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def _run(self, options):
+        self.dry_run = options['dry_run']
+        self.counts = {'settled': 0, 'skipped': 0, 'errors': 0}
         self.stdout.write(self.style.NOTICE(
-            f"[{timezone.now().isoformat()}] Starting adaptive settlement check..."
+            f"[{timezone.now().isoformat()}] Starting settlement check..."
         ))
 
-        # 1. Get all pending predictions with an API fixture ID
-        pending = Prediction.objects.filter(
-            outcome=Prediction.Outcome.PENDING,
-            api_fixture_id__isnull=False,
-        ).select_related('bet_ticket', 'bet_ticket__author')
-
-        if not pending.exists():
-            self.stdout.write(self.style.SUCCESS("No pending predictions. Skipping."))
+        # 1. Queue fixtures of new pending predictions, then lease the due ones
+        queued = scheduling.enqueue_pending(chunk_size=options['chunk_size'])
+        checks = {
+            (check.sport, check.api_fixture_id): check
+            for check in scheduling.claim_due(self.worker_id, options['limit'])
+        }
+        if not checks:
+            self.stdout.write(self.style.SUCCESS(f"No fixture due ({queued} newly queued). Skipping."))
             return
+        self.stdout.write(f"{len(checks)} fixture(s) claimed by {self.worker_id}, {queued} newly queued.")
+        try:
+            self._settle_claimed(checks, options['chunk_size'])
+        finally:
+            # Fixtures not reached (rate limit, error) go back to the other workers.
+            scheduling.release_leases(self.worker_id)
 
-        self.stdout.write(f"Found {pending.count()} pending predictions to check.")
-
-        # 2. Group by sport + fixture_id to minimize API calls
-        grouped = defaultdict(list)
-        for pred in pending:
-            key = (pred.sport, pred.api_fixture_id)
-            grouped[key].append(pred)
+        # Summary
+        self.stdout.write(self.style.SUCCESS(
+            f"\n{'[DRY RUN] ' if self.dry_run else ''}"
+            f"Settlement complete: {self.counts['settled']} settled, "
+            f"{self.counts['skipped']} skipped (not finished), "
+            f"{self.counts['errors']} errors."
+        ))
 
-        self.stdout.write(
-            f"Grouped into {len(grouped)} unique fixtures across "
-            f"{len(set(k[0] for k in grouped))} sport(s)."
+    def _settle_claimed(self, checks, chunk_size):
+        # 2. Stream their pending predictions, one (sport, fixture) group at a time
+        pending = (
+            Prediction.objects.filter(
+                outcome=Prediction.Outcome.PENDING,
+                api_fixture_id__in={fixture_id for _, fixture_id in checks},
+            )
+            .only(
+                'id', 'sport', 'api_fixture_id', 'prediction_type', 'prediction_value',
+                *Prediction.MARKET_FIELDS, 'bet_ticket__author',
+            )
+            .select_related('bet_ticket')
+            .order_by('sport', 'api_fixture_id')
         )
+        seen = set()
+        for key, group in groupby(pending.iterator(chunk_size=chunk_size), key=lambda p: (p.sport, p.api_fixture_id)):
+            check = checks.get(key)
+            if check is None:
+                # Same fixture id in another sport, not claimed by this worker.
+                continue
+            seen.add(key)
+            try:
+                self._settle_fixture(check, list(group))
+            except SportsAPIRateLimited:
+                # The quota is shared: leave the other due fixtures for the next run.
+                break
+        else:
+            # Resolved some other way: nothing left to check.
+            for key in checks.keys() - seen:
+                scheduling.drop(checks[key])
 
-        # 3. For each unique fixture, check the result
-        settled_count = 0
-        error_count = 0
-        skipped_count = 0
+    def _settle_fixture(self, check, predictions):
+        """Check one due fixture and resolve or re-schedule it. Re-raises SportsAPIRateLimited."""
+        sport, fixture_id = check.sport, check.api_fixture_id
+        for pred in predictions:
+            if not pred.market_parsed:
+                # Bulk-created without save(): parsed now, stored with the result.
+                pred.parse_market()
+        try:
+            scheduling.renew_leases(self.worker_id)
+            fixture_data = self._fetch_fixture(sport, fixture_id)
+            if fixture_data is None:
+                logger.warning(f"Fixture {fixture_id} ({sport}) not found in API")
+                scheduling.reschedule(check, status='not_found')
+                self.counts['skipped'] += len(predictions)
+                return
 
-        for (sport, fixture_id), predictions in grouped.items():
-            try:
-                fixture_data = self._fetch_fixture(sport, fixture_id)
-                if fixture_data is None:
-                    logger.warning(f"Fixture {fixture_id} ({sport}) not found in API")
-                    skipped_count += len(predictions)
-                    continue
-
-                # Check if match is cancelled
-                if is_match_cancelled(fixture_data, sport):
-                    self.stdout.write(
-                        f"  ⊘ {sport} fixture {fixture_id} — CANCELLED/POSTPONED"
-                    )
-                    for pred in predictions:
-                        if not dry_run:
-                            pred.resolve('VOID', {'reason': 'match_cancelled'})
-                        settled_count += 1
-                    continue
-
-                # Check if match is finished
-                if not is_match_finished(fixture_data, sport):
-                    self.stdout.write(
-                        f"  ⏳ {sport} fixture {fixture_id} — not finished yet"
-                    )
-                    skipped_count += len(predictions)
-                    continue
-
-                # Match is finished — extract score and resolve predictions
-                score = extract_score(fixture_data, sport)
-                events = None
-
-                # Get detailed events for football (goalscorers)
-                has_goalscorer_preds = any(
-                    p.prediction_type == 'GOALSCORER' for p in predictions
+            # Check if match is cancelled
+            if is_match_cancelled(fixture_data, sport):
+                self.stdout.write(
+                    f"  ⊘ {sport} fixture {fixture_id} — CANCELLED/POSTPONED"
                 )
-                if sport == 'FOOTBALL' and has_goalscorer_preds:
-                    try:
-                        events = get_football_events(fixture_id)
-                    except SportsAPIError:
-                        events = None
+                self._flush(check, [(pred, 'VOID', {'reason': 'match_cancelled'}) for pred in predictions])
+                return
 
+            # Check if match is finished
+            if not is_match_finished(fixture_data, sport):
+                scheduling.reschedule(
+                    check,
+                    status=self._status(fixture_data, sport),
+                    kickoff=extract_kickoff(fixture_data, sport),
+                )
                 self.stdout.write(
-                    f"  ✅ {sport} fixture {fixture_id} — "
-                    f"Score: {score.get('home')}-{score.get('away')}"
+                    f"  ⏳ {sport} fixture {fixture_id} — not finished yet, "
+                    f"next check {check.next_check_at:%Y-%m-%d %H:%M}"
                 )
+                self.counts['skipped'] += len(predictions)
+                return
 
-                for pred in predictions:
-                    result = verify_prediction(
-                        pred.prediction_type,
-                        pred.prediction_value,
-                        score,
-                        events=events,
-                    )
-
-                    if not dry_run:
-                        pred.resolve(result, {
-                            'score': score,
-                            'fixture_id': fixture_id,
-                        })
-                        # Update gamification stats
-                        self._update_stats(pred.bet_ticket.author, result)
-
-                    symbol = '✓' if result == 'CORRECT' else '✗' if result == 'INCORRECT' else '?'
-                    self.stdout.write(
-                        f"    {symbol} {pred.prediction_value} → {result}"
-                    )
-                    settled_count += 1
-
-            except SportsAPIError as e:
-                logger.error(f"API error for {sport} fixture {fixture_id}: {e}")
-                error_count += len(predictions)
-            except Exception as e:
-                logger.exception(f"Unexpected error settling {sport} fixture {fixture_id}: {e}")
-                error_count += len(predictions)
+            # Match is finished — extract score and resolve predictions
+            score = extract_score(fixture_data, sport)
+            events = None
 
-        # Summary
-        self.stdout.write(self.style.SUCCESS(
-            f"\n{'[DRY RUN] ' if dry_run else ''}"
-            f"Settlement complete: {settled_count} settled, "
-            f"{skipped_count} skipped (not finished), "
-            f"{error_count} errors."
-        ))
+            # Get detailed events for football (goalscorers)
+            has_goalscorer_preds = any(
+                p.prediction_type == 'GOALSCORER' for p in predictions
+            )
+            if sport == 'FOOTBALL' and has_goalscorer_preds:
+                try:
+                    scheduling.renew_leases(self.worker_id)
+                    events = get_football_events(fixture_id)
+                except SportsAPIError:
+                    events = None
+
+            self.stdout.write(
+                f"  ✅ {sport} fixture {fixture_id} — "
+                f"Score: {score.get('home')}-{score.get('away')}"
+            )
+
+            results = evaluate_markets([pred.market for pred in predictions], score, events)
+            resolutions = []
+            for pred, result in zip(predictions, results):
+                resolutions.append((pred, result, {'score': score, 'fixture_id': fixture_id}))
+
+                symbol = '✓' if result == 'CORRECT' else '✗' if result == 'INCORRECT' else '?'
+                self.stdout.write(
+                    f"    {symbol} {pred.prediction_value} → {result}"
+                )
+            self._flush(check, resolutions)
+
+        except SportsAPIRateLimited as e:
+            logger.warning(f"Rate limited on {sport} fixture {fixture_id}, stopping this run")
+            scheduling.reschedule(
+                check, status='rate_limited',
+                retry_after=e.retry_after or scheduling.RECHECK_BASE.total_seconds(),
+            )
+            self.counts['errors'] += len(predictions)
+            raise
+        except SportsAPIError as e:
+            logger.error(f"API error for {sport} fixture {fixture_id}: {e}")
+            scheduling.reschedule(check, status='api_error')
+            self.counts['errors'] += len(predictions)
+        except Exception as e:
+            logger.exception(f"Unexpected error settling {sport} fixture {fixture_id}: {e}")
+            scheduling.reschedule(check, status='error')
+            self.counts['errors'] += len(predictions)
+
+    def _flush(self, check, resolutions):
+        """
+        Write one fixture's resolutions, stats and queue removal in one
+        transaction — only if this worker still holds the fixture's lease.
+        """
+        if self.dry_run:
+            self.counts['settled'] += len(resolutions)
+            return
+        for pred, outcome, actual_result in resolutions:
+            pred.mark_resolved(outcome, actual_result)
+        with transaction.atomic():
+            if not scheduling.lock_lease(check):
+                logger.warning(f"Lease on {check.sport} fixture {check.api_fixture_id} lost, leaving it to its new worker")
+                self.counts['skipped'] += len(resolutions)
+                return
+            self.counts['settled'] += len(resolutions)
+            Prediction.objects.bulk_update([pred for pred, _, _ in resolutions], RESOLVED_FIELDS)
+            # Update gamification stats
+            by_author = {}
+            for pred, outcome, _ in resolutions:
+                by_author.setdefault(pred.bet_ticket.author_id, []).append(outcome)
+            for author_id, outcomes in by_author.items():
+                self._update_stats(author_id, outcomes)
+            check.delete()
+
+    def _status(self, fixture_data, sport):
+        """Short status code of the fixture (NS, 1H, FT…)."""
+        status = fixture_data.get('fixture', {}).get('status') if sport == 'FOOTBALL' else fixture_data.get('status')
+        return status.get('short', '') if isinstance(status, dict) else ''
 
     def _fetch_fixture(self, sport, fixture_id):
         """Fetch fixture data from the appropriate API."""
@@ -167,20 +262,22 @@ class Command(BaseCommand):
         else:
             return get_fixture_by_sport(sport, fixture_id)
 
-    def _update_stats(self, user, result):
-        """Update UserGlobalStats after a prediction is resolved."""
+    def _update_stats(self, user_id, results):
+        """Update UserGlobalStats after predictions of one user are resolved (in order)."""
         try:
             from gamification.models import UserGlobalStats
-            stats, _ = UserGlobalStats.objects.get_or_create(user=user)
-            stats.total_bets += 1
-            if result == 'CORRECT':
-                stats.wins += 1
-                stats.current_streak += 1
-                if stats.current_streak > stats.max_streak:
-                    stats.max_streak = stats.current_streak
-            elif result == 'INCORRECT':
-                stats.losses += 1
-                stats.current_streak = 0
-            stats.save()
+            with transaction.atomic():
+                stats, _ = UserGlobalStats.objects.select_for_update().get_or_create(user_id=user_id)
+                for result in results:
+                    stats.total_bets += 1
+                    if result == 'CORRECT':
+                        stats.wins += 1
+                        stats.current_streak += 1
+                        if stats.current_streak > stats.max_streak:
+                            stats.max_streak = stats.current_streak
+                    elif result == 'INCORRECT':
+                        stats.losses += 1
+                        stats.current_streak = 0
+                stats.save()
         except Exception as e:
-            logger.error(f"Failed to update stats for {user}: {e}")
+            logger.error(f"Failed to update stats for user {user_id}: {e}")
@@ -0,0 +1,193 @@
+"""
+Structured markets for prediction settlement.
+
+`parse_market()` turns a (prediction_type, prediction_value) pair such as
+('OVER_UNDER', 'Over 2.5') into a `Market` when the Prediction is saved with a
+new type or value (or, for rows bulk-created without save(), at their first
+settlement). The
+Prediction keeps it in its `market_*` columns; a value that cannot be parsed
+is flagged in `market_error` at that point instead of being discovered after
+the match.
+
+`evaluate_markets()` then scores every market of a fixture against the final
+score in one pass: the per-fixture facts (total, both teams scored, goal
+scorers) are computed once and each market is a lookup in the `RULES` table
+keyed by its side.
+"""
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from django.db import models
+
+
+class Side(models.TextChoices):
+    HOME = 'HOME', 'Domicile'
+    DRAW = 'DRAW', 'Nul'
+    AWAY = 'AWAY', 'Extérieur'
+    HOME_DRAW = 'HOME_DRAW', '1X'
+    DRAW_AWAY = 'DRAW_AWAY', 'X2'
+    HOME_AWAY = 'HOME_AWAY', '12'
+    OVER = 'OVER', 'Over'
+    UNDER = 'UNDER', 'Under'
+    BTTS_YES = 'BTTS_YES', 'Les deux marquent'
+    BTTS_NO = 'BTTS_NO', 'Les deux ne marquent pas'
+    SCORE = 'SCORE', 'Score exact'
+    SCORER = 'SCORER', 'Buteur'
+    WINNER = 'WINNER', 'Vainqueur'
+
+
+class MarketError(ValueError):
+    """The prediction value cannot be turned into a verifiable market."""
+
+
+@dataclass(frozen=True)
+class Market:
+    side: str
+    line: Optional[float] = None
+    home: Optional[int] = None
+    away: Optional[int] = None
+    player: str = ''
+
+
+# ─── Parsing ────────────────────────────────────────────────
+MATCH_RESULT_SIDES = {
+    '1': Side.HOME, 'HOME': Side.HOME, 'HOME WIN': Side.HOME, 'DOMICILE': Side.HOME,
+    'N': Side.DRAW, 'X': Side.DRAW, 'DRAW': Side.DRAW, 'NUL': Side.DRAW, 'MATCH NUL': Side.DRAW,
+    '2': Side.AWAY, 'AWAY': Side.AWAY, 'AWAY WIN': Side.AWAY, 'EXTÉRIEUR': Side.AWAY, 'EXTERIEUR': Side.AWAY,
+}
+BTTS_SIDES = {
+    'YES': Side.BTTS_YES, 'OUI': Side.BTTS_YES, 'BTTS YES': Side.BTTS_YES,
+    'NO': Side.BTTS_NO, 'NON': Side.BTTS_NO, 'BTTS NO': Side.BTTS_NO,
+}
+DOUBLE_CHANCE_SIDES = {
+    '1X': Side.HOME_DRAW, 'X1': Side.HOME_DRAW,
+    'X2': Side.DRAW_AWAY, '2X': Side.DRAW_AWAY,
+    '12': Side.HOME_AWAY, '21': Side.HOME_AWAY,
+}
+ALIASES = {
+    'MATCH_RESULT': MATCH_RESULT_SIDES,
+    'BTTS': BTTS_SIDES,
+    'DOUBLE_CHANCE': DOUBLE_CHANCE_SIDES,
+}
+# Exact scores above this are typos, not predictions.
+MAX_SCORE = 999
+
+
+def _line(value, *noise):
+    for token in noise:
+        value = value.replace(token, '')
+    try:
+        line = float(value.strip())
+    except ValueError:
+        raise MarketError(f'no line in {value!r}') from None
+    if not math.isfinite(line):
+        raise MarketError(f'invalid line {line}')
+    return line
+
+
+def _total(value, over_markers, under_markers, *noise):
+    if any(marker in value for marker in over_markers):
+        return Market(Side.OVER, line=_line(value, 'OVER', '+', *noise))
+    if any(marker in value for marker in under_markers):
+        return Market(Side.UNDER, line=_line(value, 'UNDER', '-', *noise))
+    raise MarketError('neither over nor under')
+
+
+def parse_market(prediction_type, prediction_value):
+    """The Market of a prediction; raises MarketError when there is none."""
+    value = prediction_value.strip().upper()
+
+    if prediction_type in ALIASES:
+        side = ALIASES[prediction_type].get(value)
+        if side is None:
+            raise MarketError(f'unknown {prediction_type} value {value!r}')
+        return Market(side)
+    if prediction_type == 'OVER_UNDER':
+        return _total(value, ('OVER',), ('UNDER',))
+    if prediction_type == 'TOTAL_POINTS':
+        return _total(value, ('OVER', '+'), ('UNDER', '-'), 'TOTAL')
+    if prediction_type == 'CORRECT_SCORE':
+        parts = value.replace('-', ' ').replace(':', ' ').split()
+        try:
+            home, away = int(parts[0]), int(parts[1])
+        except (ValueError, IndexError):
+            raise MarketError(f'no score in {value!r}') from None
+        if max(home, away) > MAX_SCORE:
+            raise MarketError(f'implausible score {home}-{away}')
+        return Market(Side.SCORE, home=home, away=away)
+    if prediction_type == 'GOALSCORER':
+        return Market(Side.SCORER, player=value.lower())
+    if prediction_type == 'WINNER':
+        return Market(Side.WINNER)
+    raise MarketError(f'{prediction_type} predictions are not verifiable')
+
+
+# ─── Evaluation ─────────────────────────────────────────────
+@dataclass(frozen=True)
+class FinalScore:
+    home: int
+    away: int
+    total: int
+    # Lower-cased goal scorer names, None without event data.
+    scorers: Optional[tuple]
+
+
+def _verdict(condition):
+    return 'CORRECT' if condition else 'INCORRECT'
+
+
+def _winner(score, market):
+    # The side is not known from the value alone: home wins count as
+    # CORRECT, as before structured markets.
+    if score.home == score.away:
+        return 'UNVERIFIABLE'
+    return _verdict(score.home > score.away)
+
+
+def _scorer(score, market):
+    if score.scorers is None:
+        return 'UNVERIFIABLE'
+    return _verdict(any(market.player in name or name in market.player for name in score.scorers))
+
+
+RULES = {
+    Side.HOME: lambda s, m: _verdict(s.home > s.away),
+    Side.DRAW: lambda s, m: _verdict(s.home == s.away),
+    Side.AWAY: lambda s, m: _verdict(s.away > s.home),
+    Side.HOME_DRAW: lambda s, m: _verdict(s.home >= s.away),
+    Side.DRAW_AWAY: lambda s, m: _verdict(s.away >= s.home),
+    Side.HOME_AWAY: lambda s, m: _verdict(s.home != s.away),
+    Side.OVER: lambda s, m: _verdict(s.total > m.line),
+    Side.UNDER: lambda s, m: _verdict(s.total < m.line),
+    Side.BTTS_YES: lambda s, m: _verdict(s.home > 0 and s.away > 0),
+    Side.BTTS_NO: lambda s, m: _verdict(s.home == 0 or s.away == 0),
+    Side.SCORE: lambda s, m: _verdict(s.home == m.home and s.away == m.away),
+    Side.SCORER: _scorer,
+    Side.WINNER: _winner,
+}
+
+
+def final_score(score, events=None):
+    """FinalScore from `extract_score()` output, or None if the score is missing."""
+    home, away = score.get('home'), score.get('away')
+    if home is None or away is None:
+        return None
+    scorers = None
+    if events:
+        scorers = tuple(
+            event.get('player', {}).get('name', '').lower()
+            for event in events if event.get('type') == 'Goal'
+        )
+    return FinalScore(home, away, home + away, scorers)
+
+
+def evaluate_markets(markets, score, events=None):
+    """
+    Result ('CORRECT', 'INCORRECT' or 'UNVERIFIABLE') of each market of one
+    fixture, in order. A None market (unparseable prediction) is UNVERIFIABLE.
+    """
+    final = final_score(score, events)
+    if final is None:
+        return ['UNVERIFIABLE'] * len(markets)
+    return [RULES[market.side](final, market) if market else 'UNVERIFIABLE' for market in markets]
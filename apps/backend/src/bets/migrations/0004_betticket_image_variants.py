@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bets", "0003_add_prediction_model"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="betticket",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                help_text="Variantes WebP redimensionnées (core.image_variants)",
+            ),
+        ),
+    ]
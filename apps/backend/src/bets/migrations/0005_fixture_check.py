@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bets", "0004_betticket_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FixtureCheck",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("modified", models.DateTimeField(auto_now=True)),
+                (
+                    "sport",
+                    models.CharField(
+                        choices=[
+                            ("FOOTBALL", "Football"),
+                            ("TENNIS", "Tennis"),
+                            ("BASKETBALL", "Basketball"),
+                            ("RUGBY", "Rugby"),
+                            ("VOLLEYBALL", "Volleyball"),
+                            ("HANDBALL", "Handball"),
+                            ("HOCKEY", "Hockey"),
+                            ("BASEBALL", "Baseball"),
+                            ("FORMULA1", "Formule 1"),
+                            ("MMA", "MMA"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("api_fixture_id", models.IntegerField()),
+                ("kickoff", models.DateTimeField(blank=True, null=True)),
+                ("next_check_at", models.DateTimeField(db_index=True)),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Checks since the expected end that found the fixture unfinished",
+                    ),
+                ),
+                ("last_checked_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "last_status",
+                    models.CharField(blank=True, default="", max_length=20),
+                ),
+            ],
+            options={
+                "unique_together": {("sport", "api_fixture_id")},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:01
+
+from django.contrib.postgres import operations
+from django.db import migrations, models
+
+
+class AddIndexConcurrently(operations.AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on PostgreSQL, a plain AddIndex elsewhere (SQLite tests)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # Millions of pending predictions: build the index without locking writes.
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("bets", "0005_fixture_check"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="prediction",
+            index=models.Index(
+                condition=models.Q(
+                    ("api_fixture_id__isnull", False), ("outcome", "PENDING")
+                ),
+                fields=["sport", "api_fixture_id"],
+                name="prediction_pending_fixture",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bets", "0006_prediction_pending_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="fixturecheck",
+            name="lease_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="fixturecheck",
+            name="leased_by",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Settlement worker currently checking this fixture",
+                max_length=100,
+            ),
+        ),
+    ]
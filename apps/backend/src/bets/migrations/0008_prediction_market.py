@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bets", "0007_fixture_check_lease"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="prediction",
+            name="market_away",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="prediction",
+            name="market_error",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="Why prediction_value could not be parsed (settled as UNVERIFIABLE)",
+                max_length=255,
+            ),
+        ),
+        migrations.AddField(
+            model_name="prediction",
+            name="market_home",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="prediction",
+            name="market_line",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="prediction",
+            name="market_player",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="prediction",
+            name="market_side",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("HOME", "Domicile"),
+                    ("DRAW", "Nul"),
+                    ("AWAY", "Extérieur"),
+                    ("HOME_DRAW", "1X"),
+                    ("DRAW_AWAY", "X2"),
+                    ("HOME_AWAY", "12"),
+                    ("OVER", "Over"),
+                    ("UNDER", "Under"),
+                    ("BTTS_YES", "Les deux marquent"),
+                    ("BTTS_NO", "Les deux ne marquent pas"),
+                    ("SCORE", "Score exact"),
+                    ("SCORER", "Buteur"),
+                    ("WINNER", "Vainqueur"),
+                ],
+                default="",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -23,6 +23,7 @@ class BetTicket(models.Model):
 
     # Preuve (Image pour OCR)
     ticket_image = models.ImageField(upload_to='tickets/%Y/%m/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, help_text='Variantes WebP redimensionnées (core.image_variants)')
     is_verified = models.BooleanField(default=False)
 
     # Résultat
@@ -35,6 +36,24 @@ class BetTicket(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_premium = models.BooleanField(default=False)
 
+    # Fields behind the author's UserProfileStats. Their values as loaded or
+    # last saved let gamification.signals apply a settlement as a delta.
+    STATS_FIELDS = ('author_id', 'status', 'stake', 'odds')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.STATS_FIELDS):
+            instance.saved_stats_values = instance.stats_values()
+        return instance
+
+    def stats_values(self):
+        return {field: getattr(self, field) for field in self.STATS_FIELDS}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saved_stats_values = self.stats_values()
+
     def calculate_payout(self):
         if self.status == self.BetStatus.WON:
             return self.stake * self.odds
@@ -54,4 +73,4 @@ class BetTicket(models.Model):
 
 
 # Import Prediction so Django discovers it for migrations
-from bets.prediction_models import Prediction  # noqa: E402, F401
+from bets.prediction_models import FixtureCheck, Prediction  # noqa: E402, F401
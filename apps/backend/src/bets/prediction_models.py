@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from core.models import TimeStampedModel
+from bets.markets import Market, MarketError, Side, parse_market
 from bets.models import BetTicket
 
 
@@ -8,9 +9,17 @@ class Prediction(TimeStampedModel):
     """
     A single prediction extracted from a tipster's bet ticket (post).
     The system automatically verifies predictions against real results
-    via API-Sports / API-Tennis every 10 minutes.
+    via API-Sports / API-Tennis once their fixture should be over
+    (FixtureCheck, bets/scheduling.py).
+
+    `prediction_value` is parsed into the `market_*` columns (bets/markets.py)
+    when the prediction is saved with a new type or value; settlement
+    evaluates those.
     """
 
+    MARKET_FIELDS = ['market_side', 'market_line', 'market_home', 'market_away', 'market_player', 'market_error']
+    MARKET_SOURCE_FIELDS = ['prediction_type', 'prediction_value']
+
     class Outcome(models.TextChoices):
         PENDING = 'PENDING', 'En attente'
         CORRECT = 'CORRECT', 'Correct'
@@ -64,6 +73,17 @@ class Prediction(TimeStampedModel):
     )
     api_match_date = models.DateTimeField(null=True, blank=True)
 
+    # Structured market parsed from prediction_value (bets/markets.py)
+    market_side = models.CharField(max_length=10, choices=Side.choices, blank=True, default='')
+    market_line = models.FloatField(null=True, blank=True)  # Over/Under threshold
+    market_home = models.PositiveIntegerField(null=True, blank=True)  # Exact score
+    market_away = models.PositiveIntegerField(null=True, blank=True)
+    market_player = models.CharField(max_length=255, blank=True, default='')
+    market_error = models.CharField(
+        max_length=255, blank=True, default='',
+        help_text='Why prediction_value could not be parsed (settled as UNVERIFIABLE)'
+    )
+
     # Resolution (populated by the cron settlement job)
     outcome = models.CharField(
         max_length=15, choices=Outcome.choices, default=Outcome.PENDING, db_index=True
@@ -78,14 +98,102 @@ class Prediction(TimeStampedModel):
         ordering = ['-created']
         indexes = [
             models.Index(fields=['outcome', 'api_fixture_id']),
+            # Settlement streams pending rows in (sport, fixture) order; resolved ones are the bulk of the table.
+            models.Index(
+                fields=['sport', 'api_fixture_id'],
+                condition=models.Q(outcome='PENDING', api_fixture_id__isnull=False),
+                name='prediction_pending_fixture',
+            ),
         ]
 
-    def resolve(self, outcome, actual_result=None):
-        """Mark this prediction as resolved."""
+    @property
+    def market_parsed(self):
+        return bool(self.market_side or self.market_error)
+
+    @property
+    def market(self):
+        """The stored Market, or None if prediction_value could not be parsed."""
+        if not self.market_side:
+            return None
+        return Market(self.market_side, self.market_line, self.market_home, self.market_away, self.market_player)
+
+    def parse_market(self):
+        """Fill the market_* columns from prediction_value (without saving)."""
+        try:
+            market = parse_market(self.prediction_type, self.prediction_value)
+        except MarketError as e:
+            market, self.market_error = Market(''), str(e)[:255]
+        else:
+            self.market_error = ''
+        self.market_side = market.side
+        self.market_line = market.line
+        self.market_home = market.home
+        self.market_away = market.away
+        self.market_player = market.player[:255]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if all(field in field_names for field in cls.MARKET_SOURCE_FIELDS):
+            instance._market_source = instance._current_market_source()
+        return instance
+
+    def _current_market_source(self):
+        return (self.prediction_type, self.prediction_value)
+
+    def save(self, *args, update_fields=None, **kwargs):
+        # Parse again whenever the type or value differs from what was loaded
+        # (or last saved), so the stored market never goes stale.
+        source = self._current_market_source()
+        if update_fields is None:
+            if not self.market_parsed or source != getattr(self, '_market_source', None):
+                self.parse_market()
+            super().save(*args, **kwargs)
+            self._market_source = source
+        elif set(update_fields) & set(self.MARKET_SOURCE_FIELDS):
+            self.parse_market()
+            super().save(*args, update_fields=[*update_fields, *self.MARKET_FIELDS], **kwargs)
+            self._market_source = source
+        else:
+            super().save(*args, update_fields=update_fields, **kwargs)
+
+    def mark_resolved(self, outcome, actual_result=None):
+        """Set the resolution fields without saving (for bulk_update)."""
         self.outcome = outcome
         self.actual_result = actual_result
-        self.resolved_at = timezone.now()
+        self.resolved_at = self.modified = timezone.now()
+
+    def resolve(self, outcome, actual_result=None):
+        """Mark this prediction as resolved."""
+        self.mark_resolved(outcome, actual_result)
         self.save()
 
     def __str__(self):
         return f"[{self.sport}] {self.match_title} — {self.prediction_value} ({self.outcome})"
+
+
+class FixtureCheck(TimeStampedModel):
+    """
+    Settlement queue: one row per fixture that still has PENDING predictions,
+    checked against the sports API when `next_check_at` is due. Rows are
+    created by bets/scheduling.py and deleted once the fixture is settled.
+
+    A settlement worker leases the rows it takes (`leased_by` until
+    `lease_expires_at`), so concurrent workers never check the same fixture;
+    the lease of a crashed worker simply expires.
+    """
+    sport = models.CharField(max_length=20, choices=Prediction.Sport.choices)
+    api_fixture_id = models.IntegerField()
+    kickoff = models.DateTimeField(null=True, blank=True)
+    next_check_at = models.DateTimeField(db_index=True)
+    attempts = models.PositiveIntegerField(default=0, help_text='Checks since the expected end that found the fixture unfinished')
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True, default='')
+    leased_by = models.CharField(max_length=100, blank=True, default='', help_text='Settlement worker currently checking this fixture')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('sport', 'api_fixture_id')
+
+    def __str__(self):
+        return f"[{self.sport}] fixture {self.api_fixture_id} — next check {self.next_check_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,182 @@
+"""
+Kickoff-aware settlement schedule (the FixtureCheck queue).
+
+Each fixture with PENDING predictions gets one FixtureCheck whose first check
+is its expected end: kickoff (`Prediction.api_match_date`, or the date the API
+reports) plus the sport's usual duration below. A fixture still unfinished at
+that point is re-checked with exponential backoff — RECHECK_BASE, twice that,
+… up to RECHECK_MAX — so extra time, long tennis matches and delays are
+caught quickly without polling fixtures that have not started.
+
+`settle_predictions` only fetches due fixtures: a week-ahead fixture costs no
+API call until it should be over.
+
+Any number of `settle_predictions` workers can share the queue. Each one
+claims due rows with SELECT … FOR UPDATE SKIP LOCKED and marks them leased to
+itself for SETTLEMENT_LEASE_SECONDS, so the others skip them; the lease is
+renewed before every API call, cleared when the fixture is re-scheduled and
+checked again (under a row lock) before the fixture's predictions are written.
+Leases of a worker that died expire and the rows are claimed again.
+"""
+from datetime import timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef, Q
+from django.utils import timezone
+
+from bets.prediction_models import FixtureCheck, Prediction
+
+# Minutes from scheduled start to the usual final whistle / result.
+SPORT_DURATIONS = {
+    'FOOTBALL': 115,    # 90 + half-time + stoppage
+    'TENNIS': 150,      # best of three; best of five and long matches fall to the backoff
+    'BASKETBALL': 150,
+    'RUGBY': 100,
+    'VOLLEYBALL': 120,
+    'HANDBALL': 90,
+    'HOCKEY': 150,
+    'BASEBALL': 190,
+    'FORMULA1': 120,    # race distance or the 2 h limit
+    'MMA': 240,         # fixtures are cards: main event ends hours after the start
+}
+DEFAULT_DURATION = 180
+RECHECK_BASE = timedelta(minutes=5)
+RECHECK_MAX = timedelta(hours=6)
+
+
+def _aware(value):
+    if value is not None and timezone.is_naive(value):
+        return timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def expected_end(sport, kickoff):
+    """When the fixture should be over, or None if its kickoff is unknown."""
+    if kickoff is None:
+        return None
+    return _aware(kickoff) + timedelta(minutes=SPORT_DURATIONS.get(sport, DEFAULT_DURATION))
+
+
+def recheck_delay(attempts):
+    """Wait before the next check of an overrunning fixture."""
+    return min(RECHECK_MAX, RECHECK_BASE * 2 ** min(attempts, 16))
+
+
+def first_check_at(sport, kickoff, now=None):
+    now = now or timezone.now()
+    end = expected_end(sport, kickoff)
+    return max(end, now) if end else now
+
+
+def enqueue_pending(now=None, chunk_size=2000):
+    """
+    Create a FixtureCheck for each fixture with PENDING predictions and none
+    yet, streaming the fixtures and inserting them `chunk_size` at a time.
+    """
+    now = now or timezone.now()
+    queued = FixtureCheck.objects.filter(sport=OuterRef('sport'), api_fixture_id=OuterRef('api_fixture_id'))
+    fixtures = (
+        Prediction.objects.filter(outcome=Prediction.Outcome.PENDING, api_fixture_id__isnull=False)
+        .filter(~Exists(queued))
+        .values('sport', 'api_fixture_id')
+        .annotate(kickoff=Min('api_match_date'))
+        .order_by()
+    )
+    checks = (
+        FixtureCheck(
+            sport=row['sport'],
+            api_fixture_id=row['api_fixture_id'],
+            kickoff=row['kickoff'],
+            next_check_at=first_check_at(row['sport'], row['kickoff'], now),
+        )
+        for row in fixtures.iterator(chunk_size=chunk_size)
+    )
+    created = 0
+    while batch := list(islice(checks, chunk_size)):
+        # A concurrent worker may have queued the same fixture.
+        FixtureCheck.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+    return created
+
+
+def _lease_expiry(now):
+    return now + timedelta(seconds=settings.SETTLEMENT_LEASE_SECONDS)
+
+
+def claim_due(worker_id, limit, now=None):
+    """
+    Lease up to `limit` due FixtureChecks to `worker_id`, most overdue first.
+    Rows locked by another worker's claim or under a live lease are skipped.
+    """
+    now = now or timezone.now()
+    expires = _lease_expiry(now)
+    with transaction.atomic():
+        checks = list(
+            FixtureCheck.objects.select_for_update(skip_locked=True)
+            .filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now), next_check_at__lte=now)
+            .order_by('next_check_at')[:limit]
+        )
+        FixtureCheck.objects.filter(pk__in=[check.pk for check in checks]).update(leased_by=worker_id, lease_expires_at=expires)
+    for check in checks:
+        check.leased_by, check.lease_expires_at = worker_id, expires
+    return checks
+
+
+def renew_leases(worker_id, now=None):
+    """Extend every lease `worker_id` still holds; returns how many."""
+    return FixtureCheck.objects.filter(leased_by=worker_id).update(lease_expires_at=_lease_expiry(now or timezone.now()))
+
+
+def release_leases(worker_id):
+    """Give back the fixtures `worker_id` claimed but did not get to."""
+    return FixtureCheck.objects.filter(leased_by=worker_id).update(leased_by='', lease_expires_at=None)
+
+
+def _owned(check):
+    return FixtureCheck.objects.filter(pk=check.pk, leased_by=check.leased_by)
+
+
+def lock_lease(check):
+    """
+    Lock `check` for the rest of the transaction if this worker still holds
+    it. False when its lease expired and another worker took the fixture over.
+    """
+    return _owned(check).select_for_update().first() is not None
+
+
+def drop(check):
+    """Remove a settled fixture from the queue, unless another worker took it over."""
+    _owned(check).delete()
+
+
+def reschedule(check, status='', kickoff=None, retry_after=None, now=None):
+    """
+    Plan the next check of a fixture that is not over. `kickoff` (from the
+    API) moves the expected end when the fixture was rescheduled;
+    `retry_after` (seconds, rate limiting) overrides the backoff.
+    """
+    now = now or timezone.now()
+    if kickoff is not None:
+        check.kickoff = _aware(kickoff)
+    check.last_checked_at = now
+    check.last_status = status[:20]
+
+    end = expected_end(check.sport, check.kickoff)
+    if retry_after is not None:
+        check.next_check_at = now + timedelta(seconds=retry_after)
+    elif end is not None and end > now:
+        # Not started yet (or moved to later): back to the expected end.
+        check.attempts = 0
+        check.next_check_at = end
+    else:
+        check.next_check_at = now + recheck_delay(check.attempts)
+        check.attempts += 1
+    # Also gives the lease back; a no-op if another worker took the fixture over.
+    _owned(check).update(
+        kickoff=check.kickoff, last_checked_at=now, last_status=check.last_status,
+        next_check_at=check.next_check_at, attempts=check.attempts,
+        leased_by='', lease_expires_at=None, modified=now,
+    )
+    check.leased_by, check.lease_expires_at = '', None
@@ -3,12 +3,14 @@ from rest_framework import serializers
 from django.apps import apps
 from .models import BetTicket
 from api.serializers import sanitize_text, validate_image_size
+from core.image_variants import variant_urls
 
 
 class BetTicketSerializer(serializers.ModelSerializer):
     author_id = serializers.ReadOnlyField(source='author.id')
     author_name = serializers.ReadOnlyField(source='author.username')
     author_avatar = serializers.SerializerMethodField()
+    ticket_image_urls = serializers.SerializerMethodField()
 
     # Social Metrics
     like_count = serializers.SerializerMethodField()
@@ -22,7 +24,7 @@ class BetTicketSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'author_id', 'author_name', 'author_avatar',
             'match_title', 'selection', 'odds', 'stake',
-            'ticket_image', 'status', 'payout', 'settled_at',
+            'ticket_image', 'ticket_image_urls', 'status', 'payout', 'settled_at',
             'created_at', 'is_premium', 'is_locked',
             'like_count', 'is_liked_by_me', 'comment_count'
         ]
@@ -61,8 +63,12 @@ class BetTicketSerializer(serializers.ModelSerializer):
         return data
 
     def get_author_avatar(self, obj):
-        """Use real avatar_url property from CustomUser model."""
-        return obj.author.avatar_url
+        """Small avatar variant, sized for feed rows."""
+        return obj.author.avatar_variant_url('small')
+
+    def get_ticket_image_urls(self, obj):
+        """Small/medium/large/original URLs of the ticket image."""
+        return variant_urls(obj.ticket_image, obj.image_variants, self.context.get('request'))
 
     def get_like_count(self, obj):
         return obj.likes.count()
@@ -7,6 +7,9 @@ Both APIs use the same authentication: x-apisports-key header.
 import logging
 import requests
 from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from bets.markets import MarketError, evaluate_markets, parse_market
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,27 @@ class SportsAPIError(Exception):
     pass
 
 
+class SportsAPIRateLimited(SportsAPIError):
+    """HTTP 429 from the API; `retry_after` is the advised wait in seconds (or None)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _host(sport):
+    """
+    Base URL for a sport. With API_SPORTS_BASE_URL set (e.g. the local
+    `fake_sports_api` server), every sport is served under {base}/{sport}.
+    """
+    base_url = getattr(settings, 'API_SPORTS_BASE_URL', '')
+    if base_url:
+        return f"{base_url.rstrip('/')}/{sport.lower()}"
+    if sport == 'TENNIS':
+        return API_TENNIS_HOST
+    return API_SPORTS_HOSTS.get(sport)
+
+
 def _get_api_key():
     key = getattr(settings, 'API_SPORTS_KEY', '')
     if not key:
@@ -56,6 +80,12 @@ def _api_request(host, endpoint, params=None, use_tennis_key=False):
     }
     try:
         response = requests.get(url, headers=headers, params=params or {}, timeout=15)
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            raise SportsAPIRateLimited(
+                f"Rate limited: {url}",
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
         response.raise_for_status()
         data = response.json()
 
@@ -73,7 +103,7 @@ def _api_request(host, endpoint, params=None, use_tennis_key=False):
 def get_football_fixtures_by_date(date_str):
     """Get all fixtures for a date (YYYY-MM-DD)."""
     return _api_request(
-        API_SPORTS_HOSTS['FOOTBALL'],
+        _host('FOOTBALL'),
         'fixtures',
         {'date': date_str}
     )
@@ -82,7 +112,7 @@ def get_football_fixtures_by_date(date_str):
 def get_football_fixture(fixture_id):
     """Get a single fixture by ID."""
     results = _api_request(
-        API_SPORTS_HOSTS['FOOTBALL'],
+        _host('FOOTBALL'),
         'fixtures',
         {'id': fixture_id}
     )
@@ -92,7 +122,7 @@ def get_football_fixture(fixture_id):
 def get_football_events(fixture_id):
     """Get events (goals, cards, subs) for a fixture."""
     return _api_request(
-        API_SPORTS_HOSTS['FOOTBALL'],
+        _host('FOOTBALL'),
         'fixtures/events',
         {'fixture': fixture_id}
     )
@@ -114,19 +144,19 @@ def search_football_fixture(home_team, away_team, date_str):
 # ─── Tennis ─────────────────────────────────────────────
 def get_tennis_fixtures_by_date(date_str):
     """Get all tennis fixtures for a date."""
-    return _api_request(API_TENNIS_HOST, 'games', {'date': date_str}, use_tennis_key=True)
+    return _api_request(_host('TENNIS'), 'games', {'date': date_str}, use_tennis_key=True)
 
 
 def get_tennis_fixture(fixture_id):
     """Get a single tennis fixture by ID."""
-    results = _api_request(API_TENNIS_HOST, 'games', {'id': fixture_id}, use_tennis_key=True)
+    results = _api_request(_host('TENNIS'), 'games', {'id': fixture_id}, use_tennis_key=True)
     return results[0] if results else None
 
 
 # ─── Generic (Basketball, Rugby, etc.) ──────────────────
 def get_fixtures_by_sport_and_date(sport, date_str):
     """Get fixtures for any API-Sports sport by date."""
-    host = API_SPORTS_HOSTS.get(sport)
+    host = _host(sport) if sport in API_SPORTS_HOSTS else None
     if not host:
         logger.warning(f"No API host configured for sport: {sport}")
         return []
@@ -135,7 +165,7 @@ def get_fixtures_by_sport_and_date(sport, date_str):
 
 def get_fixture_by_sport(sport, fixture_id):
     """Get a single fixture for any sport."""
-    host = API_SPORTS_HOSTS.get(sport)
+    host = _host(sport) if sport in API_SPORTS_HOSTS else None
     if not host:
         return None
     results = _api_request(host, 'games', {'id': fixture_id})
@@ -197,105 +227,30 @@ def extract_score(fixture_data, sport='FOOTBALL'):
     return {}
 
 
+def extract_kickoff(fixture_data, sport='FOOTBALL'):
+    """Scheduled start of the fixture as an aware datetime, or None."""
+    if sport == 'FOOTBALL':
+        value = fixture_data.get('fixture', {}).get('date')
+    else:
+        value = fixture_data.get('date')
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+
 def verify_prediction(prediction_type, prediction_value, score, events=None):
     """
     Verify a prediction against the actual result.
     Returns 'CORRECT', 'INCORRECT', or 'UNVERIFIABLE'.
+
+    Parses the value on every call; settlement uses the markets stored on
+    Prediction and `bets.markets.evaluate_markets` instead.
     """
-    home = score.get('home')
-    away = score.get('away')
-
-    if home is None or away is None:
-        return 'UNVERIFIABLE'
-
-    value = prediction_value.strip().upper()
-
-    if prediction_type == 'MATCH_RESULT':
-        # 1 (Home), N (Draw), 2 (Away)
-        if value in ('1', 'HOME', 'HOME WIN', 'DOMICILE'):
-            return 'CORRECT' if home > away else 'INCORRECT'
-        elif value in ('N', 'X', 'DRAW', 'NUL', 'MATCH NUL'):
-            return 'CORRECT' if home == away else 'INCORRECT'
-        elif value in ('2', 'AWAY', 'AWAY WIN', 'EXTÉRIEUR', 'EXTERIEUR'):
-            return 'CORRECT' if away > home else 'INCORRECT'
-
-    elif prediction_type == 'OVER_UNDER':
-        total = home + away
-        if 'OVER' in value:
-            try:
-                threshold = float(value.replace('OVER', '').replace('+', '').strip())
-                return 'CORRECT' if total > threshold else 'INCORRECT'
-            except ValueError:
-                return 'UNVERIFIABLE'
-        elif 'UNDER' in value:
-            try:
-                threshold = float(value.replace('UNDER', '').replace('-', '').strip())
-                return 'CORRECT' if total < threshold else 'INCORRECT'
-            except ValueError:
-                return 'UNVERIFIABLE'
-
-    elif prediction_type == 'BTTS':
-        if value in ('YES', 'OUI', 'BTTS YES'):
-            return 'CORRECT' if home > 0 and away > 0 else 'INCORRECT'
-        elif value in ('NO', 'NON', 'BTTS NO'):
-            return 'CORRECT' if home == 0 or away == 0 else 'INCORRECT'
-
-    elif prediction_type == 'DOUBLE_CHANCE':
-        if value in ('1X', 'X1'):
-            return 'CORRECT' if home >= away else 'INCORRECT'
-        elif value in ('X2', '2X'):
-            return 'CORRECT' if away >= home else 'INCORRECT'
-        elif value in ('12', '21'):
-            return 'CORRECT' if home != away else 'INCORRECT'
-
-    elif prediction_type == 'CORRECT_SCORE':
-        try:
-            parts = value.replace('-', ' ').replace(':', ' ').split()
-            pred_home, pred_away = int(parts[0]), int(parts[1])
-            return 'CORRECT' if home == pred_home and away == pred_away else 'INCORRECT'
-        except (ValueError, IndexError):
-            return 'UNVERIFIABLE'
-
-    elif prediction_type == 'WINNER':
-        # Generic winner — for tennis, MMA, etc.
-        # value should contain the winner's name fragment
-        # We compare with score: higher score wins
-        if home > away:
-            # Home won — check if prediction value matches home
-            return 'CORRECT'  # Requires name matching (done in settlement command)
-        elif away > home:
-            return 'INCORRECT'  # Flipped in settlement command based on name
-        return 'UNVERIFIABLE'
-
-    elif prediction_type == 'GOALSCORER':
-        # Check if a player scored — requires events data
-        if events:
-            scorer_name = value.lower()
-            for event in events:
-                if event.get('type') == 'Goal':
-                    player = event.get('player', {}).get('name', '').lower()
-                    if scorer_name in player or player in scorer_name:
-                        return 'CORRECT'
-            return 'INCORRECT'
-        return 'UNVERIFIABLE'
-
-    elif prediction_type == 'TOTAL_POINTS':
-        total = home + away
-        if 'OVER' in value or '+' in value:
-            try:
-                threshold = float(
-                    value.replace('OVER', '').replace('+', '').replace('TOTAL', '').strip()
-                )
-                return 'CORRECT' if total > threshold else 'INCORRECT'
-            except ValueError:
-                return 'UNVERIFIABLE'
-        elif 'UNDER' in value or '-' in value:
-            try:
-                threshold = float(
-                    value.replace('UNDER', '').replace('-', '').replace('TOTAL', '').strip()
-                )
-                return 'CORRECT' if total < threshold else 'INCORRECT'
-            except ValueError:
-                return 'UNVERIFIABLE'
-
-    return 'UNVERIFIABLE'
+    try:
+        market = parse_market(prediction_type, prediction_value)
+    except MarketError:
+        market = None
+    return evaluate_markets([market], score, events)[0]
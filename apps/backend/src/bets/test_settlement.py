@@ -1,13 +1,22 @@
 """Tests for the auto-settlement system."""
+import threading
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch, MagicMock
+from wsgiref.simple_server import make_server
 
-from django.test import TestCase
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from rest_framework.test import APITestCase
 
 from bets.models import BetTicket
-from bets.prediction_models import Prediction
+from bets.prediction_models import FixtureCheck, Prediction
+from bets import markets, scheduling, sports_api
+from bets.fake_sports_api import FakeAPIConfig, FakeSportsAPI
+from bets.management.commands.fake_sports_api import QuietHandler
 from bets.sports_api import verify_prediction, extract_score, is_match_finished
 from users.models import CustomUser
 
@@ -182,3 +191,317 @@ class ExtractScoreTests(TestCase):
         fixture = {'scores': {'home': {'total': 110}, 'away': {'total': 105}}}
         score = extract_score(fixture, 'BASKETBALL')
         self.assertEqual(score, {'home': 110, 'away': 105})
+
+
+class FakeSportsAPITests(TestCase):
+    """sports_api against the local fake server (bets.fake_sports_api)."""
+
+    def _serve(self, **config):
+        server = make_server('127.0.0.1', 0, FakeSportsAPI(FakeAPIConfig(**config)), handler_class=QuietHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        override = override_settings(API_SPORTS_BASE_URL=f'http://127.0.0.1:{server.server_port}', API_SPORTS_KEY='fake')
+        override.enable()
+        self.addCleanup(override.disable)
+        return server.get_app()
+
+    def test_default_hosts_unchanged(self):
+        self.assertEqual(sports_api._host('FOOTBALL'), 'https://v3.football.api-sports.io')
+        self.assertEqual(sports_api._host('TENNIS'), 'https://v1.tennis.api-sports.io')
+
+    def test_fixtures_are_deterministic(self):
+        app = self._serve(seed=7, finished_ratio=1.0, cancelled_ratio=0.0)
+        fixture = sports_api.get_football_fixture(42)
+
+        self.assertEqual(fixture, sports_api.get_football_fixture(42))
+        self.assertTrue(is_match_finished(fixture, 'FOOTBALL'))
+        score = extract_score(fixture, 'FOOTBALL')
+        goals = [e for e in sports_api.get_football_events(42) if e['type'] == 'Goal']
+        self.assertEqual(len(goals), score['home'] + score['away'])
+        self.assertEqual(len(sports_api.get_fixtures_by_sport_and_date('BASKETBALL', '2026-03-01')), 50)
+        self.assertEqual(app.stats['ok'], 4)
+
+    def test_settle_predictions_offline(self):
+        self._serve(finished_ratio=1.0, cancelled_ratio=0.0)
+        user = CustomUser.objects.create_user(username='fake_api', password='p')
+        ticket = BetTicket.objects.create(author=user, match_title='A vs B', selection='1', odds=Decimal('2.00'), stake=Decimal('10'))
+        pred = Prediction.objects.create(
+            bet_ticket=ticket, match_title='A vs B', sport='FOOTBALL',
+            prediction_type='BTTS', prediction_value='Yes', api_fixture_id=1234,
+        )
+
+        call_command('settle_predictions', stdout=StringIO())
+
+        pred.refresh_from_db()
+        self.assertIn(pred.outcome, ('CORRECT', 'INCORRECT'))
+        self.assertIsNotNone(pred.actual_result['score']['home'])
+
+    def test_rate_limit_raises_with_retry_after(self):
+        app = self._serve(rate_limit=2)
+        sports_api.get_football_fixture(1)
+        sports_api.get_football_fixture(2)
+        with self.assertRaises(sports_api.SportsAPIRateLimited) as ctx:
+            sports_api.get_football_fixture(3)
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertEqual(app.stats['rate_limited'], 1)
+
+    def test_error_rate(self):
+        self._serve(error_rate=1.0)
+        with self.assertRaises(sports_api.SportsAPIError):
+            sports_api.get_football_fixture(1)
+
+
+COMMAND = 'bets.management.commands.settle_predictions'
+
+
+def _football(fixture_id, status, kickoff=None, goals=(None, None)):
+    return {
+        'fixture': {'id': fixture_id, 'status': {'short': status}, 'date': kickoff.isoformat() if kickoff else None},
+        'goals': {'home': goals[0], 'away': goals[1]},
+    }
+
+
+class SettlementSchedulingTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='scheduler', password='p')
+        self.ticket = BetTicket.objects.create(author=user, match_title='A vs B', selection='1', odds=Decimal('2.00'), stake=Decimal('10'))
+
+    def _predict(self, fixture_id, kickoff=None, sport='FOOTBALL'):
+        return Prediction.objects.create(
+            bet_ticket=self.ticket, match_title='A vs B', sport=sport, prediction_type='MATCH_RESULT',
+            prediction_value='Home Win', api_fixture_id=fixture_id, api_match_date=kickoff,
+        )
+
+    def _settle(self):
+        call_command('settle_predictions', stdout=StringIO())
+
+    def test_expected_end_per_sport(self):
+        kickoff = timezone.now()
+        self.assertEqual(scheduling.expected_end('FOOTBALL', kickoff), kickoff + timedelta(minutes=115))
+        self.assertEqual(scheduling.expected_end('TENNIS', kickoff), kickoff + timedelta(minutes=150))
+        self.assertEqual(scheduling.expected_end('CURLING', kickoff), kickoff + timedelta(minutes=scheduling.DEFAULT_DURATION))
+        self.assertIsNone(scheduling.expected_end('FOOTBALL', None))
+        self.assertEqual(scheduling.recheck_delay(0), scheduling.RECHECK_BASE)
+        self.assertEqual(scheduling.recheck_delay(50), scheduling.RECHECK_MAX)
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_future_fixture_is_not_fetched(self, fetch):
+        kickoff = timezone.now() + timedelta(days=3)
+        self._predict(1, kickoff)
+        self._predict(1, kickoff)
+
+        self._settle()
+
+        fetch.assert_not_called()
+        check = FixtureCheck.objects.get()
+        self.assertEqual(check.next_check_at, kickoff + timedelta(minutes=115))
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_overrun_backs_off_then_settles(self, fetch):
+        kickoff = timezone.now() - timedelta(hours=2)
+        pred = self._predict(2, kickoff)
+        fetch.return_value = _football(2, '2H', kickoff)
+
+        self._settle()
+        check = FixtureCheck.objects.get()
+        self.assertEqual((check.attempts, check.last_status), (1, '2H'))
+        self.assertAlmostEqual(check.next_check_at - timezone.now(), scheduling.RECHECK_BASE, delta=timedelta(seconds=5))
+
+        # Not due yet: no call.
+        self._settle()
+        self.assertEqual(fetch.call_count, 1)
+
+        FixtureCheck.objects.update(next_check_at=timezone.now())
+        self._settle()
+        check.refresh_from_db()
+        self.assertEqual(check.attempts, 2)
+        self.assertAlmostEqual(check.next_check_at - timezone.now(), scheduling.RECHECK_BASE * 2, delta=timedelta(seconds=5))
+
+        FixtureCheck.objects.update(next_check_at=timezone.now())
+        fetch.return_value = _football(2, 'FT', kickoff, goals=(2, 1))
+        self._settle()
+        pred.refresh_from_db()
+        self.assertEqual(pred.outcome, 'CORRECT')
+        self.assertFalse(FixtureCheck.objects.exists())
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_postponed_kickoff_moves_next_check(self, fetch):
+        self._predict(3)  # unknown kickoff: checked right away
+        new_kickoff = timezone.now() + timedelta(days=1)
+        fetch.return_value = _football(3, 'NS', new_kickoff)
+
+        self._settle()
+
+        check = FixtureCheck.objects.get()
+        self.assertEqual(check.attempts, 0)
+        self.assertEqual(check.next_check_at, new_kickoff + timedelta(minutes=115))
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_rate_limit_stops_the_run(self, fetch):
+        self._predict(4)
+        self._predict(5)
+        fetch.side_effect = sports_api.SportsAPIRateLimited('429', retry_after=30)
+
+        self._settle()
+
+        self.assertEqual(fetch.call_count, 1)
+        checks = FixtureCheck.objects.order_by('next_check_at')
+        self.assertLessEqual(checks[0].next_check_at, timezone.now())
+        self.assertEqual(checks[1].last_status, 'rate_limited')
+        self.assertAlmostEqual(checks[1].next_check_at - timezone.now(), timedelta(seconds=30), delta=timedelta(seconds=5))
+        # The fixture not reached is given back to the other workers.
+        self.assertFalse(FixtureCheck.objects.exclude(leased_by='').exists())
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_streams_fixture_groups_in_small_chunks(self, fetch):
+        from gamification.models import UserGlobalStats
+        for fixture_id in (7, 6, 7, 6, 8):
+            self._predict(fixture_id)
+        self._predict(6, timezone.now() + timedelta(days=2), sport='BASKETBALL')  # same id, not due
+        fetch.side_effect = lambda fixture_id: _football(fixture_id, 'FT', goals=(1, 0) if fixture_id != 8 else (0, 1))
+
+        call_command('settle_predictions', chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(sorted(call.args[0] for call in fetch.call_args_list), [6, 7, 8])
+        outcomes = Prediction.objects.filter(sport='FOOTBALL').values_list('api_fixture_id', 'outcome')
+        self.assertEqual(sorted(outcomes), [(6, 'CORRECT'), (6, 'CORRECT'), (7, 'CORRECT'), (7, 'CORRECT'), (8, 'INCORRECT')])
+        self.assertEqual(Prediction.objects.get(sport='BASKETBALL').outcome, 'PENDING')
+        self.assertEqual(list(FixtureCheck.objects.values_list('sport', 'api_fixture_id')), [('BASKETBALL', 6)])
+        stats = UserGlobalStats.objects.get(user=self.ticket.author)
+        self.assertEqual((stats.total_bets, stats.wins, stats.losses), (5, 4, 1))
+
+
+class SettlementLeaseTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='leaser', password='p')
+        ticket = BetTicket.objects.create(author=user, match_title='A vs B', selection='1', odds=Decimal('2.00'), stake=Decimal('10'))
+        for fixture_id in (11, 12, 13):
+            Prediction.objects.create(
+                bet_ticket=ticket, match_title='A vs B', sport='FOOTBALL', prediction_type='MATCH_RESULT',
+                prediction_value='Home Win', api_fixture_id=fixture_id,
+            )
+        scheduling.enqueue_pending()
+
+    def test_workers_claim_disjoint_fixtures(self):
+        first = scheduling.claim_due('worker-a', limit=2)
+        second = scheduling.claim_due('worker-b', limit=10)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({c.pk for c in first} & {c.pk for c in second})
+        self.assertEqual(scheduling.claim_due('worker-c', limit=10), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        scheduling.claim_due('crashed', limit=10)
+        later = timezone.now() + timedelta(seconds=settings.SETTLEMENT_LEASE_SECONDS + 1)
+
+        reclaimed = scheduling.claim_due('survivor', limit=10, now=later)
+
+        self.assertEqual(len(reclaimed), 3)
+        self.assertEqual(set(FixtureCheck.objects.values_list('leased_by', flat=True)), {'survivor'})
+
+    def test_renew_and_release(self):
+        scheduling.claim_due('worker-a', limit=10)
+        later = timezone.now() + timedelta(seconds=settings.SETTLEMENT_LEASE_SECONDS + 1)
+        scheduling.renew_leases('worker-a', now=later)
+
+        self.assertEqual(scheduling.claim_due('worker-b', limit=10, now=later), [])
+        self.assertEqual(scheduling.release_leases('worker-a'), 3)
+        self.assertEqual(len(scheduling.claim_due('worker-b', limit=10, now=later)), 3)
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_lost_lease_is_not_settled(self, fetch):
+        def slow_fetch(fixture_id):
+            # Lease expired during the call and another worker took the fixture over.
+            FixtureCheck.objects.filter(api_fixture_id=fixture_id).update(leased_by='other')
+            return _football(fixture_id, 'FT', goals=(1, 0))
+        fetch.side_effect = slow_fetch
+
+        call_command('settle_predictions', worker_id='me', stdout=StringIO())
+
+        self.assertEqual(fetch.call_count, 3)
+        self.assertFalse(Prediction.objects.exclude(outcome='PENDING').exists())
+        self.assertEqual(set(FixtureCheck.objects.values_list('leased_by', flat=True)), {'other'})
+
+
+class MarketTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username='markets', password='p')
+        self.ticket = BetTicket.objects.create(author=user, match_title='A vs B', selection='1', odds=Decimal('2.00'), stake=Decimal('10'))
+
+    def _predict(self, prediction_type, value, **kwargs):
+        return Prediction.objects.create(
+            bet_ticket=self.ticket, match_title='A vs B', prediction_type=prediction_type, prediction_value=value, **kwargs,
+        )
+
+    def test_parsed_on_create(self):
+        over = self._predict('OVER_UNDER', ' over 2.5 ')
+        score = self._predict('CORRECT_SCORE', '2:1')
+        scorer = self._predict('GOALSCORER', 'Mbappé')
+
+        self.assertEqual((over.market_side, over.market_line), ('OVER', 2.5))
+        self.assertEqual((score.market_side, score.market_home, score.market_away), ('SCORE', 2, 1))
+        self.assertEqual(scorer.market, markets.Market('SCORER', player='mbappé'))
+
+    def test_unparseable_value_is_flagged_on_create(self):
+        pred = self._predict('OVER_UNDER', 'Over many goals')
+
+        self.assertEqual(pred.market_side, '')
+        self.assertIn('no line', pred.market_error)
+        self.assertIsNone(pred.market)
+        self.assertEqual(self._predict('HANDICAP', '-1.5').market_error, 'HANDICAP predictions are not verifiable')
+
+    def test_edited_value_is_parsed_again(self):
+        pred = self._predict('OVER_UNDER', 'Over 2.5')
+        pred.prediction_value = 'Under 3.5'
+        pred.save()
+        pred = Prediction.objects.get(pk=pred.pk)
+        self.assertEqual((pred.market_side, pred.market_line), ('UNDER', 3.5))
+
+        pred.prediction_type, pred.prediction_value = 'CORRECT_SCORE', '1-0'
+        pred.save(update_fields=['prediction_type', 'prediction_value'])
+        pred = Prediction.objects.get(pk=pred.pk)
+        self.assertEqual((pred.market_side, pred.market_home, pred.market_away, pred.market_line), ('SCORE', 1, 0, None))
+
+        with patch('bets.prediction_models.parse_market') as parse:
+            pred.resolve('CORRECT')
+        parse.assert_not_called()
+
+    def test_batch_evaluation_matches_verify_prediction(self):
+        cases = [
+            ('MATCH_RESULT', '1'), ('MATCH_RESULT', 'Draw'), ('MATCH_RESULT', 'extérieur'), ('MATCH_RESULT', '?'),
+            ('OVER_UNDER', 'Over 2.5'), ('OVER_UNDER', 'Under 3.5'), ('OVER_UNDER', 'Over'),
+            ('BTTS', 'Oui'), ('BTTS', 'No'), ('DOUBLE_CHANCE', 'X2'), ('DOUBLE_CHANCE', '12'),
+            ('CORRECT_SCORE', '2-1'), ('CORRECT_SCORE', '1-1'), ('GOALSCORER', 'Mbappé'), ('GOALSCORER', 'Haaland'),
+            ('WINNER', 'Sinner'), ('TOTAL_POINTS', '+210.5'), ('TOTAL_POINTS', 'Under 2'), ('OTHER', 'x'),
+        ]
+        events = [{'type': 'Goal', 'player': {'name': 'Kylian Mbappé'}}, {'type': 'Card', 'player': {'name': 'Haaland'}}]
+        for score in ({'home': 2, 'away': 1}, {'home': 0, 'away': 0}, {'home': None, 'away': None}):
+            parsed = []
+            for prediction_type, value in cases:
+                try:
+                    parsed.append(markets.parse_market(prediction_type, value))
+                except markets.MarketError:
+                    parsed.append(None)
+            self.assertEqual(
+                markets.evaluate_markets(parsed, score, events),
+                [verify_prediction(prediction_type, value, score, events=events) for prediction_type, value in cases],
+            )
+        self.assertEqual(markets.evaluate_markets([markets.Market('SCORER', player='mbappé')], {'home': 1, 'away': 0}), ['UNVERIFIABLE'])
+
+    @patch(f'{COMMAND}.get_football_fixture')
+    def test_bulk_created_rows_are_parsed_at_settlement(self, fetch):
+        Prediction.objects.bulk_create([
+            Prediction(bet_ticket=self.ticket, match_title='A vs B', prediction_type='OVER_UNDER', prediction_value='Over 2.5', api_fixture_id=21),
+            Prediction(bet_ticket=self.ticket, match_title='A vs B', prediction_type='CORRECT_SCORE', prediction_value='two-one', api_fixture_id=21),
+        ])
+        fetch.return_value = _football(21, 'FT', goals=(2, 1))
+
+        call_command('settle_predictions', stdout=StringIO())
+
+        over, score = Prediction.objects.order_by('prediction_type').reverse()
+        self.assertEqual((over.outcome, over.market_side, over.market_line), ('CORRECT', 'OVER', 2.5))
+        self.assertEqual(score.outcome, 'UNVERIFIABLE')
+        self.assertIn('no score', score.market_error)
@@ -56,6 +56,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'whitenoise.runserver_nostatic',
@@ -80,6 +81,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -119,6 +121,25 @@ DATABASES = {
     'default': env.db('DATABASE_URL', default='postgres://betadvisor:betadvisor@db:5432/betadvisor')
 }
 
+# Cache (core/cache.py). CACHE_URL examples:
+#   locmemcache://                    per-process memory (default)
+#   filecache:///var/tmp/django_cache shared by the workers of one host
+#   redis://redis:6379/1              shared by every host (needs the `redis` package)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://')
+}
+if CACHES['default']['BACKEND'].endswith('RedisCache'):
+    try:
+        import redis  # noqa: F401
+    except ImportError:
+        warnings.warn("CACHE_URL points to Redis but the redis package is not installed; using local memory.")
+        CACHES['default'] = env.cache_url_config('locmemcache://')
+CACHES['default'].setdefault('KEY_PREFIX', 'betadvisor')
+# Seconds the public leaderboard is served from cache.
+LEADERBOARD_CACHE_TIMEOUT = env.int("LEADERBOARD_CACHE_TIMEOUT", default=60)
+# Seconds results for 1-2 character user searches (prefix matches) are cached.
+USER_SEARCH_CACHE_TIMEOUT = env.int("USER_SEARCH_CACHE_TIMEOUT", default=300)
+
 # ─────────────────────────────────────────────────────────────
 # STRIPE CONFIGURATION
 # ─────────────────────────────────────────────────────────────
@@ -132,6 +153,14 @@ STRIPE_PUBLISHABLE_KEY = env('STRIPE_PUBLISHABLE_KEY', default='')
 # This keeps imports and non-payment checks healthy even when Stripe is not configured.
 STRIPE_WEBHOOK_SECRET = env('STRIPE_LIVE_WEBHOOK_SECRET', default='') or env('STRIPE_WEBHOOK_SECRET', default='')
 
+# Webhook events are stored on receipt and processed by `manage.py process_stripe_events`.
+# After this many failed attempts an event is moved to the dead-letter state.
+STRIPE_WEBHOOK_MAX_ATTEMPTS = env.int('STRIPE_WEBHOOK_MAX_ATTEMPTS', default=8)
+# An invoice event still waiting for its subscription's checkout this many hours
+# after receipt (checkout dead-lettered, subscription created outside this app)
+# is moved to the dead-letter state.
+STRIPE_WEBHOOK_WAITING_HOURS = env.int('STRIPE_WEBHOOK_WAITING_HOURS', default=24)
+
 # Platform Stripe Account
 STRIPE_PLATFORM_ACCOUNT_ID = env('STRIPE_PLATFORM_ACCOUNT_ID', default='')
 
@@ -269,18 +298,91 @@ EMAIL_HOST_USER = env("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD", default="")
 EMAIL_USE_TLS = env.bool("EMAIL_USE_TLS", default=True)
 
+# Outbox: emails are queued in notifications.OutboundEmail and delivered by
+# `manage.py send_queued_emails`. Identical messages within the window are sent once.
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", default=5)
+EMAIL_OUTBOX_DEDUPE_WINDOW = env.int("EMAIL_OUTBOX_DEDUPE_WINDOW", default=3600)  # seconds
+# Seconds a sender holds a claimed batch before another one may take it over.
+EMAIL_OUTBOX_LEASE = env.int("EMAIL_OUTBOX_LEASE", default=300)
+
 # ─────────────────────────────────────────────────────────────
 # SPORTS API — API-Sports.io + API-Tennis (auto-settlement)
 # ─────────────────────────────────────────────────────────────
 API_SPORTS_KEY = env("API_SPORTS_KEY", default="")
 API_TENNIS_KEY = env("API_TENNIS_KEY", default="")  # Separate subscription; falls back to API_SPORTS_KEY in sports_api.py
+# Overrides the *.api-sports.io hosts, e.g. http://127.0.0.1:8089 for `manage.py fake_sports_api`.
+API_SPORTS_BASE_URL = env("API_SPORTS_BASE_URL", default="")
 
 # ─────────────────────────────────────────────────────────────
 # FILE UPLOAD LIMITS (S8-06)
 # ─────────────────────────────────────────────────────────────
-FILE_UPLOAD_MAX_MEMORY_SIZE = 5 * 1024 * 1024   # 5 MB
+MAX_UPLOAD_FILE_SIZE = 5 * 1024 * 1024          # 5 MB per file, checked while streaming
+# Files are streamed to a temp file in chunks (hashed + size-checked), never buffered whole.
+FILE_UPLOAD_HANDLERS = ['core.upload_handlers.HashingFileUploadHandler']
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024        # only used if the memory handler is re-enabled
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB (for multipart)
 
+# ─────────────────────────────────────────────────────────────
+# OCR IMAGE PREPROCESSING (tickets/preprocessing.py)
+# ─────────────────────────────────────────────────────────────
+# Gemini tiles images into 768px squares; 2 tiles on the long edge keep ticket text legible.
+OCR_IMAGE_MAX_DIMENSION = env.int("OCR_IMAGE_MAX_DIMENSION", default=1536)
+OCR_IMAGE_FORMAT = env("OCR_IMAGE_FORMAT", default="WEBP")  # WEBP or JPEG
+OCR_IMAGE_QUALITY = env.int("OCR_IMAGE_QUALITY", default=80)
+# Reject images whose decoded size would blow up worker memory (40 MP ≈ 120 MB RGB).
+OCR_MAX_IMAGE_PIXELS = env.int("OCR_MAX_IMAGE_PIXELS", default=40_000_000)
+# Tiered OCR (tickets/ocr_tiers.py): the fast model on a smaller image first,
+# the full model on the stored image only when the fast result does not validate.
+OCR_TIERED = env.bool("OCR_TIERED", default=True)
+OCR_FAST_MODEL = env("OCR_FAST_MODEL", default="gemini-2.0-flash-lite")
+OCR_FAST_MAX_DIMENSION = env.int("OCR_FAST_MAX_DIMENSION", default=768)
+OCR_FULL_MODEL = env("OCR_FULL_MODEL", default="gemini-2.0-flash")
+# Images decoded at the same time per process; extra uploads wait instead of adding memory.
+IMAGE_DECODE_CONCURRENCY = env.int("IMAGE_DECODE_CONCURRENCY", default=4)
+
+# Small/medium/large WebP variants of tickets and avatars (core/image_variants.py).
+# Generated in a background thread after upload; set False to build them inline.
+IMAGE_VARIANTS_ASYNC = env.bool("IMAGE_VARIANTS_ASYNC", default=True)
+
+# Gemini calls per process (tickets/gemini_governor.py): concurrency, request
+# rate, retries on 429/503, and a circuit breaker opening for COOLDOWN seconds
+# after THRESHOLD failed calls in a row (tickets then wait as PENDING_OCR).
+GEMINI_MAX_CONCURRENCY = env.int("GEMINI_MAX_CONCURRENCY", default=4)
+GEMINI_REQUESTS_PER_MINUTE = env.int("GEMINI_REQUESTS_PER_MINUTE", default=60)
+GEMINI_MAX_RETRIES = env.int("GEMINI_MAX_RETRIES", default=3)
+GEMINI_BREAKER_THRESHOLD = env.int("GEMINI_BREAKER_THRESHOLD", default=5)
+GEMINI_BREAKER_COOLDOWN = env.int("GEMINI_BREAKER_COOLDOWN", default=60)
+
+# Long-poll GET /api/tickets/<id>/wait/ (tickets/events.py): longest block in
+# seconds, and how often a waiter re-checks the database if no event reaches it.
+TICKET_WAIT_TIMEOUT = env.int("TICKET_WAIT_TIMEOUT", default=25)
+TICKET_WAIT_RECHECK = env.float("TICKET_WAIT_RECHECK", default=5.0)
+# Wake waiters in other gunicorn workers through Postgres LISTEN/NOTIFY.
+TICKET_EVENTS_LISTEN = env.bool("TICKET_EVENTS_LISTEN", default=True)
+# Long-polls open at once per gunicorn worker; each holds one of its threads.
+# With --threads 4 (Dockerfile.prod), 2 leaves half of every worker to the
+# rest of the API. Extra waits get 429 + Retry-After (seconds).
+TICKET_WAIT_MAX_WAITERS = env.int("TICKET_WAIT_MAX_WAITERS", default=2)
+TICKET_WAIT_RETRY_AFTER = env.int("TICKET_WAIT_RETRY_AFTER", default=3)
+
+# POST /api/tickets/batch/: most images accepted in one upload.
+TICKET_BATCH_MAX_IMAGES = env.int("TICKET_BATCH_MAX_IMAGES", default=20)
+
+# Seconds a settlement worker holds a fixture (bets/scheduling.py). Renewed
+# before each sports API call; a crashed worker's fixtures are taken over
+# once it expires.
+SETTLEMENT_LEASE_SECONDS = env.int("SETTLEMENT_LEASE_SECONDS", default=300)
+
+# ─────────────────────────────────────────────────────────────
+# REQUEST PROFILING (core/perf.py, core/middleware.py)
+# ─────────────────────────────────────────────────────────────
+# Share of requests whose query count / DB time / serializer time are kept in a
+# per-process ring buffer, summarized per route at /api/_perf/ (admin only).
+PERF_SAMPLE_RATE = env.float("PERF_SAMPLE_RATE", default=0.1)
+PERF_BUFFER_SIZE = env.int("PERF_BUFFER_SIZE", default=2000)
+# Measure every request and add X-Query-Count / X-DB-Time-Ms / X-Serializer-Time-Ms headers.
+PERF_QUERY_COUNT_HEADER = env.bool("PERF_QUERY_COUNT_HEADER", default=False)
+
 # ─────────────────────────────────────────────────────────────
 # PUSH NOTIFICATIONS (Expo Push API)
 # ─────────────────────────────────────────────────────────────
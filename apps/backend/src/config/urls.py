@@ -8,6 +8,7 @@ from rest_framework.routers import DefaultRouter
 from api.views import BetViewSet, MyProfileView, MyProfileUpdateView
 from users.views import UserViewSet
 from subscriptions.views import StripeWebhookView, MySubscriptionsView, TipsterDashboardView
+from core.views import PerfSummaryView
 
 # Router DRF standard
 router = DefaultRouter()
@@ -18,6 +19,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     # Routes API
     path('api/health/', lambda r: JsonResponse({'status': 'ok'})),
+    path('api/_perf/', PerfSummaryView.as_view(), name='perf-summary'),
     path('api/', include(router.urls)),
     path('api/me/', MyProfileView.as_view(), name='my-profile'),
     path('api/me/profile/', MyProfileUpdateView.as_view(), name='my-profile-update'),
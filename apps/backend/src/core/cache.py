@@ -0,0 +1,170 @@
+"""
+Shared caching helpers on top of Django's cache framework (CACHES['default'],
+configured through CACHE_URL: local memory, file-based or Redis).
+
+    from core import cache
+
+    data = cache.get_or_set('leaderboard', 'top50', compute, timeout=60)
+    cache.invalidate('leaderboard')     # drops every key of the namespace
+
+Keys look like '<namespace>:v<version>:<key>'. Invalidating a namespace bumps
+its version, so stale entries are never read again and simply expire.
+
+Recomputation is single-flight: on a miss one caller takes a short lock and
+computes while the others wait for its result. Entries also refresh a little
+before they expire, with a probability growing as expiry nears (weighted by
+how long the value took to compute), so a hot key is recomputed by one
+request ahead of time instead of by every request right after it expires.
+
+Hits, misses, waits and refreshes are counted per namespace and per process;
+`metrics()` is included in /api/_perf/.
+"""
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import caches
+
+# A computation holding the lock longer than this is assumed dead.
+LOCK_TIMEOUT = 30
+# How long callers wait for another process's computation before doing it themselves.
+LOCK_WAIT = 5
+LOCK_POLL_INTERVAL = 0.05
+# >1 refreshes earlier, <1 later; 1 is the usual choice.
+EARLY_REFRESH_BETA = 1.0
+
+_metrics = defaultdict(Counter)
+_metrics_lock = threading.Lock()
+
+
+def _backend():
+    return caches['default']
+
+
+def _count(namespace, event):
+    with _metrics_lock:
+        _metrics[namespace][event] += 1
+
+
+def _version_key(namespace):
+    return f"{namespace}:version"
+
+
+def version(namespace):
+    backend = _backend()
+    current = backend.get(_version_key(namespace))
+    if current is None:
+        backend.add(_version_key(namespace), 1, timeout=None)
+        current = backend.get(_version_key(namespace)) or 1
+    return current
+
+
+def make_key(namespace, key):
+    """Full cache key; `key` may be a string or a tuple of parts."""
+    if isinstance(key, (tuple, list)):
+        key = ':'.join(str(part) for part in key)
+    return f"{namespace}:v{version(namespace)}:{key}"
+
+
+def invalidate(namespace):
+    """Make every cached key of `namespace` unreachable."""
+    backend = _backend()
+    try:
+        backend.incr(_version_key(namespace))
+    except ValueError:
+        # Version key missing (evicted or never set): any new value differs from the old one.
+        backend.set(_version_key(namespace), int(time.time()), timeout=None)
+    _count(namespace, 'invalidations')
+
+
+def get(namespace, key, default=None):
+    entry = _backend().get(make_key(namespace, key))
+    if entry is None:
+        _count(namespace, 'misses')
+        return default
+    _count(namespace, 'hits')
+    return entry[0]
+
+
+def set(namespace, key, value, timeout):
+    _store(make_key(namespace, key), value, timeout, compute_time=0.0)
+
+
+def delete(namespace, key):
+    _backend().delete(make_key(namespace, key))
+
+
+def _store(full_key, value, timeout, compute_time):
+    expires_at = time.time() + timeout if timeout else None
+    _backend().set(full_key, (value, expires_at, compute_time), timeout)
+
+
+def _compute_and_store(full_key, compute, timeout):
+    started = time.perf_counter()
+    value = compute()
+    _store(full_key, value, timeout, time.perf_counter() - started)
+    return value
+
+
+def _should_refresh_early(expires_at, compute_time):
+    if not expires_at or not compute_time:
+        return False
+    # 1 - random() is in (0, 1], so the log is defined.
+    return time.time() - compute_time * EARLY_REFRESH_BETA * math.log(1 - random.random()) >= expires_at
+
+
+def get_or_set(namespace, key, compute, timeout):
+    """
+    Cached value of `compute()` for `timeout` seconds, computed at most once
+    at a time per key (across processes when the backend is shared).
+    """
+    backend = _backend()
+    full_key = make_key(namespace, key)
+    lock_key = f"{full_key}:lock"
+
+    entry = backend.get(full_key)
+    if entry is not None:
+        value, expires_at, compute_time = entry
+        if _should_refresh_early(expires_at, compute_time) and backend.add(lock_key, 1, LOCK_TIMEOUT):
+            _count(namespace, 'early_refreshes')
+            try:
+                return _compute_and_store(full_key, compute, timeout)
+            finally:
+                backend.delete(lock_key)
+        _count(namespace, 'hits')
+        return value
+
+    _count(namespace, 'misses')
+    if backend.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            return _compute_and_store(full_key, compute, timeout)
+        finally:
+            backend.delete(lock_key)
+
+    # Someone else is computing it: wait for their result rather than piling on.
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = backend.get(full_key)
+        if entry is not None:
+            _count(namespace, 'waits')
+            return entry[0]
+    _count(namespace, 'lock_timeouts')
+    return _compute_and_store(full_key, compute, timeout)
+
+
+def metrics():
+    """Per-namespace counters for this process, with the hit rate."""
+    with _metrics_lock:
+        snapshot = {namespace: dict(counter) for namespace, counter in _metrics.items()}
+    for counter in snapshot.values():
+        lookups = counter.get('hits', 0) + counter.get('misses', 0)
+        counter['hit_rate'] = round(counter.get('hits', 0) / lookups, 4) if lookups else None
+    return snapshot
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
@@ -0,0 +1,181 @@
+"""
+Derived image variants (small / medium / large WebP) for uploaded media.
+
+Each image field registered in IMAGE_VARIANT_FIELDS has a sibling JSONField
+holding the storage names of its variants plus the source they were built from:
+
+    {"source": "tickets/abc.webp", "small": "variants/tickets/abc_small.webp", ...}
+
+Variants are generated after the upload commits (see core.signals) or by the
+`generate_image_variants` backfill command. Serializers read URLs through
+`variant_urls()` / `variant_url()`, which fall back to the original while
+variants are missing.
+"""
+import io
+import logging
+import os
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels, largest first so each variant is resized from the previous one.
+VARIANT_SIZES = {
+    'large': 1080,
+    'medium': 480,
+    'small': 160,
+}
+VARIANT_QUALITY = 80
+VARIANT_PREFIX = 'variants'
+
+# (model label, image field, variants JSON field)
+IMAGE_VARIANT_FIELDS = [
+    ('tickets.Ticket', 'image', 'image_variants'),
+    ('bets.BetTicket', 'ticket_image', 'image_variants'),
+    ('users.CustomUser', 'avatar', 'avatar_variants'),
+]
+
+
+def variant_name(source_name, size):
+    stem = os.path.splitext(source_name)[0]
+    return f"{VARIANT_PREFIX}/{stem}_{size}.webp"
+
+
+def render_variants(data):
+    """Decode image bytes once and return {size: webp_bytes} for every variant."""
+    rendered = {}
+    with Image.open(io.BytesIO(data)) as source:
+        if source.format == 'JPEG':
+            largest = max(VARIANT_SIZES.values())
+            scale = min(1.0, largest / max(source.size))
+            source.draft('RGB', (max(1, int(source.width * scale)), max(1, int(source.height * scale))))
+        image = ImageOps.exif_transpose(source)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    for size, max_dimension in VARIANT_SIZES.items():
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format='WEBP', quality=VARIANT_QUALITY, method=2)
+        rendered[size] = out.getvalue()
+    return rendered
+
+
+def read_source(field_file):
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        return f.read()
+
+
+def store_variants(field_file, rendered):
+    """Save rendered variants next to the source; returns the variants mapping."""
+    storage = field_file.storage
+    variants = {'source': field_file.name}
+    for size, content in rendered.items():
+        name = variant_name(field_file.name, size)
+        if storage.exists(name):
+            storage.delete(name)
+        variants[size] = storage.save(name, ContentFile(content))
+    return variants
+
+
+def build_variants(field_file):
+    """Render and store the variants of `field_file`; returns the variants mapping."""
+    return store_variants(field_file, render_variants(read_source(field_file)))
+
+
+def needs_variants(instance, image_field, variants_field):
+    field_file = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    if not field_file:
+        return bool(variants)
+    return variants.get('source') != field_file.name
+
+
+def ensure_variants(model, pk, image_field, variants_field):
+    """
+    (Re)build variants for one row if its image changed. Saves with a queryset
+    update so no save signals fire again. Returns True if anything was written.
+    """
+    instance = model.objects.filter(pk=pk).only(image_field, variants_field).first()
+    if instance is None or not needs_variants(instance, image_field, variants_field):
+        return False
+
+    field_file = getattr(instance, image_field)
+    previous = getattr(instance, variants_field) or {}
+    variants = {}
+    if field_file:
+        try:
+            variants = build_variants(field_file)
+        except Exception:
+            logger.exception(f"Image variants failed for {model._meta.label} {pk}")
+            return False
+
+    save_variants(model, pk, field_file, variants_field, previous, variants)
+    return True
+
+
+def save_variants(model, pk, field_file, variants_field, previous, variants):
+    """Store the new mapping and delete variants of the replaced image."""
+    fields = {variants_field: variants}
+    # A queryset update skips auto_now: bump it so ETags built on it change.
+    for field in model._meta.concrete_fields:
+        if getattr(field, 'auto_now', False):
+            fields[field.attname] = timezone.now()
+    model.objects.filter(pk=pk).update(**fields)
+    stale = {name for key, name in previous.items() if key in VARIANT_SIZES} - set(variants.values())
+    for name in stale:
+        field_file.storage.delete(name)
+
+
+def _ensure_variants_in_thread(*args):
+    try:
+        ensure_variants(*args)
+    finally:
+        connection.close()
+
+
+def schedule_variants(model, pk, image_field, variants_field):
+    """Generate variants in the background (or inline when IMAGE_VARIANTS_ASYNC is off)."""
+    args = (model, pk, image_field, variants_field)
+    if not settings.IMAGE_VARIANTS_ASYNC:
+        ensure_variants(*args)
+        return
+    threading.Thread(target=_ensure_variants_in_thread, args=args, daemon=True).start()
+
+
+def iter_variant_fields():
+    for label, image_field, variants_field in IMAGE_VARIANT_FIELDS:
+        yield apps.get_model(label), image_field, variants_field
+
+
+def _absolute(url, request):
+    return request.build_absolute_uri(url) if request else url
+
+
+def variant_urls(field_file, variants, request=None):
+    """
+    URLs for every variant plus the original, or None without an image.
+    Missing variants (not generated yet) fall back to the original URL.
+    """
+    if not field_file:
+        return None
+    original = field_file.url
+    current = variants if variants and variants.get('source') == field_file.name else {}
+    storage = field_file.storage
+    urls = {
+        size: _absolute(storage.url(current[size]) if size in current else original, request)
+        for size in VARIANT_SIZES
+    }
+    urls['original'] = _absolute(original, request)
+    return urls
+
+
+def variant_url(field_file, variants, size, request=None):
+    urls = variant_urls(field_file, variants, request)
+    return urls[size] if urls else None
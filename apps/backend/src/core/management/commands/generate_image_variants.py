@@ -0,0 +1,88 @@
+"""
+Backfill small/medium/large WebP variants for existing ticket and avatar media.
+
+Decoding and resizing run in a process pool; storage reads/writes and database
+updates stay in the main process.
+
+Usage:
+    python manage.py generate_image_variants
+    python manage.py generate_image_variants --workers 8 --model tickets.Ticket
+    python manage.py generate_image_variants --force      # rebuild everything
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.image_variants import (
+    iter_variant_fields, needs_variants, read_source, render_variants, save_variants, store_variants,
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP variants for existing ticket, bet and avatar images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--model', action='append', help='Limit to a model label (repeatable), e.g. users.CustomUser')
+        parser.add_argument('--force', action='store_true', help='Rebuild variants that are already up to date.')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        done = failed = 0
+        # Bound the images held in memory at once.
+        max_in_flight = options['workers'] * 4
+
+        close_old_connections()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            pending = {}
+
+            def drain(return_when):
+                nonlocal done, failed
+                finished, _ = wait(pending, return_when=return_when)
+                for future in finished:
+                    model, pk, field_file, variants_field, previous = pending.pop(future)
+                    try:
+                        variants = store_variants(field_file, future.result())
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"{model._meta.label} {pk}: {e}")
+                        continue
+                    save_variants(model, pk, field_file, variants_field, previous, variants)
+                    done += 1
+
+            for model, image_field, variants_field in iter_variant_fields():
+                if options['model'] and model._meta.label not in options['model']:
+                    continue
+                rows = (
+                    model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+                    .only('pk', image_field, variants_field)
+                    .iterator(chunk_size=500)
+                )
+                for instance in rows:
+                    if not options['force'] and not needs_variants(instance, image_field, variants_field):
+                        continue
+                    field_file = getattr(instance, image_field)
+                    try:
+                        data = read_source(field_file)
+                    except Exception as e:
+                        failed += 1
+                        self.stderr.write(f"{model._meta.label} {instance.pk}: {e}")
+                        continue
+                    future = pool.submit(render_variants, data)
+                    pending[future] = (
+                        model, instance.pk, field_file, variants_field,
+                        getattr(instance, variants_field) or {},
+                    )
+                    if len(pending) >= max_in_flight:
+                        drain(FIRST_COMPLETED)
+
+            while pending:
+                drain(FIRST_COMPLETED)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated variants for {done} image(s), {failed} failed, "
+            f"in {time.perf_counter() - start:.1f}s with {options['workers']} worker(s)."
+        ))
@@ -0,0 +1,69 @@
+"""
+Profile the main read endpoints through the full middleware stack and print
+p50/p95 duration, query count, DB time, serializer time and response size per
+route (same numbers as /api/_perf/, but for every request).
+
+Usage:
+    python manage.py profile_endpoints --user alice
+    python manage.py profile_endpoints --user alice --requests 50 --path /api/bets/?author=<id>
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from core import perf
+
+DEFAULT_PATHS = [
+    '/api/me/',
+    '/api/bets/',
+    '/api/users/leaderboard/',
+    '/api/users/{user_id}/',
+    '/api/tickets/list/',
+    '/api/me/notifications/',
+    '/api/me/subscriptions/',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure query count and latency percentiles of the main API endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username to authenticate as.')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per endpoint.')
+        parser.add_argument('--path', action='append', help='Endpoint to profile (repeatable); defaults to the main feeds.')
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User '{options['user']}' not found")
+
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user=user)
+        paths = [path.format(user_id=user.pk) for path in options['path'] or DEFAULT_PATHS]
+
+        with override_settings(ALLOWED_HOSTS=['testserver'], PERF_SAMPLE_RATE=1.0):
+            # Warm-up pass: first-hit imports and connection setup are not representative.
+            for path in paths:
+                client.get(path)
+            perf.reset()
+            for path in paths:
+                for _ in range(options['requests']):
+                    response = client.get(path)
+                if response.status_code >= 400:
+                    self.stderr.write(f"{path}: HTTP {response.status_code}")
+            records = perf.samples()
+            perf.reset()
+
+        self.stdout.write(
+            f"{'route':<40} {'n':>4} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} "
+            f"{'db ms':>7} {'ser ms':>7} {'KB':>7}"
+        )
+        for row in perf.summarize(records):
+            self.stdout.write(
+                f"{row['method'] + ' ' + row['route']:<40} {row['count']:>4} "
+                f"{row['duration_ms']['p50']:>8.1f} {row['duration_ms']['p95']:>8.1f} "
+                f"{row['query_count']['p95']:>8} {row['db_ms']['p95']:>7.1f} "
+                f"{row['serializer_ms']['p95']:>7.1f} {row['response_bytes']['p95'] / 1024:>7.1f}"
+            )
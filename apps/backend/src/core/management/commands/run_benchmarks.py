@@ -0,0 +1,212 @@
+"""
+run_benchmarks — Latency and query counts of the hot paths, as JSON.
+
+Run against a database seeded with `seed_benchmark`. Every scenario gets one
+warm-up run, then --iterations measured runs; writes (like toggle, settlement,
+stats recalculation) are rolled back after each run so results do not drift.
+The sports API is stubbed, nothing goes over the network.
+
+Usage:
+    python manage.py run_benchmarks --output bench-$(git rev-parse --short HEAD).json
+    python manage.py run_benchmarks --only feed --only leaderboard --iterations 50
+    python manage.py run_benchmarks --compare bench-main.json
+"""
+import json
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bets.models import BetTicket
+from bets.prediction_models import Prediction
+from core import perf
+from core.management.commands.seed_benchmark import PREFIX
+from social.models import Like
+from tickets.models import BetSelection, Ticket
+from users.models import CustomUser
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def _rolled_back():
+    """Run the block in a transaction that is always rolled back."""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def _fake_api_request(host, endpoint, params=None, use_tennis_key=False):
+    """Offline stand-in for bets.sports_api._api_request: every fixture ended 2-1."""
+    if endpoint == 'fixtures/events':
+        return []
+    fixture_id = (params or {}).get('id')
+    return [{
+        'fixture': {'id': fixture_id, 'status': {'short': 'FT'}},
+        'goals': {'home': 2, 'away': 1},
+        'status': {'short': 'FT'},
+        'scores': {'home': {'total': 2}, 'away': {'total': 1}},
+    }]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, timeout=5, cwd=settings.BASE_DIR,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API paths and batch jobs; prints JSON results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Measured runs per HTTP scenario.')
+        parser.add_argument('--job-iterations', type=int, default=3, help='Measured runs per batch job scenario.')
+        parser.add_argument('--only', action='append', help='Run only this scenario (repeatable).')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--compare', help='Previous JSON report; prints p50/query deltas to stderr.')
+
+    def handle(self, *args, **options):
+        context = self._context()
+        tipster, ticket_owner = context['tipster'], context['ticket_owner']
+        scenarios = {
+            'feed': (self._http, ('get', '/api/bets/', tipster)),
+            'profile': (self._http, ('get', f"/api/users/{tipster.pk}/", tipster)),
+            'me': (self._http, ('get', '/api/me/', tipster)),
+            'leaderboard': (self._http, ('get', '/api/users/leaderboard/', tipster)),
+            'ticket_list': (self._http, ('get', '/api/tickets/list/', ticket_owner)),
+            'like_toggle': (self._http, ('post', f"/api/social/likes/{context['bet_id']}/toggle/", tipster, True)),
+            'settle_predictions': (self._job, ('settle_predictions',)),
+            'recalculate_stats': (self._job, ('recalculate_stats',)),
+        }
+        unknown = set(options['only'] or []) - set(scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from {', '.join(scenarios)}")
+
+        self.client = APIClient(raise_request_exception=False)
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver'], PERF_SAMPLE_RATE=0.0, PERF_QUERY_COUNT_HEADER=False), \
+                mock.patch('bets.sports_api._api_request', side_effect=_fake_api_request):
+            for name, (runner, args) in scenarios.items():
+                if options['only'] and name not in options['only']:
+                    continue
+                self.stderr.write(f"{name}...")
+                iterations = options['job_iterations'] if runner == self._job else options['iterations']
+                results[name] = self._measure(lambda: runner(*args), iterations)
+
+        report = {
+            'commit': _git_commit(),
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': context['dataset'],
+            'results': results,
+        }
+        payload = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(payload + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(payload)
+
+        if options['compare']:
+            self._compare(options['compare'], results)
+
+    def _context(self):
+        tipster = (
+            CustomUser.objects.filter(username__startswith=PREFIX, tipster_profile__isnull=False)
+            .annotate(bet_count=Count('bets')).order_by('-bet_count').first()
+        )
+        if tipster is None:
+            raise CommandError('No benchmark data found. Run `manage.py seed_benchmark` first.')
+        ticket_owner = Ticket.objects.values('user').annotate(n=Count('id')).order_by('-n').first()
+        return {
+            'tipster': tipster,
+            # The busiest tipster's own bets sit at the head of the like distribution.
+            'bet_id': BetTicket.objects.filter(author=tipster).values_list('id', flat=True).first(),
+            'ticket_owner': CustomUser.objects.get(pk=ticket_owner['user']) if ticket_owner else tipster,
+            'dataset': {
+                'users': CustomUser.objects.count(),
+                'bets': BetTicket.objects.count(),
+                'likes': Like.objects.count(),
+                'pending_predictions': Prediction.objects.filter(outcome=Prediction.Outcome.PENDING).count(),
+                'bet_selections': BetSelection.objects.count(),
+            },
+        }
+
+    def _http(self, method, path, user, rollback=False):
+        self.client.force_authenticate(user=user)
+        if rollback:
+            with _rolled_back():
+                response = getattr(self.client, method)(path)
+        else:
+            response = getattr(self.client, method)(path)
+        return response.status_code
+
+    def _job(self, command):
+        with _rolled_back():
+            call_command(command, stdout=StringIO())
+        return None
+
+    def _measure(self, run, iterations):
+        """One warm-up run, then `iterations` runs with wall time, query count and DB time."""
+        run()
+        durations, queries, db_times, statuses = [], [], [], set()
+        for _ in range(iterations):
+            stats, token = perf.start_request()
+            try:
+                with connection.execute_wrapper(perf.query_timer):
+                    status = run()
+            finally:
+                perf.end_request(token)
+            durations.append((time.perf_counter() - stats.started) * 1000)
+            queries.append(stats.query_count)
+            db_times.append(stats.db_time * 1000)
+            if status is not None:
+                statuses.add(status)
+
+        durations.sort()
+        result = {
+            'iterations': iterations,
+            'p50_ms': round(statistics.median(durations), 2),
+            'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 2),
+            'max_ms': round(durations[-1], 2),
+            'queries': max(queries),
+            'db_ms_p50': round(statistics.median(db_times), 2),
+        }
+        if statuses:
+            result['status_codes'] = sorted(statuses)
+        return result
+
+    def _compare(self, path, results):
+        with open(path) as f:
+            baseline = json.load(f)['results']
+        self.stderr.write(f"{'scenario':<20} {'p50 before':>11} {'p50 after':>10} {'change':>8} {'queries':>12}")
+        for name, result in results.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+            self.stderr.write(
+                f"{name:<20} {before['p50_ms']:>11.1f} {result['p50_ms']:>10.1f} {change:>+7.0f}% "
+                f"{before['queries']:>5} -> {result['queries']:<5}"
+            )
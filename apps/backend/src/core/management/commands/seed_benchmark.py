@@ -0,0 +1,287 @@
+"""
+seed_benchmark — Bulk-load a large, realistic dataset for `run_benchmarks`.
+
+Usage:
+    python manage.py seed_benchmark                  # 100k users, 1M bets, 5M likes
+    python manage.py seed_benchmark --scale 0.01     # 1k users, 10k bets, 50k likes
+    python manage.py seed_benchmark --flush          # remove a previous benchmark dataset first
+
+Creates (at --scale 1):
+    - 100k `bench_*` users (1% tipsters with TipsterProfile), UserGlobalStats for every author
+    - 1M BetTickets, authors skewed towards a few prolific tipsters
+    - 5M likes skewed towards popular bets, 500k follows
+    - 5k pending predictions over 500 fixtures (for settle_predictions)
+    - 20k OCR tickets with 50k settled BetSelections (for recalculate_stats)
+
+Rows go in with bulk_create, so no post_save signals (notifications, image
+variants, stats) fire; profile stats are rebuilt once at the end. Meant for a
+local Postgres: at full scale expect tens of minutes and a few GB of disk.
+"""
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from bets.models import BetTicket
+from bets.prediction_models import Prediction
+from gamification.models import UserGlobalStats
+from gamification.profile_stats import rebuild_profile_stats
+from social.models import Follow, Like
+from sports.models import League, Match, Sport
+from tickets.models import BetSelection, Ticket
+from users.models import CustomUser, TipsterProfile
+
+PREFIX = 'bench_'
+BATCH_SIZE = 5000
+
+DEFAULTS = {
+    'users': 100_000,
+    'bets': 1_000_000,
+    'likes': 5_000_000,
+    'follows': 500_000,
+    'predictions': 5_000,
+    'tickets': 20_000,
+    'selections': 50_000,
+}
+
+MATCHES = [
+    ('PSG', 'Marseille'), ('Real Madrid', 'Barcelona'), ('Liverpool', 'Man City'),
+    ('Bayern Munich', 'Dortmund'), ('Juventus', 'Inter Milan'), ('Lakers', 'Celtics'),
+    ('Djokovic', 'Alcaraz'), ('Sinner', 'Medvedev'), ('France', 'England'), ('Nadal', 'Ruud'),
+]
+SELECTIONS = ['Home Win', 'Away Win', 'Draw', 'Over 2.5', 'Under 2.5', 'BTTS Yes', '1X', 'X2']
+
+
+def _skewed_index(rng, n, power=3):
+    """Index in [0, n) biased towards 0: a few rows get most of the activity."""
+    return min(n - 1, int(n * rng.random() ** power))
+
+
+class Command(BaseCommand):
+    help = 'Seed a large benchmark dataset (100k users, 1M bets, 5M likes at --scale 1).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplier applied to every default count.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, for identical datasets across runs.')
+        parser.add_argument('--flush', action='store_true', help='Delete the previous benchmark dataset first.')
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f'--{name}', type=int, help=f'Override the number of {name} (default {default:,} x scale).')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        counts = {
+            name: options[name] if options[name] is not None else max(1, int(default * options['scale']))
+            for name, default in DEFAULTS.items()
+        }
+        started = time.perf_counter()
+
+        if options['flush']:
+            self._step('Flushing previous benchmark data')
+            Match.objects.filter(external_id__startswith=PREFIX).delete()
+            CustomUser.objects.filter(username__startswith=PREFIX).delete()
+        elif CustomUser.objects.filter(username__startswith=PREFIX).exists():
+            self.stdout.write(self.style.WARNING('Benchmark data already present; use --flush to re-seed.'))
+            return
+
+        user_ids, tipster_ids = self._seed_users(rng, counts['users'])
+        bet_ids = self._seed_bets(rng, tipster_ids, user_ids, counts['bets'])
+        self._seed_likes(rng, user_ids, bet_ids, counts['likes'])
+        self._seed_follows(rng, user_ids, tipster_ids, counts['follows'])
+        self._seed_predictions(rng, bet_ids, counts['predictions'])
+        self._seed_selections(rng, tipster_ids, counts['tickets'], counts['selections'])
+        self._step('Rebuilding profile stats')
+        rebuild_profile_stats()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Benchmark dataset ready in {time.perf_counter() - started:.0f}s: "
+            + ', '.join(f"{name}={count:,}" for name, count in counts.items())
+        ))
+
+    def _step(self, message):
+        self.stdout.write(f"{message}...")
+
+    def _bulk(self, model, rows, total, **kwargs):
+        """bulk_create from a generator in BATCH_SIZE chunks, with progress output."""
+        batch = []
+        done = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_create(batch, **kwargs)
+                done += len(batch)
+                batch = []
+                if done % (BATCH_SIZE * 40) == 0:
+                    self.stdout.write(f"  {model.__name__}: {done:,}/{total:,}")
+        if batch:
+            model.objects.bulk_create(batch, **kwargs)
+
+    def _seed_users(self, rng, count):
+        self._step(f'Creating {count:,} users')
+        # Hashing 100k passwords would dominate the seed time: every user shares one hash.
+        password = make_password('benchmark')
+        users = (
+            CustomUser(
+                username=f'{PREFIX}{i:06d}',
+                email=f'{PREFIX}{i:06d}@betadvisor.test',
+                password=password,
+                bio=f'Benchmark user {i}',
+            )
+            for i in range(count)
+        )
+        self._bulk(CustomUser, users, count)
+        user_ids = list(CustomUser.objects.filter(username__startswith=PREFIX).order_by('username').values_list('id', flat=True))
+
+        tipster_ids = user_ids[:max(1, count // 100)]
+        self._bulk(TipsterProfile, (TipsterProfile(user_id=user_id, is_verified=rng.random() < 0.3) for user_id in tipster_ids), len(tipster_ids))
+        return user_ids, tipster_ids
+
+    def _seed_bets(self, rng, tipster_ids, user_ids, count):
+        self._step(f'Creating {count:,} bets')
+        statuses = [BetTicket.BetStatus.WON, BetTicket.BetStatus.LOST, BetTicket.BetStatus.VOID, BetTicket.BetStatus.PENDING]
+        bet_ids = []
+        wins = {}
+        totals = {}
+
+        def rows():
+            for _ in range(count):
+                # 80% of bets come from tipsters, the rest from casual punters.
+                if rng.random() < 0.8:
+                    author_id = tipster_ids[_skewed_index(rng, len(tipster_ids))]
+                else:
+                    author_id = rng.choice(user_ids)
+                status = rng.choices(statuses, weights=[40, 40, 5, 15])[0]
+                odds = Decimal(rng.randint(120, 450)) / 100
+                stake = Decimal(rng.randint(5, 200))
+                totals[author_id] = totals.get(author_id, 0) + 1
+                if status == BetTicket.BetStatus.WON:
+                    wins[author_id] = wins.get(author_id, 0) + 1
+                home, away = rng.choice(MATCHES)
+                bet_id = uuid.UUID(int=rng.getrandbits(128), version=4)
+                bet_ids.append(bet_id)
+                yield BetTicket(
+                    id=bet_id,
+                    author_id=author_id,
+                    match_title=f'{home} vs {away}',
+                    selection=rng.choice(SELECTIONS),
+                    odds=odds,
+                    stake=stake,
+                    status=status,
+                    payout=(stake * odds).quantize(Decimal('0.01')) if status == BetTicket.BetStatus.WON else None,
+                    is_premium=rng.random() < 0.2,
+                )
+
+        self._bulk(BetTicket, rows(), count)
+
+        self._step(f'Creating stats for {len(totals):,} authors')
+        self._bulk(
+            UserGlobalStats,
+            (
+                UserGlobalStats(
+                    user_id=author_id,
+                    total_bets=total,
+                    wins=wins.get(author_id, 0),
+                    losses=total - wins.get(author_id, 0),
+                    reputation_score=wins.get(author_id, 0) * 10 - total,
+                )
+                for author_id, total in totals.items()
+            ),
+            len(totals),
+        )
+        return bet_ids
+
+    def _seed_likes(self, rng, user_ids, bet_ids, count):
+        self._step(f'Creating ~{count:,} likes')
+        likes = (
+            Like(user_id=rng.choice(user_ids), bet_id=bet_ids[_skewed_index(rng, len(bet_ids))])
+            for _ in range(count)
+        )
+        # Duplicate (user, bet) pairs are dropped, so the final count is slightly lower.
+        self._bulk(Like, likes, count, ignore_conflicts=True)
+
+    def _seed_follows(self, rng, user_ids, tipster_ids, count):
+        self._step(f'Creating ~{count:,} follows')
+        follows = (
+            Follow(follower_id=rng.choice(user_ids), followed_id=tipster_ids[_skewed_index(rng, len(tipster_ids), power=2)])
+            for _ in range(count)
+        )
+        self._bulk(Follow, follows, count, ignore_conflicts=True)
+
+    def _seed_predictions(self, rng, bet_ids, count):
+        self._step(f'Creating {count:,} pending predictions')
+        fixtures = max(1, count // 10)
+
+        def predictions():
+            for _ in range(count):
+                prediction = Prediction(
+                    bet_ticket_id=rng.choice(bet_ids),
+                    match_title='{} vs {}'.format(*rng.choice(MATCHES)),
+                    sport=Prediction.Sport.FOOTBALL,
+                    prediction_type=Prediction.PredictionType.MATCH_RESULT,
+                    prediction_value=rng.choice(['Home Win', 'Away Win', 'Draw']),
+                    api_fixture_id=1_000_000 + rng.randrange(fixtures),
+                    api_provider='api-sports',
+                )
+                # bulk_create skips save(): parse the market as on ingest.
+                prediction.parse_market()
+                yield prediction
+
+        self._bulk(Prediction, predictions(), count)
+
+    @transaction.atomic
+    def _seed_selections(self, rng, tipster_ids, ticket_count, selection_count):
+        self._step(f'Creating {ticket_count:,} OCR tickets with {selection_count:,} selections')
+        sport, _ = Sport.objects.get_or_create(name='Football')
+        league, _ = League.objects.get_or_create(sport=sport, name='Benchmark League')
+        now = timezone.now()
+        match_count = max(1, selection_count // 25)
+        self._bulk(
+            Match,
+            (
+                Match(
+                    league=league,
+                    home_team=home,
+                    away_team=away,
+                    date_time=now - timedelta(hours=i),
+                    status=Match.Status.FINISHED,
+                    home_score=rng.randint(0, 4),
+                    away_score=rng.randint(0, 4),
+                    external_id=f'{PREFIX}{i}',
+                )
+                for i, (home, away) in ((i, rng.choice(MATCHES)) for i in range(match_count))
+            ),
+            match_count,
+        )
+        match_ids = list(Match.objects.filter(external_id__startswith=PREFIX).values_list('id', flat=True))
+
+        tickets = [
+            Ticket(user_id=tipster_ids[_skewed_index(rng, len(tipster_ids))], image='tickets/benchmark.webp', status=Ticket.Status.VALIDATED)
+            for _ in range(ticket_count)
+        ]
+        outcomes = [BetSelection.Outcome.WON, BetSelection.Outcome.LOST, BetSelection.Outcome.VOID]
+        selections = [
+            BetSelection(
+                ticket_id=tickets[i % ticket_count].id,
+                match_id=rng.choice(match_ids),
+                selection=rng.choice(SELECTIONS),
+                odds=Decimal(rng.randint(120, 450)) / 100,
+                outcome=rng.choices(outcomes, weights=[45, 45, 10])[0],
+                stake=Decimal(10),
+                stats_processed=True,
+            )
+            for i in range(selection_count)
+        ]
+        # bulk_create skips the signals that keep Ticket totals in sync.
+        legs = defaultdict(list)
+        for selection in selections:
+            legs[selection.ticket_id].append(selection)
+        for ticket in tickets:
+            ticket.apply_totals(legs[ticket.id])
+        self._bulk(Ticket, iter(tickets), ticket_count)
+        self._bulk(BetSelection, iter(selections), selection_count)
@@ -0,0 +1,68 @@
+"""
+Request profiling middleware (see core.perf).
+
+Samples PERF_SAMPLE_RATE of requests into the perf ring buffer. With
+PERF_QUERY_COUNT_HEADER on (load tests, local profiling) every request is
+measured and gets X-Query-Count / X-DB-Time-Ms / X-Serializer-Time-Ms headers.
+"""
+import random
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import perf
+
+
+_REGEX_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+def _route_label(request):
+    """URL pattern of the matched view ('/api/users/<pk>/'), not the concrete path."""
+    match = getattr(request, 'resolver_match', None)
+    if not match or not match.route:
+        return request.path
+    route = _REGEX_GROUP.sub(r'<\1>', match.route)
+    return '/' + route.replace('^', '').replace('$', '').replace('\\.', '.')
+
+
+class PerfMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        add_headers = settings.PERF_QUERY_COUNT_HEADER
+        sampled = random.random() < settings.PERF_SAMPLE_RATE
+        if not (sampled or add_headers):
+            return self.get_response(request)
+
+        stats, token = perf.start_request()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(perf.query_timer))
+                response = self.get_response(request)
+        finally:
+            perf.end_request(token)
+
+        duration = time.perf_counter() - stats.started
+        if add_headers:
+            response['X-Query-Count'] = str(stats.query_count)
+            response['X-DB-Time-Ms'] = f"{stats.db_time * 1000:.1f}"
+            response['X-Serializer-Time-Ms'] = f"{stats.serializer_time * 1000:.1f}"
+
+        if sampled:
+            perf.record({
+                'method': request.method,
+                'route': _route_label(request),
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'query_count': stats.query_count,
+                'db_ms': round(stats.db_time * 1000, 2),
+                'serializer_ms': round(stats.serializer_time * 1000, 2),
+                'response_bytes': len(response.content) if not response.streaming else 0,
+                'timestamp': time.time(),
+            })
+        return response
@@ -0,0 +1,128 @@
+"""
+Per-request performance sampling: query count, DB time, serializer time,
+response size and total duration per route.
+
+`PerfMiddleware` (core.middleware) records a sample of requests into an
+in-process ring buffer; `summarize()` turns it into p50/p95 per route for
+`/api/_perf/` and the `profile_endpoints` command. Each gunicorn worker keeps
+its own buffer, so the admin view shows the worker that served it.
+"""
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+_current = ContextVar('perf_request_stats', default=None)
+_lock = threading.Lock()
+_samples = deque(maxlen=settings.PERF_BUFFER_SIZE)
+
+
+@dataclass
+class RequestStats:
+    query_count: int = 0
+    db_time: float = 0.0
+    serializer_time: float = 0.0
+    # Nesting depth of serializer.data calls; only the outermost one is timed.
+    serializer_depth: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def current_stats():
+    return _current.get()
+
+
+def query_timer(execute, sql, params, many, context):
+    """connection.execute_wrapper() hook counting queries and DB time."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query_count += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def record(sample):
+    with _lock:
+        _samples.append(sample)
+
+
+def samples():
+    with _lock:
+        return list(_samples)
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(records=None):
+    """p50/p95 of every metric per (method, route), slowest p95 first."""
+    groups = {}
+    for sample in samples() if records is None else records:
+        groups.setdefault((sample['method'], sample['route']), []).append(sample)
+
+    summary = []
+    for (method, route), group in groups.items():
+        row = {'method': method, 'route': route, 'count': len(group)}
+        for metric in ('duration_ms', 'query_count', 'db_ms', 'serializer_ms', 'response_bytes'):
+            values = [s[metric] for s in group]
+            row[metric] = {
+                'p50': _percentile(values, 0.50),
+                'p95': _percentile(values, 0.95),
+                'max': max(values),
+            }
+        summary.append(row)
+    summary.sort(key=lambda row: row['duration_ms']['p95'], reverse=True)
+    return summary
+
+
+def install_serializer_timing():
+    """
+    Time DRF serializer `.data` (outermost call per request). Wraps the
+    `data` property of Serializer and ListSerializer once at startup.
+    """
+    from rest_framework import serializers
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        original = cls.data
+        if getattr(original.fget, '_perf_timed', False):
+            continue
+
+        def timed(self, _fget=original.fget):
+            stats = _current.get()
+            if stats is None:
+                return _fget(self)
+            stats.serializer_depth += 1
+            start = time.perf_counter()
+            try:
+                return _fget(self)
+            finally:
+                stats.serializer_depth -= 1
+                if stats.serializer_depth == 0:
+                    stats.serializer_time += time.perf_counter() - start
+
+        timed._perf_timed = True
+        cls.data = property(timed)
@@ -0,0 +1,47 @@
+"""
+Schedule image variant generation when an image field changes, and bump
+the version namespaces of core.conditional when their models change.
+Connected in CoreConfig.ready().
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from core import cache
+from core.conditional import VERSIONED_NAMESPACES
+from core.image_variants import IMAGE_VARIANT_FIELDS, needs_variants, schedule_variants
+
+
+def _on_image_saved(sender, instance, image_field, variants_field, **kwargs):
+    if kwargs.get('raw') or not needs_variants(instance, image_field, variants_field):
+        return
+    # After commit so the worker sees the row and the stored file.
+    transaction.on_commit(partial(schedule_variants, sender, instance.pk, image_field, variants_field))
+
+
+for label, image_field, variants_field in IMAGE_VARIANT_FIELDS:
+    post_save.connect(
+        partial(_on_image_saved, image_field=image_field, variants_field=variants_field),
+        sender=label,
+        weak=False,
+        dispatch_uid=f'image_variants_{label}',
+    )
+
+
+def _bump_version(sender, namespace, **kwargs):
+    if kwargs.get('raw'):
+        return
+    # After commit: a poll between the bump and the commit would pin the old data to the new version.
+    transaction.on_commit(partial(cache.invalidate, namespace))
+
+
+for namespace, labels in VERSIONED_NAMESPACES.items():
+    for label in labels:
+        for event, signal in (('save', post_save), ('delete', post_delete)):
+            signal.connect(
+                partial(_bump_version, namespace=namespace),
+                sender=label,
+                weak=False,
+                dispatch_uid=f'conditional_{namespace}_{label}_{event}',
+            )
@@ -0,0 +1,370 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from bets.models import BetTicket
+from bets.prediction_models import Prediction
+from bets.serializers import BetTicketSerializer
+from tickets.models import Ticket
+from tickets.serializers import TicketListSerializer
+
+User = get_user_model()
+
+
+def _image_file(name='photo.jpg', size=(2000, 1500)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, format='JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=self.media.name, IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='variants', password='testpass123')
+
+    def _dimensions(self, storage_name):
+        with Image.open(os.path.join(self.media.name, storage_name)) as image:
+            return image.format, max(image.size)
+
+    def test_variants_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(user=self.user, image=_image_file())
+
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.image_variants['source'], ticket.image.name)
+        self.assertEqual(self._dimensions(ticket.image_variants['small']), ('WEBP', 160))
+        self.assertEqual(self._dimensions(ticket.image_variants['medium']), ('WEBP', 480))
+        self.assertEqual(self._dimensions(ticket.image_variants['large']), ('WEBP', 1080))
+
+        data = TicketListSerializer(ticket).data
+        self.assertTrue(data['thumbnail_url'].endswith('_small.webp'))
+        self.assertEqual(data['image_urls']['original'], ticket.image.url)
+
+    def test_urls_fall_back_to_original_until_generated(self):
+        bet = BetTicket.objects.create(
+            author=self.user, match_title='PSG vs OM', selection='PSG',
+            odds='1.80', stake='10.00', ticket_image=_image_file(),
+        )
+        urls = BetTicketSerializer(bet).data['ticket_image_urls']
+        self.assertEqual(urls['small'], bet.ticket_image.url)
+        self.assertEqual(urls['original'], bet.ticket_image.url)
+
+    def test_avatar_upload_exposes_variant_urls(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.put('/api/me/profile/', {'avatar': _image_file('avatar.jpg')}, format='multipart')
+
+        # force_authenticate reuses this instance; real requests load the user fresh.
+        self.user.refresh_from_db()
+        response = client.get('/api/me/')
+        self.assertTrue(response.data['avatar_urls']['small'].endswith('_small.webp'))
+        self.assertTrue(response.data['avatar_url'].endswith('_medium.webp'))
+
+    def test_new_avatar_variants_change_the_profile_etag(self):
+        from core.image_variants import ensure_variants
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=False):
+            client.put('/api/me/profile/', {'avatar': _image_file('avatar.jpg')}, format='multipart')
+        self.user.refresh_from_db()
+        etag = client.get('/api/me/')['ETag']
+
+        self.assertTrue(ensure_variants(User, self.user.pk, 'avatar', 'avatar_variants'))
+        self.user.refresh_from_db()
+        response = client.get('/api/me/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['avatar_urls']['small'].endswith('_small.webp'))
+
+    def test_replacing_image_removes_old_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket = Ticket.objects.create(user=self.user, image=_image_file())
+        ticket.refresh_from_db()
+        old_small = os.path.join(self.media.name, ticket.image_variants['small'])
+
+        ticket.image = _image_file('other.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.save()
+
+        ticket.refresh_from_db()
+        self.assertFalse(os.path.exists(old_small))
+        self.assertIn('other', ticket.image_variants['small'])
+
+    def test_backfill_command_processes_existing_media(self):
+        tickets = [Ticket.objects.create(user=self.user, image=_image_file()) for _ in range(3)]
+        Ticket.objects.update(image_variants={})
+
+        out = StringIO()
+        call_command('generate_image_variants', '--workers', '2', '--model', 'tickets.Ticket', stdout=out)
+
+        self.assertIn('Generated variants for 3 image(s), 0 failed', out.getvalue())
+        for ticket in tickets:
+            ticket.refresh_from_db()
+            self.assertEqual(ticket.image_variants['source'], ticket.image.name)
+
+
+class PerfMiddlewareTests(TestCase):
+    def setUp(self):
+        from core import perf
+
+        self.perf = perf
+        perf.reset()
+        self.addCleanup(perf.reset)
+        self.user = User.objects.create_user(username='perf', password='testpass123')
+        self.admin = User.objects.create_user(username='perf_admin', password='testpass123', is_staff=True)
+        self.client = APIClient()
+
+    @override_settings(PERF_QUERY_COUNT_HEADER=True, PERF_SAMPLE_RATE=0.0)
+    def test_query_count_header(self):
+        BetTicket.objects.create(author=self.user, match_title='A vs B', selection='A', odds='2.00', stake='10.00')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/bets/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertIn('X-Serializer-Time-Ms', response)
+        # Header-only mode does not fill the sample buffer.
+        self.assertEqual(self.perf.samples(), [])
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_no_header_by_default(self):
+        response = self.client.get('/api/health/')
+        self.assertNotIn('X-Query-Count', response)
+
+    @override_settings(PERF_SAMPLE_RATE=1.0)
+    def test_samples_grouped_by_route_pattern(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get(f'/api/users/{self.user.pk}/')
+        self.client.get(f'/api/users/{self.admin.pk}/')
+
+        summary = self.perf.summarize()
+        row = next(r for r in summary if r['route'] == '/api/users/<pk>/')
+        self.assertEqual(row['method'], 'GET')
+        self.assertEqual(row['count'], 2)
+        self.assertGreater(row['query_count']['p50'], 0)
+        self.assertGreater(row['response_bytes']['max'], 0)
+
+    @override_settings(PERF_SAMPLE_RATE=0.0)
+    def test_perf_endpoint_is_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get('/api/_perf/').status_code, 403)
+
+        self.perf.record({
+            'method': 'GET', 'route': '/api/bets/', 'status': 200, 'duration_ms': 12.0,
+            'query_count': 4, 'db_ms': 3.0, 'serializer_ms': 5.0, 'response_bytes': 900, 'timestamp': 0,
+        })
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/_perf/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['samples'], 1)
+        self.assertEqual(response.data['routes'][0]['query_count']['p95'], 4)
+
+        self.assertEqual(self.client.delete('/api/_perf/').status_code, 204)
+        self.assertEqual(self.perf.samples(), [])
+
+    def test_summarize_percentiles(self):
+        records = [
+            {'method': 'GET', 'route': '/api/me/', 'duration_ms': float(ms), 'query_count': ms // 10,
+             'db_ms': 1.0, 'serializer_ms': 1.0, 'response_bytes': 100}
+            for ms in range(10, 110, 10)
+        ]
+        row = self.perf.summarize(records)[0]
+        self.assertEqual(row['count'], 10)
+        self.assertEqual(row['duration_ms']['p50'], 60.0)
+        self.assertEqual(row['duration_ms']['p95'], 100.0)
+        self.assertEqual(row['query_count']['max'], 10)
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_seed_and_run_benchmarks(self):
+        call_command(
+            'seed_benchmark', '--users', '30', '--bets', '200', '--likes', '500', '--follows', '50',
+            '--predictions', '10', '--tickets', '5', '--selections', '20', stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.filter(username__startswith='bench_').count(), 30)
+        self.assertEqual(BetTicket.objects.count(), 200)
+
+        out = StringIO()
+        with mock.patch('bets.sports_api.requests.get', side_effect=AssertionError('network access')):
+            call_command('run_benchmarks', '--iterations', '2', '--job-iterations', '1', stdout=out, stderr=StringIO())
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(report['dataset']['bets'], 200)
+        self.assertEqual(set(report['results']), {
+            'feed', 'profile', 'me', 'leaderboard', 'ticket_list', 'like_toggle',
+            'settle_predictions', 'recalculate_stats',
+        })
+        self.assertEqual(report['results']['feed']['status_codes'], [200])
+        self.assertGreater(report['results']['feed']['queries'], 0)
+        # Writes are rolled back after each run.
+        self.assertEqual(Prediction.objects.filter(outcome=Prediction.Outcome.PENDING).count(), 10)
+
+
+class CacheTests(TestCase):
+    def setUp(self):
+        from core import cache
+
+        self.cache = cache
+        caches['default'].clear()
+        cache.reset_metrics()
+        self.addCleanup(caches['default'].clear)
+        self.addCleanup(cache.reset_metrics)
+
+    def test_get_or_set_computes_once(self):
+        compute = mock.Mock(return_value={'a': 1})
+        self.assertEqual(self.cache.get_or_set('things', ('list', 1), compute, timeout=60), {'a': 1})
+        self.assertEqual(self.cache.get_or_set('things', ('list', 1), compute, timeout=60), {'a': 1})
+        self.assertEqual(compute.call_count, 1)
+
+        metrics = self.cache.metrics()['things']
+        self.assertEqual((metrics['hits'], metrics['misses'], metrics['hit_rate']), (1, 1, 0.5))
+
+    def test_none_is_cached(self):
+        compute = mock.Mock(return_value=None)
+        self.cache.get_or_set('things', 'empty', compute, timeout=60)
+        self.cache.get_or_set('things', 'empty', compute, timeout=60)
+        self.assertEqual(compute.call_count, 1)
+
+    def test_invalidate_namespace(self):
+        self.cache.set('things', 'a', 1, timeout=60)
+        self.cache.set('other', 'a', 2, timeout=60)
+        self.cache.invalidate('things')
+
+        self.assertIsNone(self.cache.get('things', 'a'))
+        self.assertEqual(self.cache.get('other', 'a'), 2)
+        self.assertNotEqual(self.cache.make_key('things', 'a'), self.cache.make_key('other', 'a'))
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get_or_set('slow', 'k', compute, timeout=60)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.cache.metrics()['slow']['waits'], 4)
+
+    def test_early_refresh_near_expiry(self):
+        compute = mock.Mock(side_effect=['old', 'new'])
+        self.cache.get_or_set('things', 'k', compute, timeout=60)
+        with mock.patch('core.cache._should_refresh_early', return_value=True):
+            self.assertEqual(self.cache.get_or_set('things', 'k', compute, timeout=60), 'new')
+        self.assertEqual(self.cache.get_or_set('things', 'k', compute, timeout=60), 'new')
+        self.assertEqual(self.cache.metrics()['things']['early_refreshes'], 1)
+
+    def test_should_refresh_early(self):
+        now = time.time()
+        self.assertFalse(self.cache._should_refresh_early(now + 3600, 0.01))
+        self.assertTrue(self.cache._should_refresh_early(now - 1, 0.01))
+        self.assertFalse(self.cache._should_refresh_early(None, 0.01))
+
+    def test_leaderboard_served_from_cache(self):
+        user = User.objects.create_user(username='ranked', password='testpass123')
+        BetTicket.objects.create(author=user, match_title='A vs B', selection='A', odds='2.00', stake='10.00')
+        client = APIClient()
+        client.force_authenticate(user=user)
+
+        first = client.get('/api/users/leaderboard/')
+        with self.assertNumQueries(0):
+            second = client.get('/api/users/leaderboard/')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second.json()[0]['username'], 'ranked')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        self.user = User.objects.create_user(username='poller', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _revalidate(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('no-cache', first['Cache-Control'])
+        return first['ETag'], self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+    def test_me_not_modified_until_profile_changes(self):
+        etag, second = self._revalidate('/api/me/')
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        self.assertEqual(second['ETag'], etag)
+
+        self.user.bio = 'New bio'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_is_per_user(self):
+        etag, _ = self._revalidate('/api/me/')
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get('/api/me/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_notifications_not_modified_until_read(self):
+        from notifications.models import Notification
+
+        Notification.objects.create(recipient=self.user, notification_type='NEW_LIKE', title='Like', body='Someone liked your bet')
+        etag, second = self._revalidate('/api/me/notifications/')
+        self.assertEqual(second.status_code, 304)
+
+        self.client.post('/api/me/notifications/read/')
+        self.assertEqual(self.client.get('/api/me/notifications/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_ticket_status_poll_is_one_query(self):
+        ticket = Ticket.objects.create(user=self.user, image='tickets/test.jpg')
+        url = f'/api/tickets/{ticket.pk}/status/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        ticket.status = Ticket.Status.VALIDATED
+        ticket.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_feed_not_modified_until_like(self):
+        from social.models import Like
+
+        bet = BetTicket.objects.create(author=self.user, match_title='A vs B', selection='A', odds='2.00', stake='10.00')
+        etag, second = self._revalidate('/api/bets/')
+        self.assertEqual(second.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(user=self.user, bet=bet)
+        self.assertEqual(self.client.get('/api/bets/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_leaderboard_if_modified_since(self):
+        first = self.client.get('/api/users/leaderboard/')
+        second = self.client.get('/api/users/leaderboard/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(second.status_code, 304)
@@ -0,0 +1,36 @@
+"""
+Upload handler that streams multipart files to a temporary file on disk while
+hashing and size-checking each chunk, so a worker never holds a whole upload
+in memory no matter how many run concurrently.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    TemporaryFileUploadHandler that also computes `file.sha256`.
+
+    Bytes past MAX_UPLOAD_FILE_SIZE are discarded instead of written; the file
+    still reports its full `size`, so the usual size validators reject it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_FILE_SIZE:
+            return None
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        upload = super().file_complete(file_size)
+        upload.sha256 = self.hasher.hexdigest() if file_size <= settings.MAX_UPLOAD_FILE_SIZE else ''
+        return upload
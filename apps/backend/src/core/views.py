@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import cache, perf
+from tickets import ocr_tiers
+from tickets.gemini_governor import governor
+
+
+class PerfSummaryView(APIView):
+    """
+    GET /api/_perf/ — p50/p95 query count, DB time, serializer time, response
+    size and duration per route, from this worker's sampled requests.
+    Also reports this worker's cache hit/miss counters (core.cache), its
+    Gemini governor state (in flight, queued, circuit breaker) and OCR tier
+    latency / escalation rates.
+    DELETE clears both (e.g. before a load test).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        records = perf.samples()
+        return Response({
+            'sample_rate': settings.PERF_SAMPLE_RATE,
+            'buffer_size': settings.PERF_BUFFER_SIZE,
+            'samples': len(records),
+            'routes': perf.summarize(records),
+            'cache': cache.metrics(),
+            'gemini': governor.status(),
+            'ocr': ocr_tiers.metrics(),
+        })
+
+    def delete(self, request):
+        perf.reset()
+        cache.reset_metrics()
+        ocr_tiers.reset_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from gamification.profile_stats import rebuild_profile_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes UserProfileStats (profile ROI, follower counts, sport stats, badges) for every user.'
+
+    def handle(self, *args, **options):
+        count = rebuild_profile_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt profile stats for {count} users."))
@@ -3,6 +3,7 @@ from django.db import transaction
 from tickets.models import BetSelection
 from gamification.models import UserGlobalStats, UserSportStats, UserBadge
 from gamification.signals import process_bet_result
+from gamification.profile_stats import rebuild_profile_stats
 
 class Command(BaseCommand):
     help = 'Recalculates user stats from scratch based on bet history.'
@@ -39,4 +40,7 @@ class Command(BaseCommand):
                 if (i + 1) % 100 == 0:
                     self.stdout.write(f"Processed {i + 1}/{count}")
 
+            # Sport stats and badges shown on profiles were rebuilt above.
+            rebuild_profile_stats()
+
         self.stdout.write(self.style.SUCCESS("Stats recalculation completed successfully."))
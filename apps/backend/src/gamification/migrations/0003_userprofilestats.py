@@ -0,0 +1,150 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:12
+
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator > 0 else 0.0
+
+
+def backfill_profile_stats(apps, schema_editor):
+    """Same numbers as gamification.profile_stats.rebuild_profile_stats, on historical models."""
+    BetTicket = apps.get_model("bets", "BetTicket")
+    Follow = apps.get_model("social", "Follow")
+    UserSportStats = apps.get_model("gamification", "UserSportStats")
+    UserBadge = apps.get_model("gamification", "UserBadge")
+    UserProfileStats = apps.get_model("gamification", "UserProfileStats")
+
+    zero = Decimal("0.00")
+    rows = {}
+
+    def row(user_id):
+        if user_id not in rows:
+            rows[user_id] = UserProfileStats(user_id=user_id)
+        return rows[user_id]
+
+    bet_stats = (
+        BetTicket.objects.exclude(status="PENDING")
+        .values("author_id")
+        .annotate(
+            settled_bets=Count("id"),
+            wins=Count("id", filter=Q(status="WON")),
+            total_stake=Sum("stake"),
+            won_revenue=Sum(
+                Case(
+                    When(status="WON", then=F("stake") * F("odds") - F("stake")),
+                    default=Value(zero),
+                    output_field=DecimalField(),
+                )
+            ),
+            lost_stakes=Sum(
+                Case(
+                    When(status="LOST", then=F("stake")),
+                    default=Value(zero),
+                    output_field=DecimalField(),
+                )
+            ),
+        )
+    )
+    for agg in bet_stats:
+        stats = row(agg["author_id"])
+        stats.settled_bets = agg["settled_bets"]
+        stats.wins = agg["wins"]
+        stats.total_stake = agg["total_stake"] or zero
+        stats.won_revenue = agg["won_revenue"] or zero
+        stats.lost_stakes = agg["lost_stakes"] or zero
+
+    for item in Follow.objects.values("followed_id").annotate(n=Count("id")):
+        row(item["followed_id"]).follower_count = item["n"]
+
+    for s in UserSportStats.objects.select_related("sport").order_by("sport__name"):
+        investment = Decimal(s.total_bets)
+        roi = (s.units_returned - investment) / investment * 100 if investment else 0.0
+        row(s.user_id).sport_stats.append(
+            {
+                "sport": s.sport.name,
+                "total_bets": s.total_bets,
+                "wins": s.wins,
+                "winrate": round(_ratio(s.wins, s.total_bets - s.voids) * 100, 1),
+                "roi": round(float(roi), 1),
+            }
+        )
+
+    for b in UserBadge.objects.order_by("-awarded_at"):
+        row(b.user_id).badges.append(
+            {
+                "badge_name": b.badge_name,
+                "description": b.description,
+                "awarded_at": b.awarded_at.isoformat() if b.awarded_at else None,
+            }
+        )
+
+    UserProfileStats.objects.bulk_create(rows.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("gamification", "0002_remove_userglobalstats_current_win_streak_and_more"),
+        ("bets", "0004_betticket_image_variants"),
+        ("social", "0003_report"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserProfileStats",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("modified", models.DateTimeField(auto_now=True)),
+                ("settled_bets", models.PositiveIntegerField(default=0)),
+                ("wins", models.PositiveIntegerField(default=0)),
+                (
+                    "total_stake",
+                    models.DecimalField(
+                        decimal_places=4, default=Decimal("0.0000"), max_digits=19
+                    ),
+                ),
+                (
+                    "won_revenue",
+                    models.DecimalField(
+                        decimal_places=4, default=Decimal("0.0000"), max_digits=19
+                    ),
+                ),
+                (
+                    "lost_stakes",
+                    models.DecimalField(
+                        decimal_places=4, default=Decimal("0.0000"), max_digits=19
+                    ),
+                ),
+                ("follower_count", models.PositiveIntegerField(default=0)),
+                ("sport_stats", models.JSONField(blank=True, default=list)),
+                ("badges", models.JSONField(blank=True, default=list)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="profile_stats",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+        migrations.RunPython(backfill_profile_stats, migrations.RunPython.noop),
+    ]
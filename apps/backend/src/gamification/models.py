@@ -76,3 +76,25 @@ class UserBadge(TimeStampedModel):
 
     def __str__(self):
         return f"{self.badge_name} - {self.user}"
+
+
+class UserProfileStats(TimeStampedModel):
+    """
+    Denormalized numbers shown on a profile (UserProfileSerializer), kept up to
+    date by gamification.profile_stats so a profile is served without
+    aggregating BetTickets or counting followers on every read.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='profile_stats')
+    # Settled (non-PENDING) BetTickets
+    settled_bets = models.PositiveIntegerField(default=0)
+    wins = models.PositiveIntegerField(default=0)
+    total_stake = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0.0000'))
+    won_revenue = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0.0000'))
+    lost_stakes = models.DecimalField(max_digits=19, decimal_places=4, default=Decimal('0.0000'))
+    follower_count = models.PositiveIntegerField(default=0)
+    # Serialized UserSportStats / UserBadge, refreshed when those rows change
+    sport_stats = models.JSONField(default=list, blank=True)
+    badges = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return f"Profile Stats for {self.user}"
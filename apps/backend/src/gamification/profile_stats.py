@@ -0,0 +1,184 @@
+"""
+Maintenance of UserProfileStats, the per-user numbers behind
+UserProfileSerializer.
+
+The refresh_* functions recompute one part of the row from its source table
+(one aggregate query) and upsert it. Signal handlers in gamification.signals
+call them when a BetTicket is deleted, a Follow is created or removed, and
+when sport stats or badges change. A BetTicket that is created settled or
+settled later is applied as a delta instead (`apply_bet_change()`), so
+settling a bet does not re-aggregate all of its author's bets.
+`rebuild_profile_stats()` recomputes everyone.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from gamification.models import UserBadge, UserProfileStats, UserSportStats
+
+ZERO = Decimal('0.00')
+
+
+def bet_aggregates():
+    """Aggregates over settled BetTickets, as stored on UserProfileStats."""
+    return {
+        'settled_bets': Count('id'),
+        'wins': Count('id', filter=Q(status='WON')),
+        'total_stake': Sum('stake'),
+        'won_revenue': Sum(
+            Case(
+                When(status='WON', then=F('stake') * F('odds') - F('stake')),
+                default=Value(ZERO),
+                output_field=DecimalField(),
+            )
+        ),
+        'lost_stakes': Sum(
+            Case(
+                When(status='LOST', then=F('stake')),
+                default=Value(ZERO),
+                output_field=DecimalField(),
+            )
+        ),
+    }
+
+
+def _bet_fields(agg):
+    return {
+        'settled_bets': agg['settled_bets'] or 0,
+        'wins': agg['wins'] or 0,
+        'total_stake': agg['total_stake'] or ZERO,
+        'won_revenue': agg['won_revenue'] or ZERO,
+        'lost_stakes': agg['lost_stakes'] or ZERO,
+    }
+
+
+def serialize_sport_stats(stats):
+    return [{
+        'sport': s.sport.name,
+        'total_bets': s.total_bets,
+        'wins': s.wins,
+        'winrate': round(s.winrate, 1),
+        'roi': round(float(s.roi), 1),
+    } for s in stats]
+
+
+def serialize_badges(badges):
+    return [{
+        'badge_name': b.badge_name,
+        'description': b.description,
+        'awarded_at': b.awarded_at.isoformat() if b.awarded_at else None,
+    } for b in badges]
+
+
+def _save(user_id, fields, create):
+    """
+    Upsert the row. Deletions pass create=False: when a user is deleted the
+    cascade fires them too, and a row created at that point would block the
+    user's own delete.
+    """
+    if create:
+        UserProfileStats.objects.update_or_create(user_id=user_id, defaults=fields)
+    else:
+        UserProfileStats.objects.filter(user_id=user_id).update(**fields, modified=timezone.now())
+
+
+def refresh_bet_stats(user_id, create=True):
+    from bets.models import BetTicket
+
+    agg = BetTicket.objects.filter(author_id=user_id).exclude(status='PENDING').aggregate(**bet_aggregates())
+    _save(user_id, _bet_fields(agg), create)
+
+
+def _bet_contribution(values):
+    """What one BetTicket (`BetTicket.stats_values()`) adds to its author's row."""
+    status = values['status']
+    if status == 'PENDING':
+        return {}
+    stake, odds = Decimal(str(values['stake'])), Decimal(str(values['odds']))
+    return {
+        'settled_bets': 1,
+        'wins': 1 if status == 'WON' else 0,
+        'total_stake': stake,
+        'won_revenue': stake * odds - stake if status == 'WON' else ZERO,
+        'lost_stakes': stake if status == 'LOST' else ZERO,
+    }
+
+
+def apply_bet_change(old, new):
+    """
+    Move a BetTicket's contribution from its `old` values (None when created)
+    to its `new` ones with F() updates. An author without a row yet gets the
+    full recompute, which creates it.
+    """
+    deltas = {}
+    for values, sign in ((old, -1), (new, 1)):
+        if values is None:
+            continue
+        delta = deltas.setdefault(values['author_id'], {})
+        for field, value in _bet_contribution(values).items():
+            delta[field] = delta.get(field, 0) + sign * value
+
+    for user_id, delta in deltas.items():
+        changes = {field: F(field) + value for field, value in delta.items() if value}
+        if not changes:
+            continue
+        if not UserProfileStats.objects.filter(user_id=user_id).update(**changes, modified=timezone.now()):
+            refresh_bet_stats(user_id)
+
+
+def refresh_follower_count(user_id, create=True):
+    from social.models import Follow
+
+    _save(user_id, {'follower_count': Follow.objects.filter(followed_id=user_id).count()}, create)
+
+
+def refresh_sport_stats(user_id, create=True):
+    stats = UserSportStats.objects.filter(user_id=user_id).select_related('sport').order_by('sport__name')
+    _save(user_id, {'sport_stats': serialize_sport_stats(stats)}, create)
+
+
+def refresh_badges(user_id, create=True):
+    badges = UserBadge.objects.filter(user_id=user_id).only('badge_name', 'description', 'awarded_at').order_by('-awarded_at')
+    _save(user_id, {'badges': serialize_badges(badges)}, create)
+
+
+def rebuild_profile_stats():
+    """Recompute every row from scratch with grouped queries; returns the row count."""
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+
+    from bets.models import BetTicket
+    from social.models import Follow
+
+    rows = {}
+
+    def row(user_id):
+        if user_id not in rows:
+            rows[user_id] = UserProfileStats(user_id=user_id)
+        return rows[user_id]
+
+    for agg in BetTicket.objects.exclude(status='PENDING').values('author_id').annotate(**bet_aggregates()):
+        for field, value in _bet_fields(agg).items():
+            setattr(row(agg['author_id']), field, value)
+    for item in Follow.objects.values('followed_id').annotate(n=Count('id')):
+        row(item['followed_id']).follower_count = item['n']
+
+    sport_stats = {}
+    for s in UserSportStats.objects.select_related('sport').order_by('sport__name'):
+        sport_stats.setdefault(s.user_id, []).append(s)
+    for user_id, stats in sport_stats.items():
+        row(user_id).sport_stats = serialize_sport_stats(stats)
+
+    badges = {}
+    for b in UserBadge.objects.only('user_id', 'badge_name', 'description', 'awarded_at').order_by('-awarded_at'):
+        badges.setdefault(b.user_id, []).append(b)
+    for user_id, user_badges in badges.items():
+        row(user_id).badges = serialize_badges(user_badges)
+
+    # Users deleted meanwhile would violate the FK.
+    existing = set(get_user_model().objects.filter(pk__in=list(rows)).values_list('pk', flat=True))
+    with transaction.atomic():
+        UserProfileStats.objects.all().delete()
+        UserProfileStats.objects.bulk_create([r for user_id, r in rows.items() if user_id in existing], batch_size=1000)
+    return len(existing)
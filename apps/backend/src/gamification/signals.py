@@ -1,9 +1,12 @@
 from decimal import Decimal
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.db import transaction
+from bets.models import BetTicket
+from social.models import Follow
 from tickets.models import BetSelection
-from gamification.models import UserGlobalStats, UserSportStats
+from gamification import profile_stats
+from gamification.models import UserBadge, UserGlobalStats, UserSportStats
 from gamification.badges import BADGE_REGISTRY
 from gamification.utils import update_reputation
 
@@ -118,3 +121,55 @@ def process_bet_result(bet_selection):
             # Try with Sport Stats
             if badge.check_condition(sport_stats, bet_selection):
                 badge.award(user)
+
+
+# ─── Profile stats (UserProfileStats) ───────────────────────
+@receiver(post_save, sender=BetTicket)
+def refresh_profile_bet_stats(sender, instance, created, update_fields=None, **kwargs):
+    # Saves that leave status, stake, odds and author alone (OCR, image
+    # variants, verification) do not change settled totals.
+    if update_fields is not None and not update_fields & {'author', *BetTicket.STATS_FIELDS}:
+        return
+    old = None if created else getattr(instance, 'saved_stats_values', None)
+    if not created and old is None:
+        # Saved without being loaded first: nothing to diff against.
+        profile_stats.refresh_bet_stats(instance.author_id)
+        return
+    profile_stats.apply_bet_change(old, instance.stats_values())
+
+
+@receiver(post_delete, sender=BetTicket)
+def refresh_profile_bet_stats_on_delete(sender, instance, **kwargs):
+    if instance.status != BetTicket.BetStatus.PENDING:
+        profile_stats.refresh_bet_stats(instance.author_id, create=False)
+
+
+@receiver(post_save, sender=Follow)
+def refresh_profile_follower_count(sender, instance, created, **kwargs):
+    if created:
+        profile_stats.refresh_follower_count(instance.followed_id)
+
+
+@receiver(post_delete, sender=Follow)
+def refresh_profile_follower_count_on_delete(sender, instance, **kwargs):
+    profile_stats.refresh_follower_count(instance.followed_id, create=False)
+
+
+@receiver(post_save, sender=UserSportStats)
+def refresh_profile_sport_stats(sender, instance, **kwargs):
+    profile_stats.refresh_sport_stats(instance.user_id)
+
+
+@receiver(post_delete, sender=UserSportStats)
+def refresh_profile_sport_stats_on_delete(sender, instance, **kwargs):
+    profile_stats.refresh_sport_stats(instance.user_id, create=False)
+
+
+@receiver(post_save, sender=UserBadge)
+def refresh_profile_badges(sender, instance, **kwargs):
+    profile_stats.refresh_badges(instance.user_id)
+
+
+@receiver(post_delete, sender=UserBadge)
+def refresh_profile_badges_on_delete(sender, instance, **kwargs):
+    profile_stats.refresh_badges(instance.user_id, create=False)
@@ -1,7 +1,13 @@
+from decimal import Decimal
 from unittest.mock import patch, MagicMock
 from django.test import TestCase
 from django.contrib.auth import get_user_model
-from gamification.models import UserGlobalStats, UserSportStats
+from rest_framework.test import APIClient
+from bets.models import BetTicket
+from social.models import Follow
+from sports.models import Sport
+from gamification.models import UserGlobalStats, UserProfileStats, UserSportStats
+from gamification.profile_stats import rebuild_profile_stats
 from gamification.badges import FireStreakBadge, ExpertBadge
 from gamification.utils import update_reputation, get_halo_color
 
@@ -190,3 +196,115 @@ class GetHaloColorTests(TestCase):
     def test_none(self):
         self.assertEqual(get_halo_color(0), 'none')
         self.assertEqual(get_halo_color(39), 'none')
+
+
+# ─────────────────────────────────────────────────────────────
+# Tests for UserProfileStats maintenance
+# ─────────────────────────────────────────────────────────────
+class UserProfileStatsTests(TestCase):
+    def setUp(self):
+        self.tipster = User.objects.create_user(username='profiletipster', password='testpass123')
+        self.fan = User.objects.create_user(username='profilefan', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.fan)
+
+    def _bet(self, status='PENDING', odds='2.00', stake='10.00'):
+        return BetTicket.objects.create(
+            author=self.tipster, match_title='A vs B', selection='A',
+            odds=Decimal(odds), stake=Decimal(stake), status=status,
+        )
+
+    def test_settle_updates_stats(self):
+        self._bet().settle('WON')
+        self._bet(odds='3.00').settle('LOST')
+        self._bet()  # still pending
+
+        stats = self.client.get(f'/api/users/{self.tipster.pk}/').json()['stats']
+        # +10 on the win, -10 on the loss, over 20 staked.
+        self.assertEqual(stats, {'roi': 0.0, 'win_rate': 50.0, 'total_bets': 2, 'total_profit': 0.0})
+
+    def test_deleting_settled_bet_updates_stats(self):
+        bet = self._bet()
+        bet.settle('WON')
+        bet.delete()
+        self.assertEqual(self.tipster.profile_stats.settled_bets, 0)
+
+    def test_settlement_changes_are_applied_as_deltas(self):
+        other = User.objects.create_user(username='othertipster', password='testpass123')
+        self._bet().settle('WON')
+        bet = BetTicket.objects.get(pk=self._bet(odds='3.00', stake='5.00').pk)
+        bet.settle('WON')
+        bet.status = 'LOST'  # corrected result
+        bet.save()
+        moved = self._bet(status='VOID')
+        moved.author = other
+        moved.save()
+
+        with self.assertNumQueries(1):
+            bet.is_verified = True
+            bet.save(update_fields=['is_verified'])
+
+        incremental = {
+            row.user_id: (row.settled_bets, row.wins, row.total_stake, row.won_revenue, row.lost_stakes)
+            for row in UserProfileStats.objects.all()
+        }
+        self.assertEqual(incremental[self.tipster.pk], (2, 1, Decimal('15.00'), Decimal('10.00'), Decimal('5.00')))
+        rebuild_profile_stats()
+        rebuilt = {
+            row.user_id: (row.settled_bets, row.wins, row.total_stake, row.won_revenue, row.lost_stakes)
+            for row in UserProfileStats.objects.all()
+        }
+        self.assertEqual(incremental, rebuilt)
+
+    def test_follow_and_unfollow_update_follower_count(self):
+        self.client.post(f'/api/social/follow/{self.tipster.pk}/toggle/')
+        profile = self.client.get(f'/api/users/{self.tipster.pk}/').json()
+        self.assertEqual(profile['follower_count'], 1)
+        self.assertTrue(profile['is_followed_by_me'])
+
+        self.client.post(f'/api/social/follow/{self.tipster.pk}/toggle/')
+        self.assertEqual(self.client.get(f'/api/users/{self.tipster.pk}/').json()['follower_count'], 0)
+
+    def test_sport_stats_and_badges_snapshot(self):
+        sport = Sport.objects.create(name='Tennis')
+        UserSportStats.objects.create(user=self.tipster, sport=sport, total_bets=4, wins=3, losses=1, units_returned=Decimal('6.0'))
+        ExpertBadge().award(self.tipster)
+
+        profile = self.client.get(f'/api/users/{self.tipster.pk}/').json()
+        self.assertEqual(profile['sport_stats'], [{'sport': 'Tennis', 'total_bets': 4, 'wins': 3, 'winrate': 75.0, 'roi': 50.0}])
+        self.assertEqual([b['badge_name'] for b in profile['badges']], [ExpertBadge.slug])
+
+    def test_profile_served_in_two_queries(self):
+        self._bet().settle('WON')
+        Follow.objects.create(follower=self.fan, followed=self.tipster)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/users/{self.tipster.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+        self.client.force_authenticate(user=self.tipster)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/me/').json()['stats']['total_bets'], 1)
+
+    def test_new_user_has_empty_stats(self):
+        profile = self.client.get(f'/api/users/{self.tipster.pk}/').json()
+        self.assertEqual(profile['stats'], {'roi': 0, 'win_rate': 0, 'total_bets': 0, 'total_profit': 0})
+        self.assertEqual((profile['follower_count'], profile['sport_stats'], profile['badges']), (0, [], []))
+
+    def test_user_with_stats_can_be_deleted(self):
+        self._bet().settle('WON')
+        Follow.objects.create(follower=self.fan, followed=self.tipster)
+        self.tipster.delete()
+        self.assertFalse(UserProfileStats.objects.filter(user_id=self.tipster.pk).exists())
+
+    def test_rebuild_matches_incremental_updates(self):
+        self._bet().settle('WON')
+        self._bet(stake='5.00').settle('VOID')
+        Follow.objects.create(follower=self.fan, followed=self.tipster)
+        before = UserProfileStats.objects.get(user=self.tipster)
+
+        BetTicket.objects.filter(author=self.tipster).update(status='LOST')  # bypasses signals
+        rebuild_profile_stats()
+
+        after = UserProfileStats.objects.get(user=self.tipster)
+        self.assertEqual((after.settled_bets, after.wins, after.follower_count), (2, 0, before.follower_count))
+        self.assertEqual(after.lost_stakes, Decimal('15.00'))
@@ -117,5 +117,6 @@ def update_reputation(user):
 
     UserGlobalStats.objects.filter(user=user).update(
         reputation_score=score,
-        profile_halo_color=color
+        profile_halo_color=color,
+        modified=timezone.now(),
     )
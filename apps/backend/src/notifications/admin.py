@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import PushToken, Notification
+from .models import PushToken, Notification, OutboundEmail
 
 
 @admin.register(PushToken)
@@ -14,3 +14,11 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('recipient', 'notification_type', 'title', 'is_read', 'push_sent', 'created')
     list_filter = ('notification_type', 'is_read', 'push_sent')
     search_fields = ('recipient__username', 'title')
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'created', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'dedupe_key')
+    readonly_fields = ('dedupe_key', 'attempts', 'last_error', 'sent_at', 'created', 'modified')
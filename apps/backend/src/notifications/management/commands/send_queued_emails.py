@@ -0,0 +1,37 @@
+"""
+Email outbox worker — delivers emails queued with notifications.outbox.queue_email().
+
+Usage:
+    python manage.py send_queued_emails            # one batch, then exit
+    python manage.py send_queued_emails --loop     # run forever (worker container)
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notifications.outbox import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Send queued transactional emails in batches over one SMTP connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls when idle.')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            counts = send_queued_emails(batch_size=options['batch_size'])
+            handled = counts['sent'] + counts['failed'] + counts['dead']
+            if handled:
+                self.stdout.write(
+                    f"[email] sent={counts['sent']} failed={counts['failed']} dead={counts['dead']}"
+                )
+
+            if not options['loop']:
+                break
+            if handled < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0002_outboundemail"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="outboundemail",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("SENT", "Sent"),
+                    ("FAILED", "Failed (will retry)"),
+                    ("DEAD", "Dead letter"),
+                    ("SENDING", "Sending"),
+                ],
+                default="PENDING",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from core.models import TimeStampedModel
 
 
@@ -65,3 +66,41 @@ class Notification(TimeStampedModel):
 
     def __str__(self):
         return f"[{self.notification_type}] → {self.recipient.username}: {self.title}"
+
+
+class OutboundEmail(TimeStampedModel):
+    """
+    Transactional email outbox. Request and webhook code queues rows here;
+    `manage.py send_queued_emails` delivers them in batches over one SMTP connection.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        FAILED = 'FAILED', 'Failed (will retry)'
+        DEAD = 'DEAD', 'Dead letter'
+        # Claimed by a sender until next_attempt_at (then claimable again).
+        SENDING = 'SENDING', 'Sending'
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(help_text='List of recipient addresses')
+    dedupe_key = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text='SHA-256 of sender, recipients, subject and body'
+    )
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"[{self.status}] {self.subject} → {', '.join(self.recipients)}"
@@ -0,0 +1,201 @@
+"""
+Transactional email outbox.
+
+`queue_email()` replaces inline `send_mail()` calls: it only inserts a row, so
+request and webhook paths never wait on SMTP. `send_queued_emails()` delivers
+pending rows over a single SMTP connection per batch, without holding a
+transaction or row locks during SMTP calls.
+"""
+import hashlib
+import json
+import logging
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = timedelta(minutes=1)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
+
+def _dedupe_key(subject, body, from_email, recipients):
+    raw = json.dumps([from_email, recipients, subject, body], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """
+    Queue an email for the sender worker. Same arguments as `send_mail`.
+
+    An identical message (same sender, recipients, subject and body) queued within
+    EMAIL_OUTBOX_DEDUPE_WINDOW seconds is not queued twice; the existing row is returned.
+    """
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+    recipients = sorted({r for r in recipient_list if r})
+    if not recipients:
+        logger.warning(f"Email '{subject}' has no recipients, not queued")
+        return None
+
+    dedupe_key = _dedupe_key(subject, message, from_email, recipients)
+    window_start = timezone.now() - timedelta(seconds=settings.EMAIL_OUTBOX_DEDUPE_WINDOW)
+    existing = OutboundEmail.objects.filter(
+        dedupe_key=dedupe_key,
+        created__gte=window_start,
+    ).exclude(status=OutboundEmail.Status.DEAD).first()
+    if existing:
+        logger.info(f"Email '{subject}' already queued as {existing.id}, skipping duplicate")
+        return existing
+
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        recipients=recipients,
+        dedupe_key=dedupe_key,
+    )
+
+
+def _is_permanent_failure(error):
+    """5xx SMTP replies and refused recipients will not succeed on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    if _is_permanent_failure(error) or email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutboundEmail.Status.DEAD
+        logger.error(f"Email {email.id} dead-lettered after {email.attempts} attempt(s): {error}")
+    else:
+        delay = min(RETRY_BASE_DELAY * (2 ** (email.attempts - 1)), RETRY_MAX_DELAY)
+        email.status = OutboundEmail.Status.FAILED
+        email.next_attempt_at = timezone.now() + delay
+        logger.warning(f"Email {email.id} failed (attempt {email.attempts}), retrying in {delay}: {error}")
+
+
+def _claim_batch(batch_size):
+    """
+    Claim up to `batch_size` due rows in a short transaction: they stay SENDING
+    until the returned lease expiry, which every later write of this sender
+    checks. A SENDING row whose lease ran out was left by a sender that died
+    mid-batch; taking it over counts as a failed attempt, so a message that
+    keeps killing the sender still ends up DEAD. Returns (batch, lease, dead).
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+    with transaction.atomic():
+        rows = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(
+                status__in=[OutboundEmail.Status.PENDING, OutboundEmail.Status.FAILED, OutboundEmail.Status.SENDING],
+                next_attempt_at__lte=now,
+            )
+            .order_by('next_attempt_at', 'created')[:batch_size]
+        )
+        batch, dead = [], 0
+        for email in rows:
+            if email.status == OutboundEmail.Status.SENDING:
+                email.attempts += 1
+                email.last_error = 'Sender lease expired before the message was marked sent'
+                if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    email.status = OutboundEmail.Status.DEAD
+                    logger.error(f"Email {email.id} dead-lettered after {email.attempts} attempt(s): sender lease expired")
+                    dead += 1
+                    continue
+            email.status = OutboundEmail.Status.SENDING
+            email.next_attempt_at = lease
+            batch.append(email)
+        OutboundEmail.objects.bulk_update(rows, ['status', 'attempts', 'next_attempt_at', 'last_error'])
+    return batch, lease, dead
+
+
+def send_queued_emails(batch_size=100):
+    """
+    Send one batch of due emails over a single SMTP connection.
+    Returns counts of sent / failed / dead messages.
+
+    Rows are claimed first, then sent outside any transaction; each one is
+    marked sent (or failed) by its own UPDATE right after its SMTP call, so a
+    crash mid-batch only resends the message that was in flight.
+    """
+    batch, lease, dead = _claim_batch(batch_size)
+    counts = {'sent': 0, 'failed': 0, 'dead': dead}
+    if not batch:
+        return counts
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        # Server unreachable: the whole batch is a transient failure.
+        for email in batch:
+            _record_failure(email, e)
+            _save(email, lease)
+            counts['dead' if email.status == OutboundEmail.Status.DEAD else 'failed'] += 1
+        return counts
+
+    try:
+        for position, email in enumerate(batch):
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=email.recipients,
+                connection=connection,
+            )
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                _record_failure(email, e)
+                _save(email, lease)
+                counts['dead' if email.status == OutboundEmail.Status.DEAD else 'failed'] += 1
+                # The SMTP session may be unusable after an error; start a fresh one.
+                connection.close()
+                try:
+                    connection.open()
+                except Exception:
+                    logger.error("SMTP reconnect failed, leaving the rest of the batch for later")
+                    # Not attempted: due again right away, without counting an attempt.
+                    for unsent in batch[position + 1:]:
+                        unsent.status = OutboundEmail.Status.FAILED if unsent.attempts else OutboundEmail.Status.PENDING
+                        unsent.next_attempt_at = timezone.now()
+                        _save(unsent, lease)
+                    break
+                continue
+
+            email.status = OutboundEmail.Status.SENT
+            email.attempts += 1
+            email.sent_at = timezone.now()
+            email.last_error = ''
+            _save(email, lease)
+            counts['sent'] += 1
+    finally:
+        connection.close()
+
+    return counts
+
+
+def _save(email, lease):
+    """Write the row back, unless another sender took it over after our lease ran out."""
+    saved = OutboundEmail.objects.filter(
+        pk=email.pk, status=OutboundEmail.Status.SENDING, next_attempt_at=lease,
+    ).update(
+        status=email.status,
+        attempts=email.attempts,
+        next_attempt_at=email.next_attempt_at,
+        last_error=email.last_error,
+        sent_at=email.sent_at,
+    )
+    if not saved:
+        logger.warning(f"Email {email.id} was taken over by another sender, leaving its status to it")
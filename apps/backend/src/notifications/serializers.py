@@ -48,5 +48,5 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     def get_sender_avatar(self, obj):
         if obj.sender:
-            return obj.sender.avatar_url
+            return obj.sender.avatar_variant_url('small')
         return None
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -225,3 +225,158 @@ class HealthCheckTests(TestCase):
         response = self.client.get('/api/health/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json(), {'status': 'ok'})
+
+
+class EmailOutboxTests(TestCase):
+    """Transactional emails are queued and sent in batches by the worker."""
+
+    def test_queue_email_dedupes_identical_messages(self):
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email
+
+        first = queue_email('Hello', 'Body', ['a@example.com'])
+        second = queue_email('Hello', 'Body', ['a@example.com'])
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+        queue_email('Hello', 'Other body', ['a@example.com'])
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_batch_uses_single_connection(self):
+        from unittest.mock import patch
+        from django.core import mail
+        from django.core.mail import get_connection
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email, send_queued_emails
+
+        for i in range(3):
+            queue_email(f'Subject {i}', 'Body', [f'user{i}@example.com'])
+
+        with patch('notifications.outbox.get_connection', wraps=get_connection) as mock_conn:
+            counts = send_queued_emails()
+
+        self.assertEqual(mock_conn.call_count, 1)
+        self.assertEqual(counts['sent'], 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.Status.SENT).exists())
+
+    def test_transient_failure_is_retried_later(self):
+        import smtplib
+        from unittest.mock import patch
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email, send_queued_emails
+
+        email = queue_email('Hello', 'Body', ['a@example.com'])
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=smtplib.SMTPServerDisconnected('gone')):
+            counts = send_queued_emails()
+
+        self.assertEqual(counts['failed'], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.FAILED)
+        self.assertEqual(email.attempts, 1)
+        # Not due yet: the next run leaves it alone.
+        self.assertEqual(send_queued_emails()['sent'], 0)
+
+    def test_permanent_failure_is_dead_lettered(self):
+        import smtplib
+        from unittest.mock import patch
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email, send_queued_emails
+
+        email = queue_email('Hello', 'Body', ['a@example.com'])
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=smtplib.SMTPDataError(550, b'Mailbox unavailable')):
+            counts = send_queued_emails()
+
+        self.assertEqual(counts['dead'], 1)
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.Status.DEAD)
+
+    def test_crash_mid_batch_only_resends_the_message_in_flight(self):
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.core import mail
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.utils import timezone
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email, send_queued_emails
+
+        first = queue_email('First', 'Body', ['a@example.com'])
+        second = queue_email('Second', 'Body', ['b@example.com'])
+        OutboundEmail.objects.filter(pk=first.pk).update(next_attempt_at=first.next_attempt_at - timedelta(seconds=1))
+        send = EmailBackend.send_messages
+
+        def die_on_second(backend, messages):
+            if messages[0].subject == 'Second':
+                raise SystemExit('worker killed')
+            return send(backend, messages)
+
+        with patch.object(EmailBackend, 'send_messages', die_on_second):
+            with self.assertRaises(SystemExit):
+                send_queued_emails()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, OutboundEmail.Status.SENT)
+        self.assertEqual(second.status, OutboundEmail.Status.SENDING)
+        # Another worker leaves the claimed row alone until its lease runs out.
+        self.assertEqual(send_queued_emails()['sent'], 0)
+
+        OutboundEmail.objects.filter(pk=second.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_emails()['sent'], 1)
+        self.assertEqual([m.subject for m in mail.outbox], ['First', 'Second'])
+        # The crashed attempt counts.
+        second.refresh_from_db()
+        self.assertEqual(second.attempts, 2)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2)
+    def test_message_that_keeps_crashing_the_sender_is_dead_lettered(self):
+        from unittest.mock import patch
+        from django.utils import timezone
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email, send_queued_emails
+
+        email = queue_email('Poison', 'Body', ['a@example.com'])
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SystemExit('worker killed')):
+            for _ in range(2):
+                with self.assertRaises(SystemExit):
+                    send_queued_emails()
+                OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(send_queued_emails(), {'sent': 0, 'failed': 0, 'dead': 1})
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), (OutboundEmail.Status.DEAD, 2))
+
+    def test_row_taken_over_after_lease_expiry_is_not_overwritten(self):
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.core.mail.backends.locmem import EmailBackend
+        from django.utils import timezone
+        from notifications.models import OutboundEmail
+        from notifications.outbox import queue_email, send_queued_emails
+
+        email = queue_email('Slow', 'Body', ['a@example.com'])
+        send = EmailBackend.send_messages
+        other_lease = timezone.now() + timedelta(minutes=5)
+
+        def slow_send(backend, messages):
+            # Our lease ran out meanwhile and another sender claimed the row.
+            OutboundEmail.objects.filter(pk=email.pk).update(next_attempt_at=other_lease)
+            return send(backend, messages)
+
+        with patch.object(EmailBackend, 'send_messages', slow_send):
+            self.assertEqual(send_queued_emails()['sent'], 1)
+
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.next_attempt_at), (OutboundEmail.Status.SENDING, other_lease))
+
+    def test_password_reset_queues_email(self):
+        from django.core import mail
+        from notifications.models import OutboundEmail
+
+        User.objects.create_user(username='resetme', email='reset@example.com', password='testpass123')
+        response = APIClient().post('/api/auth/password-reset/', {'email': 'reset@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboundEmail.objects.filter(recipients=['reset@example.com']).count(), 1)
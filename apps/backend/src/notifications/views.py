@@ -1,6 +1,9 @@
+from django.db.models import Count, Max, Q
+from django.utils import timezone
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.pagination import CursorPagination
+from core.conditional import conditional_response
 from .models import PushToken, Notification
 from .serializers import PushTokenSerializer, NotificationSerializer
 
@@ -8,7 +11,7 @@ from .serializers import PushTokenSerializer, NotificationSerializer
 class NotificationCursorPagination(CursorPagination):
     """Cursor-based pagination for notifications — efficient for real-time feeds."""
     page_size = 20
-    ordering = '-created_at'
+    ordering = '-created'
     cursor_query_param = 'cursor'
 
 
@@ -39,6 +42,20 @@ class NotificationListView(generics.ListAPIView):
             recipient=self.request.user
         ).select_related('sender')
 
+    def list(self, request, *args, **kwargs):
+        # One aggregate decides whether the page can be a 304.
+        marker = Notification.objects.filter(recipient=request.user).aggregate(
+            count=Count('id'),
+            unread=Count('id', filter=Q(is_read=False)),
+            last_modified=Max('modified'),
+        )
+        return conditional_response(
+            request,
+            version=tuple(marker.values()),
+            last_modified=marker['last_modified'],
+            build=lambda: super(NotificationListView, self).list(request, *args, **kwargs),
+        )
+
 
 class MarkNotificationsReadView(generics.GenericAPIView):
     """
@@ -51,5 +68,5 @@ class MarkNotificationsReadView(generics.GenericAPIView):
         count = Notification.objects.filter(
             recipient=request.user,
             is_read=False,
-        ).update(is_read=True)
+        ).update(is_read=True, modified=timezone.now())
         return Response({'marked_read': count})
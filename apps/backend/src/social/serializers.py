@@ -13,8 +13,8 @@ class CommentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'user_name', 'user_avatar']
 
     def get_user_avatar(self, obj):
-        """Use real avatar_url property from CustomUser model."""
-        return obj.user.avatar_url
+        """Small avatar variant, sized for comment rows."""
+        return obj.user.avatar_variant_url('small')
 
     def validate_content(self, value):
         """S8-06: Sanitize comment content (anti-XSS)."""
@@ -204,7 +204,7 @@ class ResultSyncService:
         Args:
             match: The match that has been updated with final scores
         """
-        from tickets.models import BetSelection
+        from tickets.models import BetSelection, settle_legs
         
         # Vérification: Le match doit avoir des scores finaux
         if match.home_score is None or match.away_score is None:
@@ -250,7 +250,9 @@ class ResultSyncService:
         
         # Étape 3: Traiter chaque pari avec transaction atomique
         with transaction.atomic():
-            for bet in pending_bets:
+            # Re-selected under lock: legs settled meanwhile drop out, so
+            # settle_legs only sees real PENDING -> final transitions.
+            for bet in pending_bets.select_for_update():
                 # Normaliser la sélection du pari en minuscules
                 normalized_selection = bet.selection.lower().strip()
                 
@@ -277,13 +279,15 @@ class ResultSyncService:
             # Sauvegarder tous les BetSelections en une seule requête
             if updated_bets:
                 BetSelection.objects.bulk_update(updated_bets, ['outcome'])
+                # bulk_update ne passe pas par BetSelection.save(): règlement des tickets ici
+                settle_legs(updated_bets)
         
         # Résumé final
         logger.info(
             "[Settlement] Règlement terminé: %s gagnants, %s perdants sur %s paris",
             won_count,
             lost_count,
-            total_bets,
+            len(updated_bets),
         )
     
     def trigger_settlement(self, match):
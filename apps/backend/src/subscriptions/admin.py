@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Subscription, StripeEvent
+from django.utils import timezone
+from .models import Subscription, StripeEvent, TipsterDailyStats
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
@@ -10,7 +11,31 @@ class SubscriptionAdmin(admin.ModelAdmin):
 
 @admin.register(StripeEvent)
 class StripeEventAdmin(admin.ModelAdmin):
-    list_display = ('stripe_event_id', 'event_type', 'processed_at')
-    list_filter = ('event_type', 'processed_at')
-    search_fields = ('stripe_event_id', 'event_type')
-    readonly_fields = ('stripe_event_id', 'event_type', 'processed_at', 'payload')
+    list_display = ('stripe_event_id', 'event_type', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type', 'received_at')
+    search_fields = ('stripe_event_id', 'event_type', 'ordering_key')
+    readonly_fields = (
+        'stripe_event_id', 'event_type', 'ordering_key', 'stripe_created_at', 'received_at',
+        'processed_at', 'attempts', 'last_error', 'payload',
+    )
+    actions = ['requeue_events']
+
+    @admin.action(description='Requeue selected events')
+    def requeue_events(self, request, queryset):
+        count = queryset.exclude(status=StripeEvent.Status.PROCESSED).update(
+            status=StripeEvent.Status.PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{count} event(s) requeued.")
+
+
+@admin.register(TipsterDailyStats)
+class TipsterDailyStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'tipster', 'date', 'active_subscribers', 'new_subscribers', 'canceled_subscribers',
+        'past_due_subscribers', 'gross_revenue', 'net_revenue',
+    )
+    list_filter = ('date',)
+    search_fields = ('tipster__username',)
+    date_hierarchy = 'date'
@@ -0,0 +1,244 @@
+"""
+Tipster subscription analytics.
+
+Webhook handlers call `record_status_change()` / `record_invoice_paid()` inside
+the same transaction as the subscription update, so `TipsterDailyStats` stays
+consistent with `Subscription` without the dashboard ever scanning
+subscriptions or Stripe event payloads.
+"""
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.db.models import F
+from django.utils import timezone as django_timezone
+
+from subscriptions.models import TipsterDailyStats
+
+PLATFORM_FEE = Decimal('0.20')
+MAX_HISTORY_DAYS = 366
+
+# Statuses from which becoming active counts as a new subscriber.
+NEW_FROM_STATUSES = (None, 'canceled', 'incomplete')
+
+
+def event_day(event):
+    """Day (in the project time zone) on which Stripe created the event."""
+    created_ts = event.get('created')
+    if created_ts:
+        return django_timezone.localdate(datetime.fromtimestamp(created_ts, tz=timezone.utc))
+    return django_timezone.localdate()
+
+
+def _day_row(tipster_id, day):
+    """Get or create the row for this day, carrying the previous snapshot forward."""
+    previous_active = (
+        TipsterDailyStats.objects.filter(tipster_id=tipster_id, date__lt=day)
+        .order_by('-date')
+        .values_list('active_subscribers', flat=True)
+        .first()
+    ) or 0
+    row, _ = TipsterDailyStats.objects.get_or_create(
+        tipster_id=tipster_id,
+        date=day,
+        defaults={'active_subscribers': previous_active},
+    )
+    return row
+
+
+def record_status_change(tipster_id, old_status, new_status, day):
+    """Apply a subscription status transition to the tipster's rollup."""
+    if old_status == new_status:
+        return
+
+    counters = {}
+    if new_status == 'active' and old_status in NEW_FROM_STATUSES:
+        counters['new_subscribers'] = F('new_subscribers') + 1
+    elif new_status == 'canceled':
+        counters['canceled_subscribers'] = F('canceled_subscribers') + 1
+    elif new_status == 'past_due':
+        counters['past_due_subscribers'] = F('past_due_subscribers') + 1
+
+    active_delta = 0
+    if new_status == 'active':
+        active_delta = 1
+    elif old_status == 'active':
+        active_delta = -1
+
+    if not counters and not active_delta:
+        return
+
+    row = _day_row(tipster_id, day)
+    if counters:
+        TipsterDailyStats.objects.filter(pk=row.pk).update(**counters)
+    if active_delta:
+        # Later snapshots shift too when an event is applied out of date order.
+        TipsterDailyStats.objects.filter(tipster_id=tipster_id, date__gte=day).update(
+            active_subscribers=F('active_subscribers') + active_delta
+        )
+
+
+def record_invoice_paid(tipster_id, invoice, day):
+    """Add a paid invoice to the tipster's gross and net revenue for the day."""
+    amount_paid = invoice.get('amount_paid') or 0
+    if not amount_paid:
+        return
+
+    gross = Decimal(amount_paid) / 100
+    fee_cents = invoice.get('application_fee_amount')
+    fee = Decimal(fee_cents) / 100 if fee_cents is not None else gross * PLATFORM_FEE
+    net = (gross - fee).quantize(Decimal('0.01'))
+
+    row = _day_row(tipster_id, day)
+    TipsterDailyStats.objects.filter(pk=row.pk).update(
+        gross_revenue=F('gross_revenue') + gross,
+        net_revenue=F('net_revenue') + net,
+    )
+
+
+def _opening_active(tipster, start):
+    return (
+        TipsterDailyStats.objects.filter(tipster=tipster, date__lt=start)
+        .order_by('-date')
+        .values_list('active_subscribers', flat=True)
+        .first()
+    ) or 0
+
+
+def get_tipster_history(tipster, start, end, opening_active=None):
+    """
+    Daily series for `start`..`end` (inclusive) read from the rollup table.
+    Missing days repeat the previous snapshot with zero activity.
+    """
+    rows = {
+        row.date: row
+        for row in TipsterDailyStats.objects.filter(tipster=tipster, date__gte=start, date__lte=end)
+    }
+    active = _opening_active(tipster, start) if opening_active is None else opening_active
+
+    history = []
+    day = start
+    while day <= end:
+        row = rows.get(day)
+        if row:
+            active = row.active_subscribers
+        history.append({
+            'date': day.isoformat(),
+            'active_subscribers': active,
+            'new_subscribers': row.new_subscribers if row else 0,
+            'canceled_subscribers': row.canceled_subscribers if row else 0,
+            'past_due_subscribers': row.past_due_subscribers if row else 0,
+            'gross_revenue': float(row.gross_revenue) if row else 0.0,
+            'net_revenue': float(row.net_revenue) if row else 0.0,
+        })
+        day += timedelta(days=1)
+    return history
+
+
+def get_tipster_analytics(tipster, start, end):
+    """History plus totals, growth and churn for the dashboard (two queries)."""
+    opening_active = _opening_active(tipster, start)
+    history = get_tipster_history(tipster, start, end, opening_active=opening_active)
+
+    new = sum(day['new_subscribers'] for day in history)
+    canceled = sum(day['canceled_subscribers'] for day in history)
+    base = opening_active + new
+    summary = {
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'new_subscribers': new,
+        'canceled_subscribers': canceled,
+        'net_growth': (history[-1]['active_subscribers'] if history else opening_active) - opening_active,
+        'churn_rate': round(canceled / base, 4) if base else 0.0,
+        'gross_revenue': round(sum(day['gross_revenue'] for day in history), 2),
+        'net_revenue': round(sum(day['net_revenue'] for day in history), 2),
+    }
+    return {'history': history, 'summary': summary}
+
+
+def parse_history_range(params, today=None):
+    """
+    Resolve `?from=YYYY-MM-DD&to=YYYY-MM-DD` or `?days=N` (default 30) to a
+    (start, end) date pair. Raises ValueError on bad input.
+    """
+    today = today or django_timezone.localdate()
+    if params.get('from') or params.get('to'):
+        end = date.fromisoformat(params['to']) if params.get('to') else today
+        start = date.fromisoformat(params['from']) if params.get('from') else end - timedelta(days=29)
+    else:
+        days = int(params.get('days', 30))
+        if days < 1:
+            raise ValueError('days must be positive')
+        end = today
+        start = end - timedelta(days=days - 1)
+
+    if start > end:
+        raise ValueError('from must be before to')
+    if (end - start).days + 1 > MAX_HISTORY_DAYS:
+        raise ValueError(f'Range cannot exceed {MAX_HISTORY_DAYS} days')
+    return start, end
+
+
+def rebuild_tipster_stats():
+    """
+    Recompute every rollup row by replaying processed Stripe events in the
+    order they were processed (creation order for a subscription's events,
+    except a first invoice parked until its checkout). Used once to backfill
+    history and to repair drift; returns the number of events replayed.
+    """
+    from django.db import transaction
+    from subscriptions.models import StripeEvent, Subscription
+
+    tipster_by_subscription = dict(Subscription.objects.values_list('stripe_subscription_id', 'tipster_id'))
+    events = sorted(
+        StripeEvent.objects.filter(
+            status=StripeEvent.Status.PROCESSED,
+            event_type__in=[
+                'checkout.session.completed', 'invoice.paid',
+                'invoice.payment_failed', 'customer.subscription.deleted',
+            ],
+        ).values_list('event_type', 'payload', 'processed_at').iterator(),
+        key=lambda item: (item[2] or django_timezone.now(), item[1].get('created') or 0),
+    )
+
+    # Subscription state as it was at each point of the replay.
+    status_by_pair = {}
+    pair_by_subscription = {}
+
+    def pair_for(stripe_subscription_id):
+        if stripe_subscription_id in pair_by_subscription:
+            return pair_by_subscription[stripe_subscription_id]
+        tipster_id = tipster_by_subscription.get(stripe_subscription_id)
+        return (stripe_subscription_id, tipster_id) if tipster_id else None
+
+    with transaction.atomic():
+        TipsterDailyStats.objects.all().delete()
+        for event_type, event, _ in events:
+            obj = event.get('data', {}).get('object', {})
+            day = event_day(event)
+
+            if event_type == 'checkout.session.completed':
+                metadata = obj.get('metadata') or {}
+                if obj.get('mode') != 'subscription' or not metadata.get('tipster_id'):
+                    continue
+                pair = (metadata.get('follower_id'), metadata['tipster_id'])
+                if obj.get('subscription'):
+                    pair_by_subscription[obj['subscription']] = pair
+                new_status = 'active'
+            else:
+                stripe_subscription_id = obj.get('id') if event_type == 'customer.subscription.deleted' else obj.get('subscription')
+                pair = pair_for(stripe_subscription_id)
+                if pair is None:
+                    continue
+                new_status = {
+                    'invoice.paid': 'active',
+                    'invoice.payment_failed': 'past_due',
+                    'customer.subscription.deleted': 'canceled',
+                }[event_type]
+
+            tipster_id = pair[1]
+            record_status_change(tipster_id, status_by_pair.get(pair), new_status, day)
+            if event_type == 'invoice.paid':
+                record_invoice_paid(tipster_id, obj, day)
+            status_by_pair[pair] = new_status
+
+    return len(events)
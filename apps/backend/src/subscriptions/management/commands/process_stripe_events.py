@@ -0,0 +1,48 @@
+"""
+Stripe webhook worker — processes events stored by the webhook endpoint.
+
+Usage:
+    python manage.py process_stripe_events            # one batch, then exit
+    python manage.py process_stripe_events --loop     # run forever (worker container)
+    python manage.py process_stripe_events --stats    # print queue depth / lag and exit
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from subscriptions.webhooks import process_pending_stripe_events, get_webhook_lag_stats
+
+
+class Command(BaseCommand):
+    help = 'Process pending Stripe webhook events (retries, dead letter, lag reporting).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls when idle.')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--stats', action='store_true', help='Print queue/lag stats as JSON and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(get_webhook_lag_stats()))
+            return
+
+        while True:
+            close_old_connections()
+            counts = process_pending_stripe_events(batch_size=options['batch_size'])
+            worked = counts['processed'] + counts['failed'] + counts['dead'] + counts['waiting']
+            if worked:
+                stats = get_webhook_lag_stats()
+                self.stdout.write(
+                    f"[stripe] processed={counts['processed']} failed={counts['failed']} dead={counts['dead']} waiting={counts['waiting']} "
+                    f"deferred={counts['deferred']} pending={stats['pending']} dead_total={stats['dead']} "
+                    f"lag_p50={stats['lag_p50_seconds']}s lag_p95={stats['lag_p95_seconds']}s"
+                )
+
+            if not options['loop']:
+                break
+            # Drain a full batch without sleeping; back off only when idle.
+            if worked < options['batch_size']:
+                time.sleep(options['interval'])
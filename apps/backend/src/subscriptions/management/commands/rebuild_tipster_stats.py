@@ -0,0 +1,20 @@
+"""
+Rebuild the TipsterDailyStats rollup from stored Stripe events.
+
+Usage:
+    python manage.py rebuild_tipster_stats
+"""
+from django.core.management.base import BaseCommand
+
+from subscriptions.analytics import rebuild_tipster_stats
+from subscriptions.models import TipsterDailyStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily tipster subscription/revenue rollups by replaying processed Stripe events.'
+
+    def handle(self, *args, **options):
+        replayed = rebuild_tipster_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {replayed} event(s) into {TipsterDailyStats.objects.count()} daily row(s)."
+        ))
@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+STATUS_CHOICES = [
+    ("pending", "Pending"),
+    ("processed", "Processed"),
+    ("failed", "Failed (will retry)"),
+    ("dead", "Dead letter"),
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("subscriptions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="stripeevent",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="stripeevent",
+            name="last_error",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="stripeevent",
+            name="next_attempt_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="stripeevent",
+            name="ordering_key",
+            field=models.CharField(blank=True, default="", max_length=128),
+        ),
+        migrations.AddField(
+            model_name="stripeevent",
+            name="received_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        # Events stored before this migration were processed inline.
+        migrations.AddField(
+            model_name="stripeevent",
+            name="status",
+            field=models.CharField(
+                choices=STATUS_CHOICES, default="processed", max_length=20
+            ),
+        ),
+        migrations.AlterField(
+            model_name="stripeevent",
+            name="status",
+            field=models.CharField(
+                choices=STATUS_CHOICES, default="pending", max_length=20
+            ),
+        ),
+        migrations.AddField(
+            model_name="stripeevent",
+            name="stripe_created_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="stripeevent",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="stripeevent",
+            index=models.Index(
+                fields=["status", "next_attempt_at"],
+                name="subscriptio_status_474c12_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stripeevent",
+            index=models.Index(
+                fields=["ordering_key", "status"],
+                name="subscriptio_orderin_768ecf_idx",
+            ),
+        ),
+    ]
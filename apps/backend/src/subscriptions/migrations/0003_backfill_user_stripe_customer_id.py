@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:37
+
+from django.db import migrations
+
+
+def copy_customer_ids(apps, schema_editor):
+    """Seed CustomUser.stripe_customer_id from the follower's latest subscription."""
+    CustomUser = apps.get_model("users", "CustomUser")
+    Subscription = apps.get_model("subscriptions", "Subscription")
+
+    subscriptions = (
+        Subscription.objects.exclude(stripe_customer_id="")
+        .filter(follower__stripe_customer_id="")
+        .order_by("follower_id", "-created_at")
+        .values_list("follower_id", "stripe_customer_id")
+    )
+    seen = set()
+    for follower_id, customer_id in subscriptions.iterator():
+        if follower_id in seen:
+            continue
+        seen.add(follower_id)
+        CustomUser.objects.filter(pk=follower_id).update(stripe_customer_id=customer_id)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("subscriptions", "0002_stripeevent_async_processing"),
+        ("users", "0004_customuser_stripe_customer_id"),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_customer_ids, migrations.RunPython.noop),
+    ]
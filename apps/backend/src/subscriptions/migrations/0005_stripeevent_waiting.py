@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("subscriptions", "0004_tipsterdailystats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="stripeevent",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processed", "Processed"),
+                    ("failed", "Failed (will retry)"),
+                    ("dead", "Dead letter"),
+                    ("waiting", "Waiting for its subscription"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 class Subscription(models.Model):
     STATUS_CHOICES = [
@@ -24,10 +25,65 @@ class Subscription(models.Model):
         return f"{self.follower.username} -> {self.tipster.username} ({self.status})"
 
 class StripeEvent(models.Model):
+    """
+    Raw Stripe webhook event, persisted on receipt and processed
+    asynchronously by `manage.py process_stripe_events`.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSED = 'processed', 'Processed'
+        FAILED = 'failed', 'Failed (will retry)'
+        DEAD = 'dead', 'Dead letter'
+        # invoice.paid delivered before the checkout that creates its Subscription.
+        WAITING = 'waiting', 'Waiting for its subscription'
+
     stripe_event_id = models.CharField(max_length=64, unique=True)
     event_type = models.CharField(max_length=64)
-    processed_at = models.DateTimeField(auto_now_add=True)
     payload = models.JSONField()
+    status = models.CharField(choices=Status.choices, max_length=20, default=Status.PENDING)
+    # Stripe object the event mutates (usually the subscription ID).
+    # Events sharing a key are processed in Stripe creation order.
+    ordering_key = models.CharField(max_length=128, blank=True, default='')
+    stripe_created_at = models.DateTimeField(null=True, blank=True)
+    received_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['ordering_key', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Event {self.stripe_event_id} ({self.event_type}, {self.status})"
+
+
+class TipsterDailyStats(models.Model):
+    """
+    Daily per-tipster subscription rollup, maintained incrementally by the
+    webhook handlers (see subscriptions.analytics).
+
+    `active_subscribers` is the end-of-day snapshot; the other fields count what
+    happened during the day. Days without activity have no row and carry the
+    previous day's snapshot forward.
+    """
+    tipster = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE, related_name='daily_subscription_stats')
+    date = models.DateField()
+    active_subscribers = models.IntegerField(default=0)
+    new_subscribers = models.PositiveIntegerField(default=0)
+    canceled_subscribers = models.PositiveIntegerField(default=0)
+    past_due_subscribers = models.PositiveIntegerField(default=0)
+    gross_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    net_revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('tipster', 'date')
+        ordering = ['date']
+        verbose_name_plural = 'Tipster daily stats'
 
     def __str__(self):
-        return f"Event {self.stripe_event_id} ({self.event_type})"
+        return f"{self.tipster.username} {self.date} ({self.active_subscribers} active)"
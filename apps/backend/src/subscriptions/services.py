@@ -2,8 +2,11 @@ import logging
 import stripe
 from decimal import Decimal
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from connect.models import ConnectedAccount
-from users.models import TipsterProfile
+from users.models import CustomUser, TipsterProfile
+from subscriptions.analytics import record_status_change
 
 logger = logging.getLogger(__name__)
 
@@ -13,20 +16,40 @@ class TipsterNotOnboardedError(Exception):
 
 
 def get_or_create_stripe_customer(user) -> str:
+    """
+    Return the Stripe Customer ID for this user.
+
+    1. If the user already has a stripe_customer_id, use it (no Stripe call).
+    2. Otherwise look the customer up by email once (accounts created before the ID was stored),
+       or create it, and store the ID on the user.
+    """
+    if user.stripe_customer_id:
+        return user.stripe_customer_id
+
     stripe.api_key = settings.STRIPE_SECRET_KEY
     if not stripe.api_key:
         logger.error("Missing STRIPE_SECRET_KEY")
         raise ValueError("Missing STRIPE_SECRET_KEY")
 
-    customers = stripe.Customer.list(email=user.email)
+    customers = stripe.Customer.list(email=user.email, limit=1)
     if customers.data:
         customer_id = customers.data[0].id
         logger.info(f"Found existing Stripe customer for user {user.email}: {customer_id}")
-        return customer_id
+    else:
+        customer = stripe.Customer.create(email=user.email, metadata={'user_id': str(user.id)})
+        customer_id = customer.id
+        logger.info(f"Created new Stripe customer for user {user.email}: {customer_id}")
+
+    save_stripe_customer_id(user, customer_id)
+    return customer_id
 
-    customer = stripe.Customer.create(email=user.email, metadata={'user_id': str(user.id)})
-    logger.info(f"Created new Stripe customer for user {user.email}: {customer.id}")
-    return customer.id
+
+def save_stripe_customer_id(user, customer_id):
+    """Store the Stripe Customer ID on the user unless one is already set."""
+    if not customer_id or user.stripe_customer_id:
+        return
+    CustomUser.objects.filter(pk=user.pk, stripe_customer_id='').update(stripe_customer_id=customer_id)
+    user.stripe_customer_id = customer_id
 
 
 def get_or_create_tipster_price(tipster) -> str:
@@ -137,12 +160,16 @@ def cancel_subscription(subscription):
     if not stripe.api_key:
         raise ValueError("Missing STRIPE_SECRET_KEY")
 
+    previous_status = subscription.status
     try:
         stripe.Subscription.cancel(subscription.stripe_subscription_id)
-        subscription.status = 'canceled'
-        subscription.save()
         logger.info(f"Canceled subscription {subscription.id} (stripe: {subscription.stripe_subscription_id})")
     except stripe.error.InvalidRequestError as e:
         logger.error(f"Stripe error canceling subscription: {e}")
+
+    # Status and churn rollup together, as in the webhook handlers; the
+    # customer.subscription.deleted webhook then sees no status change.
+    with transaction.atomic():
         subscription.status = 'canceled'
         subscription.save()
+        record_status_change(subscription.tipster_id, previous_status, 'canceled', timezone.localdate())
@@ -0,0 +1,150 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from subscriptions.models import StripeEvent, TipsterDailyStats
+from subscriptions.webhooks import _handle_stripe_event, enqueue_stripe_event, process_pending_stripe_events
+
+User = get_user_model()
+
+
+def _ts(day):
+    return int(datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc).timestamp())
+
+
+@patch("subscriptions.webhooks.send_subscription_canceled_email")
+@patch("subscriptions.webhooks.send_new_subscriber_email")
+@patch("subscriptions.webhooks.send_welcome_subscriber_email")
+class TestTipsterDailyStats(APITestCase):
+    def setUp(self):
+        self.tipster = User.objects.create_user(username="tipster", email="t@t.com", password="p")
+        self.follower = User.objects.create_user(username="f1", email="f1@t.com", password="p")
+        self.other = User.objects.create_user(username="f2", email="f2@t.com", password="p")
+
+    def _checkout(self, follower, sub_id, day):
+        _handle_stripe_event({
+            "id": f"evt_co_{sub_id}", "type": "checkout.session.completed", "created": _ts(day),
+            "data": {"object": {
+                "id": f"cs_{sub_id}", "mode": "subscription", "subscription": sub_id, "customer": "cus_1",
+                "metadata": {"follower_id": str(follower.id), "tipster_id": str(self.tipster.id)},
+            }},
+        })
+
+    def _invoice(self, event_type, sub_id, day, amount=2000, fee=400):
+        _handle_stripe_event({
+            "id": f"evt_{event_type}_{sub_id}_{day}", "type": event_type, "created": _ts(day),
+            "data": {"object": {
+                "id": f"in_{sub_id}_{day}", "subscription": sub_id,
+                "amount_paid": amount, "application_fee_amount": fee,
+            }},
+        })
+
+    def _deleted(self, sub_id, day):
+        _handle_stripe_event({
+            "id": f"evt_del_{sub_id}", "type": "customer.subscription.deleted", "created": _ts(day),
+            "data": {"object": {"id": sub_id, "object": "subscription"}},
+        })
+
+    def _run_scenario(self):
+        self._checkout(self.follower, "sub_1", date(2026, 5, 1))
+        self._invoice("invoice.paid", "sub_1", date(2026, 5, 1))
+        self._checkout(self.other, "sub_2", date(2026, 5, 2))
+        self._invoice("invoice.paid", "sub_2", date(2026, 5, 2))
+        self._invoice("invoice.payment_failed", "sub_1", date(2026, 5, 4))
+        self._deleted("sub_1", date(2026, 5, 5))
+
+    def _rows(self):
+        return {
+            row.date.day: row
+            for row in TipsterDailyStats.objects.filter(tipster=self.tipster)
+        }
+
+    def test_webhooks_maintain_daily_rollup(self, *mocks):
+        self._run_scenario()
+        rows = self._rows()
+
+        self.assertEqual(rows[1].new_subscribers, 1)
+        self.assertEqual(rows[1].active_subscribers, 1)
+        self.assertEqual(float(rows[1].gross_revenue), 20.0)
+        self.assertEqual(float(rows[1].net_revenue), 16.0)
+        self.assertEqual(rows[2].active_subscribers, 2)
+        self.assertEqual(rows[4].past_due_subscribers, 1)
+        self.assertEqual(rows[4].active_subscribers, 1)
+        self.assertEqual(rows[5].canceled_subscribers, 1)
+        self.assertEqual(rows[5].active_subscribers, 1)
+
+    def test_first_invoice_before_checkout_is_counted(self, *mocks):
+        # Stripe's real order: the first invoice.paid is created before checkout.session.completed.
+        day = date(2026, 5, 1)
+        invoice = {
+            "id": "evt_first_invoice", "type": "invoice.paid", "created": _ts(day) - 5,
+            "data": {"object": {"id": "in_first", "subscription": "sub_1", "amount_paid": 2000, "application_fee_amount": 400}},
+        }
+        enqueue_stripe_event(invoice)
+        enqueue_stripe_event({
+            "id": "evt_co_sub_1", "type": "checkout.session.completed", "created": _ts(day),
+            "data": {"object": {
+                "id": "cs_sub_1", "mode": "subscription", "subscription": "sub_1", "customer": "cus_1",
+                "metadata": {"follower_id": str(self.follower.id), "tipster_id": str(self.tipster.id)},
+            }},
+        })
+
+        counts = process_pending_stripe_events()
+        self.assertEqual((counts["waiting"], counts["processed"]), (1, 1))
+        self.assertEqual(StripeEvent.objects.get(stripe_event_id="evt_first_invoice").status, StripeEvent.Status.PENDING)
+        process_pending_stripe_events()
+
+        self.assertEqual(StripeEvent.objects.get(stripe_event_id="evt_first_invoice").status, StripeEvent.Status.PROCESSED)
+        row = self._rows()[1]
+        live = (row.new_subscribers, row.active_subscribers, row.gross_revenue, row.net_revenue)
+        self.assertEqual(live, (1, 1, Decimal("20.00"), Decimal("16.00")))
+
+        call_command("rebuild_tipster_stats", stdout=StringIO())
+        row = self._rows()[1]
+        self.assertEqual((row.new_subscribers, row.active_subscribers, row.gross_revenue, row.net_revenue), live)
+
+    def test_dashboard_reads_history_for_range(self, *mocks):
+        self._run_scenario()
+        self.client.force_authenticate(user=self.tipster)
+
+        response = self.client.get(reverse("my-dashboard"), {"from": "2026-05-01", "to": "2026-05-06"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        history = response.data["history"]
+        self.assertEqual(len(history), 6)
+        self.assertEqual([d["active_subscribers"] for d in history], [1, 2, 2, 1, 1, 1])
+        summary = response.data["summary"]
+        self.assertEqual(summary["new_subscribers"], 2)
+        self.assertEqual(summary["canceled_subscribers"], 1)
+        self.assertEqual(summary["net_growth"], 1)
+        self.assertEqual(summary["churn_rate"], 0.5)
+        self.assertEqual(summary["gross_revenue"], 40.0)
+        self.assertEqual(summary["net_revenue"], 32.0)
+
+    def test_dashboard_rejects_bad_range(self, *mocks):
+        self.client.force_authenticate(user=self.tipster)
+        response = self.client.get(reverse("my-dashboard"), {"from": "2026-05-06", "to": "2026-05-01"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_replays_events(self, *mocks):
+        self._run_scenario()
+        expected = {
+            day: (row.active_subscribers, row.new_subscribers, row.canceled_subscribers, row.net_revenue)
+            for day, row in self._rows().items()
+        }
+        TipsterDailyStats.objects.all().update(active_subscribers=99)
+
+        call_command("rebuild_tipster_stats", stdout=StringIO())
+
+        rebuilt = {
+            day: (row.active_subscribers, row.new_subscribers, row.canceled_subscribers, row.net_revenue)
+            for day, row in self._rows().items()
+        }
+        self.assertEqual(rebuilt, expected)
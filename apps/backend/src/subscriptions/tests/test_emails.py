@@ -9,7 +9,7 @@ class TestSubscriptionEmails(APITestCase):
         self.tipster = User.objects.create_user(username="t", email="t@t.com", password="p")
         self.follower = User.objects.create_user(username="f", email="f@t.com", password="p")
 
-    @patch("subscriptions.emails.send_mail")
+    @patch("subscriptions.emails.queue_email")
     def test_new_subscriber_email_sent(self, mock_send):
         from subscriptions.emails import send_new_subscriber_email
         send_new_subscriber_email(self.tipster, self.follower)
@@ -21,14 +21,14 @@ class TestSubscriptionEmails(APITestCase):
             recipients = mock_send.call_args.args[3]
         self.assertIn(self.tipster.email, recipients)
 
-    @patch("subscriptions.emails.send_mail")
+    @patch("subscriptions.emails.queue_email")
     def test_email_failure_does_not_crash(self, mock_send):
         mock_send.side_effect = Exception("SMTP error")
         from subscriptions.emails import send_new_subscriber_email
         # Should NOT raise — fail_silently + try/except
         send_new_subscriber_email(self.tipster, self.follower)
 
-    @patch("subscriptions.emails.send_mail")
+    @patch("subscriptions.emails.queue_email")
     def test_subscription_canceled_email_sent(self, mock_send):
         from subscriptions.emails import send_subscription_canceled_email
         send_subscription_canceled_email(self.tipster, self.follower)
@@ -39,7 +39,7 @@ class TestSubscriptionEmails(APITestCase):
             recipients = mock_send.call_args.args[3]
         self.assertIn(self.tipster.email, recipients)
 
-    @patch("subscriptions.emails.send_mail")
+    @patch("subscriptions.emails.queue_email")
     def test_welcome_subscriber_email_sent(self, mock_send):
         from subscriptions.emails import send_welcome_subscriber_email
         send_welcome_subscriber_email(self.follower, self.tipster)
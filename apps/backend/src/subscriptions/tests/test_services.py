@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from connect.models import ConnectedAccount
+from subscriptions.models import Subscription, TipsterDailyStats
+from subscriptions.services import cancel_subscription, create_subscription_checkout, get_or_create_stripe_customer
+from users.models import TipsterProfile
+
+User = get_user_model()
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_dummy')
+class TestStripeCustomerCache(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='follower', email='f@t.com', password='p')
+
+    @patch('subscriptions.services.stripe.Customer.create')
+    @patch('subscriptions.services.stripe.Customer.list')
+    def test_customer_is_created_once_then_reused(self, mock_list, mock_create):
+        mock_list.return_value = SimpleNamespace(data=[])
+        mock_create.return_value = SimpleNamespace(id='cus_new')
+
+        self.assertEqual(get_or_create_stripe_customer(self.user), 'cus_new')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.stripe_customer_id, 'cus_new')
+
+        self.assertEqual(get_or_create_stripe_customer(self.user), 'cus_new')
+        mock_list.assert_called_once()
+        mock_create.assert_called_once()
+
+    @patch('subscriptions.services.stripe.Customer.create')
+    @patch('subscriptions.services.stripe.Customer.list')
+    def test_existing_customer_found_by_email_is_stored(self, mock_list, mock_create):
+        mock_list.return_value = SimpleNamespace(data=[SimpleNamespace(id='cus_legacy')])
+
+        self.assertEqual(get_or_create_stripe_customer(self.user), 'cus_legacy')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.stripe_customer_id, 'cus_legacy')
+        mock_create.assert_not_called()
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_dummy')
+class TestCheckoutStripeCalls(TestCase):
+    def setUp(self):
+        self.follower = User.objects.create_user(
+            username='follower', email='f@t.com', password='p', stripe_customer_id='cus_known'
+        )
+        self.tipster = User.objects.create_user(username='tipster', email='t@t.com', password='p')
+        TipsterProfile.objects.create(user=self.tipster, stripe_price_id='price_known')
+        ConnectedAccount.objects.create(
+            user=self.tipster, stripe_account_id='acct_test',
+            charges_enabled=True, onboarding_completed=True,
+        )
+
+    @patch('subscriptions.services.stripe.Price.create')
+    @patch('subscriptions.services.stripe.Product.create')
+    @patch('subscriptions.services.stripe.Customer.create')
+    @patch('subscriptions.services.stripe.Customer.list')
+    @patch('subscriptions.services.stripe.checkout.Session.create')
+    def test_returning_customer_checkout_makes_one_stripe_call(
+        self, mock_session, mock_list, mock_customer, mock_product, mock_price
+    ):
+        mock_session.return_value = SimpleNamespace(id='cs_test', url='https://checkout.stripe.com/cs_test')
+
+        url = create_subscription_checkout(self.follower, self.tipster, 'https://ok', 'https://cancel')
+
+        self.assertEqual(url, 'https://checkout.stripe.com/cs_test')
+        mock_session.assert_called_once()
+        self.assertEqual(mock_session.call_args.kwargs['customer'], 'cus_known')
+        # The stored customer and price are reused: no lookup or create round trips.
+        for mock in (mock_list, mock_customer, mock_product, mock_price):
+            mock.assert_not_called()
+
+
+@override_settings(STRIPE_SECRET_KEY='sk_test_dummy')
+class TestCancelSubscription(TestCase):
+    def setUp(self):
+        follower = User.objects.create_user(username='follower', email='f@t.com', password='p')
+        tipster = User.objects.create_user(username='tipster', email='t@t.com', password='p')
+        self.subscription = Subscription.objects.create(
+            follower=follower, tipster=tipster, stripe_subscription_id='sub_cancel', status='active',
+        )
+
+    @patch('subscriptions.services.stripe.Subscription.cancel')
+    def test_status_and_rollup_are_written_together(self, mock_cancel):
+        with patch('subscriptions.services.record_status_change', side_effect=RuntimeError('rollup down')):
+            with self.assertRaises(RuntimeError):
+                cancel_subscription(self.subscription)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, 'active')
+
+        cancel_subscription(self.subscription)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, 'canceled')
+        self.assertEqual(TipsterDailyStats.objects.get(tipster=self.subscription.tipster).canceled_subscribers, 1)
@@ -1,8 +1,10 @@
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from unittest.mock import patch
-from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta, timezone
+from django.test import override_settings
+from django.utils import timezone as django_timezone
 from subscriptions.models import Subscription, StripeEvent
 from connect.models import ConnectedAccount
 from subscriptions.webhooks import (
@@ -11,7 +13,10 @@ from subscriptions.webhooks import (
     _handle_invoice_payment_failed,
     _handle_customer_subscription_deleted,
     _handle_account_updated,
-    _handle_stripe_event
+    _handle_stripe_event,
+    enqueue_stripe_event,
+    process_pending_stripe_events,
+    get_webhook_lag_stats,
 )
 
 User = get_user_model()
@@ -51,6 +56,9 @@ class TestWebhookCheckoutCompleted(APITestCase):
         mock_new_sub.assert_called_once_with(self.tipster, self.follower)
         mock_welcome.assert_called_once_with(self.follower, self.tipster)
 
+        self.follower.refresh_from_db()
+        self.assertEqual(self.follower.stripe_customer_id, "cus_test_123")
+
     @patch("subscriptions.webhooks.send_new_subscriber_email")
     @patch("subscriptions.webhooks.send_welcome_subscriber_email")
     def test_skips_non_subscription_mode(self, mock_welcome, mock_new_sub):
@@ -261,3 +269,122 @@ class TestStripeWebhookEndpoint(APITestCase):
             content_type="application/json"
         )
         self.assertEqual(response.status_code, 400)
+
+    @patch("subscriptions.webhooks.send_new_subscriber_email")
+    @patch("subscriptions.webhooks.send_welcome_subscriber_email")
+    @patch("stripe.Webhook.construct_event")
+    def test_handled_event_is_stored_not_processed(self, mock_construct, mock_welcome, mock_new_sub):
+        follower = User.objects.create_user(username="f", email="f@t.com", password="p")
+        tipster = User.objects.create_user(username="t", email="t@t.com", password="p")
+        mock_construct.return_value = {
+            "id": "evt_async",
+            "type": "checkout.session.completed",
+            "created": 1700000000,
+            "data": {"object": {
+                "id": "cs_async", "mode": "subscription", "subscription": "sub_async", "customer": "cus_async",
+                "metadata": {"follower_id": str(follower.id), "tipster_id": str(tipster.id)},
+            }},
+        }
+
+        response = self.client.post(
+            reverse("stripe-webhook"),
+            data=b"{}",
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE="sig_test"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        event = StripeEvent.objects.get(stripe_event_id="evt_async")
+        self.assertEqual(event.status, StripeEvent.Status.PENDING)
+        self.assertEqual(event.ordering_key, "sub_async")
+        self.assertEqual(Subscription.objects.count(), 0)
+        mock_new_sub.assert_not_called()
+
+        process_pending_stripe_events()
+
+        event.refresh_from_db()
+        self.assertEqual(event.status, StripeEvent.Status.PROCESSED)
+        self.assertEqual(Subscription.objects.get().stripe_subscription_id, "sub_async")
+
+
+class TestStripeEventWorker(APITestCase):
+    def setUp(self):
+        self.follower = User.objects.create_user(username="f", email="f@t.com", password="p")
+        self.tipster = User.objects.create_user(username="t", email="t@t.com", password="p")
+        self.subscription = Subscription.objects.create(
+            follower=self.follower,
+            tipster=self.tipster,
+            stripe_subscription_id="sub_worker",
+            status="active"
+        )
+
+    def _event(self, event_id, event_type, created):
+        obj = {"id": "sub_worker"} if event_type.startswith("customer.") else {"id": f"in_{event_id}", "subscription": "sub_worker"}
+        return {"id": event_id, "type": event_type, "created": created, "data": {"object": obj}}
+
+    def test_events_for_same_subscription_run_in_stripe_order(self):
+        # Delivered out of order: the later cancellation arrives first.
+        enqueue_stripe_event(self._event("evt_2", "customer.subscription.deleted", 1700000100))
+        enqueue_stripe_event(self._event("evt_1", "invoice.payment_failed", 1700000000))
+
+        with patch("subscriptions.webhooks.send_subscription_canceled_email"):
+            counts = process_pending_stripe_events()
+
+        self.assertEqual(counts["processed"], 2)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, "canceled")
+
+    @override_settings(STRIPE_WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failed_event_is_retried_then_dead_lettered(self):
+        enqueue_stripe_event(self._event("evt_fail", "invoice.payment_failed", 1700000000))
+        enqueue_stripe_event(self._event("evt_next", "customer.subscription.deleted", 1700000100))
+
+        with patch.dict("subscriptions.webhooks.HANDLERS", {"invoice.payment_failed": MagicMock(side_effect=RuntimeError("db down"))}):
+            counts = process_pending_stripe_events()
+            self.assertEqual(counts["failed"], 1)
+            self.assertEqual(counts["deferred"], 1)
+
+            failed = StripeEvent.objects.get(stripe_event_id="evt_fail")
+            self.assertEqual(failed.status, StripeEvent.Status.FAILED)
+            self.assertIn("db down", failed.last_error)
+            self.assertGreater(failed.next_attempt_at, django_timezone.now())
+
+            # Not due yet: the later event for the same subscription stays blocked.
+            counts = process_pending_stripe_events()
+            self.assertEqual(counts["deferred"], 1)
+            self.assertEqual(StripeEvent.objects.get(stripe_event_id="evt_next").status, StripeEvent.Status.PENDING)
+
+            StripeEvent.objects.filter(pk=failed.pk).update(next_attempt_at=django_timezone.now() - timedelta(seconds=1))
+            with patch("subscriptions.webhooks.send_subscription_canceled_email"):
+                process_pending_stripe_events()
+
+        failed.refresh_from_db()
+        self.assertEqual(failed.status, StripeEvent.Status.DEAD)
+        self.assertEqual(failed.attempts, 2)
+        self.assertEqual(StripeEvent.objects.get(stripe_event_id="evt_next").status, StripeEvent.Status.PROCESSED)
+
+    @override_settings(STRIPE_WEBHOOK_WAITING_HOURS=24)
+    def test_invoice_waiting_for_unknown_subscription_is_dead_lettered(self):
+        event = self._event("evt_orphan", "invoice.paid", 1700000000)
+        event["data"]["object"]["subscription"] = "sub_dashboard"
+        enqueue_stripe_event(event)
+        self.assertEqual(process_pending_stripe_events()["waiting"], 1)
+
+        StripeEvent.objects.filter(stripe_event_id="evt_orphan").update(received_at=django_timezone.now() - timedelta(hours=25))
+        self.assertEqual(process_pending_stripe_events()["dead"], 1)
+
+        orphan = StripeEvent.objects.get(stripe_event_id="evt_orphan")
+        self.assertEqual(orphan.status, StripeEvent.Status.DEAD)
+        self.assertIn("SubscriptionNotCreatedYet", orphan.last_error)
+        self.assertEqual((get_webhook_lag_stats()["dead"], get_webhook_lag_stats()["waiting"]), (1, 0))
+
+    def test_lag_stats(self):
+        enqueue_stripe_event(self._event("evt_lag", "invoice.payment_failed", 1700000000))
+        self.assertEqual(get_webhook_lag_stats()["pending"], 1)
+
+        process_pending_stripe_events()
+
+        stats = get_webhook_lag_stats()
+        self.assertEqual(stats["pending"], 0)
+        self.assertEqual(stats["dead"], 0)
+        self.assertIsNotNone(stats["lag_p95_seconds"])
@@ -16,6 +16,7 @@ from subscriptions.models import Subscription
 from subscriptions.serializers import SubscriptionSerializer, TipsterDashboardSerializer
 from subscriptions.webhooks import process_stripe_webhook_payload, StripeWebhookSignatureError, StripeWebhookPayloadError
 from subscriptions.services import create_subscription_checkout, TipsterNotOnboardedError
+from subscriptions.analytics import PLATFORM_FEE, get_tipster_analytics, parse_history_range
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +99,7 @@ class CancelSubscriptionView(APIView):
 class TipsterDashboardView(APIView):
     """
     GET  /api/me/dashboard/ — Dashboard data for tipster
+         ?days=N (default 30) or ?from=YYYY-MM-DD&to=YYYY-MM-DD selects the history range
     POST /api/me/dashboard/ — Update subscription price (S8-05)
     """
     permission_classes = [IsAuthenticated]
@@ -122,9 +124,15 @@ class TipsterDashboardView(APIView):
         except TipsterProfile.DoesNotExist:
             pass
 
-        PLATFORM_FEE = Decimal('0.20')
         revenue = Decimal(str(active_count)) * price_per_month * (Decimal('1') - PLATFORM_FEE)
 
+        # Daily history served from the TipsterDailyStats rollup
+        try:
+            start, end = parse_history_range(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        analytics = get_tipster_analytics(user, start, end)
+
         # Fetch recent active subscriptions for serialization (separate query, needed for serializer)
         recent_subs = Subscription.objects.filter(
             tipster=user, status='active'
@@ -138,6 +146,8 @@ class TipsterDashboardView(APIView):
             "recent_subscriptions": TipsterDashboardSerializer(
                 recent_subs, many=True
             ).data,
+            "history": analytics['history'],
+            "summary": analytics['summary'],
         }
         return Response(data)
 
@@ -186,6 +196,10 @@ class TipsterDashboardView(APIView):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class StripeWebhookView(View):
+    """
+    POST /api/stripe/webhook/ — Verify the signature, store the event, return 200.
+    Processing happens in `manage.py process_stripe_events`.
+    """
     def post(self, request, *args, **kwargs):
         payload = request.body
         sig_header = request.headers.get('Stripe-Signature')
@@ -1,8 +1,12 @@
 import logging
 import stripe
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone as django_timezone
 from subscriptions.models import Subscription, StripeEvent
+from subscriptions.services import save_stripe_customer_id
+from subscriptions.analytics import event_day, record_status_change, record_invoice_paid
 from subscriptions.emails import (
     send_new_subscriber_email,
     send_subscription_canceled_email,
@@ -13,6 +17,10 @@ from connect.models import ConnectedAccount
 
 logger = logging.getLogger(__name__)
 
+# Retry schedule for failed events: 30s, 1m, 2m, 4m ... capped at 1h.
+RETRY_BASE_DELAY = timedelta(seconds=30)
+RETRY_MAX_DELAY = timedelta(hours=1)
+
 
 class StripeWebhookPayloadError(Exception):
     """Raised when the payload is invalid."""
@@ -24,9 +32,19 @@ class StripeWebhookSignatureError(Exception):
     pass
 
 
+class SubscriptionNotCreatedYet(Exception):
+    """
+    The event refers to a Stripe subscription whose checkout.session.completed
+    has not been processed: Stripe sends the first invoice.paid before it.
+    """
+
+
 def process_stripe_webhook_payload(payload, sig_header, webhook_secret):
     """
-    Validates the Stripe webhook signature and routes the event to the correct handler.
+    Validates the Stripe webhook signature and stores the event for the worker.
+
+    Handlers are NOT run here: `manage.py process_stripe_events` picks up the
+    stored event, so the webhook endpoint can acknowledge Stripe immediately.
     """
     try:
         event = stripe.Webhook.construct_event(
@@ -37,35 +55,206 @@ def process_stripe_webhook_payload(payload, sig_header, webhook_secret):
     except stripe.error.SignatureVerificationError as e:
         raise StripeWebhookSignatureError("Invalid signature") from e
 
-    _handle_stripe_event(event)
+    return enqueue_stripe_event(event)
 
 
-def _handle_stripe_event(event):
+def enqueue_stripe_event(event):
+    """
+    Persist a verified Stripe event as PENDING. Idempotent on the Stripe event ID.
+    Returns the StripeEvent, or None when the event type has no handler.
+    """
+    if hasattr(event, 'to_dict'):
+        event = event.to_dict()
+
     event_id = event['id']
     event_type = event['type']
 
-    logger.info(f"Received webhook event {event_id} of type {event_type}")
-
-    handler = HANDLERS.get(event_type)
-    if not handler:
+    if event_type not in HANDLERS:
         logger.info(f"Unhandled event type: {event_type}")
-        return
+        return None
+
+    created_ts = event.get('created')
+    stripe_created_at = (
+        datetime.fromtimestamp(created_ts, tz=timezone.utc) if created_ts else django_timezone.now()
+    )
+
+    stripe_event, created = StripeEvent.objects.get_or_create(
+        stripe_event_id=event_id,
+        defaults={
+            'event_type': event_type,
+            'payload': event,
+            'ordering_key': _ordering_key(event),
+            'stripe_created_at': stripe_created_at,
+        }
+    )
+    if created:
+        logger.info(f"Queued webhook event {event_id} of type {event_type}")
+    else:
+        logger.info(f"Event {event_id} already received ({stripe_event.status}), skipping.")
+    return stripe_event
+
+
+def _ordering_key(event):
+    """Return the ID of the Stripe object whose state this event changes."""
+    obj = event.get('data', {}).get('object') or {}
+    if obj.get('object') == 'subscription':
+        return obj.get('id') or ''
+    return obj.get('subscription') or obj.get('id') or ''
+
+
+def _handle_stripe_event(event):
+    """Queue an event and process it immediately (used by tests and admin tooling)."""
+    stripe_event = enqueue_stripe_event(event)
+    if stripe_event is not None:
+        process_stripe_event(stripe_event.pk)
+
+
+def process_stripe_event(event_pk):
+    """
+    Run the handler for one stored event.
 
-    # Idempotency check with row-level lock
+    Returns 'processed', 'failed' (will retry), 'dead', 'waiting' (parked
+    until its subscription exists) or 'skipped' (already done or locked by
+    another worker). Handler side effects are rolled back on failure.
+    """
     with transaction.atomic():
-        stripe_event, created = StripeEvent.objects.select_for_update().get_or_create(
-            stripe_event_id=event_id,
-            defaults={
-                'event_type': event_type,
-                'payload': event
-            }
+        stripe_event = (
+            StripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(pk=event_pk, status__in=[StripeEvent.Status.PENDING, StripeEvent.Status.FAILED])
+            .first()
+        )
+        if stripe_event is None:
+            return 'skipped'
+
+        stripe_event.attempts += 1
+        try:
+            with transaction.atomic():
+                HANDLERS[stripe_event.event_type](stripe_event.payload)
+        except SubscriptionNotCreatedYet as e:
+            # Not a failure: _release_waiting_events() requeues it after the checkout.
+            stripe_event.status = StripeEvent.Status.WAITING
+            stripe_event.last_error = str(e)
+            stripe_event.save(update_fields=['status', 'attempts', 'last_error'])
+            return 'waiting'
+        except Exception as e:
+            return _record_failure(stripe_event, e)
+
+        stripe_event.status = StripeEvent.Status.PROCESSED
+        stripe_event.processed_at = django_timezone.now()
+        stripe_event.last_error = ''
+        stripe_event.save(update_fields=['status', 'processed_at', 'attempts', 'last_error'])
+        return 'processed'
+
+
+def _record_failure(stripe_event, error):
+    max_attempts = settings.STRIPE_WEBHOOK_MAX_ATTEMPTS
+    stripe_event.last_error = f"{type(error).__name__}: {error}"
+    if stripe_event.attempts >= max_attempts:
+        stripe_event.status = StripeEvent.Status.DEAD
+        logger.error(
+            f"Event {stripe_event.stripe_event_id} moved to dead letter after "
+            f"{stripe_event.attempts} attempts: {error}"
+        )
+    else:
+        delay = min(RETRY_BASE_DELAY * (2 ** (stripe_event.attempts - 1)), RETRY_MAX_DELAY)
+        stripe_event.status = StripeEvent.Status.FAILED
+        stripe_event.next_attempt_at = django_timezone.now() + delay
+        logger.warning(
+            f"Event {stripe_event.stripe_event_id} failed (attempt {stripe_event.attempts}), "
+            f"retrying in {int(delay.total_seconds())}s: {error}"
         )
+    stripe_event.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error'])
+    return stripe_event.status
+
+
+def process_pending_stripe_events(batch_size=100):
+    """
+    Process due events in Stripe creation order.
+
+    An event is deferred while an older event for the same ordering key is
+    still waiting for a retry, so per-subscription state never goes backwards.
+    """
+    now = django_timezone.now()
+    retryable = [StripeEvent.Status.PENDING, StripeEvent.Status.FAILED]
+
+    blocked_keys = set(
+        StripeEvent.objects.filter(status__in=retryable, next_attempt_at__gt=now)
+        .exclude(ordering_key='')
+        .values_list('ordering_key', flat=True)
+    )
+    due = (
+        StripeEvent.objects.filter(status__in=retryable, next_attempt_at__lte=now)
+        .order_by('stripe_created_at', 'id')
+        .values_list('pk', 'ordering_key')[:batch_size]
+    )
+
+    counts = {'processed': 0, 'failed': 0, 'dead': 0, 'waiting': 0, 'skipped': 0, 'deferred': 0}
+    counts['dead'] += _expire_waiting_events(now)
+    for pk, ordering_key in due:
+        if ordering_key and ordering_key in blocked_keys:
+            counts['deferred'] += 1
+            continue
+        result = process_stripe_event(pk)
+        counts[result] += 1
+        # A dead-lettered event no longer holds back the events after it.
+        if result in ('failed', 'skipped') and ordering_key:
+            blocked_keys.add(ordering_key)
+    return counts
+
+
+def _release_waiting_events(stripe_subscription_id):
+    """Requeue the events parked until this subscription existed (see SubscriptionNotCreatedYet)."""
+    StripeEvent.objects.filter(
+        status=StripeEvent.Status.WAITING, ordering_key=stripe_subscription_id,
+    ).update(status=StripeEvent.Status.PENDING, next_attempt_at=django_timezone.now())
+
+
+def _expire_waiting_events(now):
+    """Dead-letter events whose subscription never showed up. Returns how many."""
+    hours = settings.STRIPE_WEBHOOK_WAITING_HOURS
+    expired = StripeEvent.objects.filter(
+        status=StripeEvent.Status.WAITING, received_at__lte=now - timedelta(hours=hours),
+    ).update(
+        status=StripeEvent.Status.DEAD,
+        last_error=f"SubscriptionNotCreatedYet: no checkout for its subscription within {hours}h",
+    )
+    if expired:
+        logger.error(f"{expired} Stripe event(s) moved to dead letter after waiting {hours}h for their subscription")
+    return expired
+
+
+def get_webhook_lag_stats(sample_size=500):
+    """
+    Queue depth and lag figures for monitoring.
+
+    Lag is measured from Stripe's event creation time to the end of processing,
+    over the most recently processed events.
+    """
+    now = django_timezone.now()
+    retryable = [StripeEvent.Status.PENDING, StripeEvent.Status.FAILED]
+    backlog = StripeEvent.objects.filter(status__in=retryable)
+
+    oldest = backlog.order_by('received_at').values_list('received_at', flat=True).first()
+    recent = (
+        StripeEvent.objects.filter(status=StripeEvent.Status.PROCESSED, stripe_created_at__isnull=False)
+        .order_by('-processed_at')
+        .values_list('stripe_created_at', 'processed_at')[:sample_size]
+    )
+    lags = sorted((processed - created).total_seconds() for created, processed in recent)
 
-        if not created:
-            logger.info(f"Event {event_id} already processed, skipping.")
-            return
+    def percentile(p):
+        if not lags:
+            return None
+        return round(lags[min(len(lags) - 1, int(len(lags) * p))], 1)
 
-        handler(event)
+    return {
+        'pending': backlog.count(),
+        'dead': StripeEvent.objects.filter(status=StripeEvent.Status.DEAD).count(),
+        'waiting': StripeEvent.objects.filter(status=StripeEvent.Status.WAITING).count(),
+        'oldest_pending_seconds': round((now - oldest).total_seconds(), 1) if oldest else None,
+        'lag_p50_seconds': percentile(0.50),
+        'lag_p95_seconds': percentile(0.95),
+    }
 
 
 def _handle_checkout_session_completed(event):
@@ -91,6 +280,13 @@ def _handle_checkout_session_completed(event):
         logger.error(f"CustomUser not found for follower_id {follower_id} or tipster_id {tipster_id}")
         return
 
+    save_stripe_customer_id(follower, stripe_customer_id)
+
+    previous_status = (
+        Subscription.objects.filter(follower=follower, tipster=tipster)
+        .values_list('status', flat=True)
+        .first()
+    )
     subscription, created = Subscription.objects.update_or_create(
         follower=follower,
         tipster=tipster,
@@ -101,6 +297,9 @@ def _handle_checkout_session_completed(event):
         }
     )
     logger.info(f"checkout.session.completed: updated/created subscription {subscription.id}")
+    record_status_change(tipster.id, previous_status, 'active', event_day(event))
+    if stripe_subscription_id:
+        _release_waiting_events(stripe_subscription_id)
 
     if created:
         send_new_subscriber_email(tipster, follower)
@@ -117,8 +316,8 @@ def _handle_invoice_paid(event):
     try:
         subscription = Subscription.objects.get(stripe_subscription_id=stripe_subscription_id)
     except Subscription.DoesNotExist:
-        logger.error(f"invoice.paid: Subscription not found for stripe_subscription_id {stripe_subscription_id}")
-        return
+        # First invoice of a new subscription: its revenue is recorded once the checkout is.
+        raise SubscriptionNotCreatedYet(f"invoice.paid: Subscription not found for stripe_subscription_id {stripe_subscription_id}")
 
     # Update current_period_end based on invoice lines
     # The invoice usually contains the subscription period in its lines
@@ -137,6 +336,10 @@ def _handle_invoice_paid(event):
     if current_period_end:
         subscription.current_period_end = current_period_end
 
+    day = event_day(event)
+    record_status_change(subscription.tipster_id, subscription.status, 'active', day)
+    record_invoice_paid(subscription.tipster_id, invoice, day)
+
     subscription.status = 'active'
     subscription.save()
     logger.info(f"invoice.paid: updated subscription {subscription.id} status to active")
@@ -155,6 +358,8 @@ def _handle_invoice_payment_failed(event):
         logger.error(f"invoice.payment_failed: Subscription not found for stripe_subscription_id {stripe_subscription_id}")
         return
 
+    record_status_change(subscription.tipster_id, subscription.status, 'past_due', event_day(event))
+
     subscription.status = 'past_due'
     subscription.save()
     logger.info(f"invoice.payment_failed: updated subscription {subscription.id} status to past_due")
@@ -173,6 +378,8 @@ def _handle_customer_subscription_deleted(event):
         logger.error(f"customer.subscription.deleted: Subscription not found for stripe_subscription_id {stripe_subscription_id}")
         return
 
+    record_status_change(subscription.tipster_id, subscription.status, 'canceled', event_day(event))
+
     subscription.status = 'canceled'
     subscription.save()
     logger.info(f"customer.subscription.deleted: updated subscription {subscription.id} status to canceled")
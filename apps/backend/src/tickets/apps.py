@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class TicketsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tickets'
+
+    def ready(self):
+        import tickets.signals
@@ -0,0 +1,175 @@
+"""
+Ticket status change events, behind the long-poll endpoint
+GET /api/tickets/<id>/wait/.
+
+The OCR pipeline calls `publish()` whenever a ticket changes status (after
+commit); requests blocked in `wait()` for that ticket wake up at once.
+
+Within a process this is a threading.Event per waited-on ticket. The OCR
+thread runs in the gunicorn worker that took the upload while the long-poll
+may land on another worker, so on Postgres `publish()` also sends
+NOTIFY ticket_status and every process runs one LISTEN thread that wakes its
+local waiters. Without it (SQLite, TICKET_EVENTS_LISTEN=False, listener
+down) waiters still re-check the database every TICKET_WAIT_RECHECK seconds.
+
+A waiter holds a gunicorn thread for the whole wait, so at most
+TICKET_WAIT_MAX_WAITERS requests per process wait at once; beyond that
+`wait()` raises TooManyWaiters (429 for the client) and the remaining
+threads stay free for the rest of the API.
+"""
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'ticket_status'
+# Seconds between two LISTEN connection attempts after a failure.
+LISTEN_RETRY_DELAY = 5
+
+
+class _Slot:
+    def __init__(self):
+        self.event = threading.Event()
+        self.waiters = 0
+
+
+class TooManyWaiters(Exception):
+    """TICKET_WAIT_MAX_WAITERS requests of this process are already waiting."""
+
+
+_lock = threading.Lock()
+_slots = {}
+_active = 0
+_listener = None
+
+
+def _listen_enabled():
+    return settings.TICKET_EVENTS_LISTEN and connection.vendor == 'postgresql'
+
+
+def _register(ticket_id):
+    with _lock:
+        slot = _slots.setdefault(ticket_id, _Slot())
+        slot.waiters += 1
+        return slot
+
+
+def _unregister(ticket_id, slot):
+    with _lock:
+        slot.waiters -= 1
+        if slot.waiters == 0 and _slots.get(ticket_id) is slot:
+            del _slots[ticket_id]
+
+
+def _wake(ticket_id):
+    with _lock:
+        slot = _slots.pop(ticket_id, None)
+    if slot is not None:
+        slot.event.set()
+
+
+def waiting():
+    """Number of requests currently blocked in wait(), for monitoring."""
+    with _lock:
+        return _active
+
+
+def _admit():
+    global _active
+    with _lock:
+        if _active >= settings.TICKET_WAIT_MAX_WAITERS:
+            raise TooManyWaiters
+        _active += 1
+
+
+def _leave():
+    global _active
+    with _lock:
+        _active -= 1
+
+
+def publish(ticket_id):
+    """Wake every waiter of `ticket_id` once the current transaction commits."""
+    ticket_id = str(ticket_id)
+
+    def send():
+        _wake(ticket_id)
+        if _listen_enabled():
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, ticket_id])
+            except Exception:
+                # Other workers fall back to their periodic re-check.
+                logger.warning("NOTIFY failed for ticket %s", ticket_id, exc_info=True)
+
+    transaction.on_commit(send)
+
+
+def wait(ticket_id, check, timeout):
+    """
+    Block until `check()` returns something truthy or `timeout` seconds pass.
+    Returns the last value of `check()`, which runs once on entry, after each
+    wake-up and at least every TICKET_WAIT_RECHECK seconds. Raises
+    TooManyWaiters when this process already has TICKET_WAIT_MAX_WAITERS.
+    """
+    ticket_id = str(ticket_id)
+    _admit()
+    try:
+        _ensure_listener()
+        deadline = time.monotonic() + timeout
+        while True:
+            # Register before checking, so a publish() in between is not missed.
+            slot = _register(ticket_id)
+            try:
+                result = check()
+                remaining = deadline - time.monotonic()
+                if result or remaining <= 0:
+                    return result
+                slot.event.wait(min(remaining, settings.TICKET_WAIT_RECHECK))
+            finally:
+                _unregister(ticket_id, slot)
+    finally:
+        _leave()
+
+
+# ─── Postgres LISTEN ────────────────────────────────────────
+def _ensure_listener():
+    global _listener
+    if not _listen_enabled() or (_listener is not None and _listener.is_alive()):
+        return
+    with _lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_forever, name='ticket-events-listener', daemon=True)
+            _listener.start()
+
+
+def _listen_forever():
+    while True:
+        try:
+            _listen()
+        except Exception:
+            logger.warning("Ticket events listener lost its connection; retrying", exc_info=True)
+        time.sleep(LISTEN_RETRY_DELAY)
+
+
+def _listen():
+    # A dedicated connection: Django's are per-thread and may be closed between requests.
+    conn = connection.get_new_connection(connection.get_connection_params())
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        logger.info("Listening for ticket status events")
+        while True:
+            if select.select([conn], [], [], 60) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                _wake(conn.notifies.pop(0).payload)
+    finally:
+        conn.close()
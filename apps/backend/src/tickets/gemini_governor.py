@@ -0,0 +1,201 @@
+"""
+Process-wide governor for Gemini calls.
+
+Every OCR thread of a gunicorn worker goes through the same `governor`:
+
+- one genai.Client per API key, reused across tickets (`get_client()`);
+- at most GEMINI_MAX_CONCURRENCY calls in flight, the others queue on a
+  semaphore;
+- a token bucket of GEMINI_REQUESTS_PER_MINUTE (bursts up to
+  GEMINI_MAX_CONCURRENCY) so a burst of uploads does not hit the quota all at once;
+- 429 / 503 (and other 5xx) are retried GEMINI_MAX_RETRIES times with
+  exponential backoff and jitter;
+- after GEMINI_BREAKER_THRESHOLD calls in a row failed that way, the circuit
+  opens for GEMINI_BREAKER_COOLDOWN seconds: calls raise GeminiUnavailable
+  immediately, so tickets are parked as PENDING_OCR (and picked up again by
+  `manage.py retry_pending_ocr`) instead of being rejected. After the
+  cooldown one trial call goes through; success closes the circuit.
+
+`governor.status()` (in /api/_perf/) reports in-flight, queued and breaker
+state for the worker that serves it.
+"""
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from google import genai
+from google.genai import errors
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+class GeminiUnavailable(Exception):
+    """Gemini is over quota or down: the ticket should be retried later, not rejected."""
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """Shared genai.Client for `api_key` (thread-safe, created once per process)."""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = genai.Client(api_key=api_key)
+        return client
+
+
+def _is_retryable(exc):
+    return isinstance(exc, errors.APIError) and exc.code in RETRYABLE_CODES
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, capacity):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeminiGovernor:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, max_concurrency, requests_per_minute, max_retries, breaker_threshold, breaker_cooldown):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(requests_per_minute, capacity=max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.consecutive_failures = 0
+        self._trial_running = False
+        self.counts = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected_open': 0, 'trips': 0}
+
+    # ─── Circuit breaker ────────────────────────────────────
+    def _admit(self):
+        """Raise GeminiUnavailable while the circuit is open; let one trial call through after the cooldown."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.breaker_cooldown:
+                self.state = self.HALF_OPEN
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._trial_running):
+                self.counts['rejected_open'] += 1
+                raise GeminiUnavailable('Gemini circuit breaker is open')
+            if self.state == self.HALF_OPEN:
+                self._trial_running = True
+
+    def _record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Gemini circuit breaker closed")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_running = False
+
+    def _record_failure(self):
+        with self._lock:
+            self.counts['failures'] += 1
+            self.consecutive_failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.breaker_threshold:
+                if self.state != self.OPEN:
+                    self.counts['trips'] += 1
+                    logger.warning("Gemini circuit breaker open for %ss after %s failures", self.breaker_cooldown, self.consecutive_failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    # ─── Calls ──────────────────────────────────────────────
+    def call(self, fn, *args, **kwargs):
+        """
+        Run `fn(*args, **kwargs)` (a Gemini request) under the concurrency
+        limit, rate limit, retries and circuit breaker. Raises
+        GeminiUnavailable when Gemini stays unavailable; other errors
+        (bad image, invalid JSON…) propagate unchanged.
+        """
+        self._admit()
+        with self._lock:
+            self.queued += 1
+        self._semaphore.acquire()
+        with self._lock:
+            self.queued -= 1
+            self.in_flight += 1
+        try:
+            return self._call_with_retries(fn, args, kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def _call_with_retries(self, fn, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            self._bucket.acquire()
+            with self._lock:
+                self.counts['calls'] += 1
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not _is_retryable(e):
+                    # The request reached Gemini: the service itself is fine.
+                    self._record_success()
+                    raise
+                if attempt == self.max_retries:
+                    self._record_failure()
+                    raise GeminiUnavailable(f'Gemini unavailable after {attempt + 1} attempts: {e}') from e
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random() / 2)
+                logger.info("Gemini returned %s, retrying in %.1fs", e.code, delay)
+                with self._lock:
+                    self.counts['retries'] += 1
+                time.sleep(delay)
+            else:
+                self._record_success()
+                return result
+
+    def status(self):
+        with self._lock:
+            cooldown_left = None
+            if self.state == self.OPEN:
+                cooldown_left = round(max(0.0, self.breaker_cooldown - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'max_concurrency': self.max_concurrency,
+                'breaker': self.state,
+                'tripped': self.state != self.CLOSED,
+                'cooldown_left': cooldown_left,
+                'consecutive_failures': self.consecutive_failures,
+                **self.counts,
+            }
+
+
+governor = GeminiGovernor(
+    max_concurrency=settings.GEMINI_MAX_CONCURRENCY,
+    requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    breaker_threshold=settings.GEMINI_BREAKER_THRESHOLD,
+    breaker_cooldown=settings.GEMINI_BREAKER_COOLDOWN,
+)
@@ -1,13 +1,20 @@
 import logging
-from django.db import transaction
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
 from django.contrib.postgres.search import TrigramSimilarity
 from django.db.models.functions import Greatest
 from django.utils import timezone
 from django.utils.dateparse import parse_date, parse_datetime
-from tickets.models import Ticket, BetSelection
+from time import perf_counter
+from tickets import events, ocr_tiers
+from tickets.models import MAX_LEG_ODDS, Ticket, BetSelection
+from core.image_variants import ensure_variants
+from tickets.gemini_governor import GeminiUnavailable
 from tickets.services import GeminiOCRService
 from sports.models import Match
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from datetime import datetime, time
 
 
@@ -72,9 +79,117 @@ def parse_ocr_datetime(value):
     return None
 
 
-def process_ticket_image(ticket_id):
+def parse_ocr_odds(value):
+    """OCR odds as a Decimal the odds column can hold (missing counts as 1.0), else None."""
+    try:
+        odds = Decimal(str(value or 1.0))
+    except InvalidOperation:
+        return None
+    if not odds.is_finite() or not 0 < odds <= MAX_LEG_ODDS:
+        return None
+    return odds.quantize(Decimal('0.01'))
+
+
+# Similarity threshold: 0.6 (60% confidence minimum - strong matches only)
+MATCH_SIMILARITY_THRESHOLD = 0.6
+
+
+def find_match(match_name):
+    """
+    Best Match for an OCR match name, or None.
+
+    CRITICAL: Fuzzy match using PostgreSQL Trigram Similarity on both
+    home_team and away_team, keeping the greatest (best) score of the two.
+    """
+    if not match_name:
+        return None
+    return Match.objects.annotate(
+        similarity=Greatest(
+            TrigramSimilarity('home_team', match_name),
+            TrigramSimilarity('away_team', match_name)
+        )
+    ).filter(
+        similarity__gt=MATCH_SIMILARITY_THRESHOLD
+    ).order_by('-similarity').first()
+
+
+class MatchLookupCache:
+    """
+    find_match() memoized by normalized match name, shared by the tickets of
+    one batch: screenshots uploaded together mostly bet on the same fixtures.
+    """
+
+    def __init__(self):
+        self._matches = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.lookups = 0
+
+    def find(self, match_name):
+        key = ' '.join((match_name or '').lower().split())
+        with self._lock:
+            self.lookups += 1
+            if key in self._matches:
+                self.hits += 1
+                return self._matches[key]
+        match = find_match(match_name)
+        with self._lock:
+            self._matches[key] = match
+        return match
+
+
+def extract_with_tiers(ocr_service, image_path, match_cache=None):
+    """
+    Run the OCR tiers (tickets/ocr_tiers.py) until one extraction validates.
+    Returns (raw data, normalized bets, linked matches, tier used); the last
+    tier's result is returned even if it does not validate. `match_cache`
+    (a MatchLookupCache) replaces direct find_match() calls.
+    """
+    lookup = match_cache.find if match_cache is not None else find_match
+    tiers = ocr_tiers.active_tiers()
+    for index, tier in enumerate(tiers):
+        last = index == len(tiers) - 1
+        started = perf_counter()
+        try:
+            data = ocr_service.extract_data(
+                image_path, model=tier.model, prompt=tier.prompt, max_dimension=tier.max_dimension,
+            )
+        except GeminiUnavailable:
+            raise
+        except Exception as e:
+            ocr_tiers.record(tier.name, perf_counter() - started, 'error')
+            if last:
+                raise
+            logger.info(f"[Thread] OCR tier {tier.name} failed ({e}), escalating")
+            continue
+
+        bets = normalize_ocr_bets(data)
+        matches = [lookup(bet.get('match_name', '')) for bet in bets]
+        problems = ocr_tiers.validation_problems(data, bets, matches)
+        if problems and not last:
+            ocr_tiers.record(tier.name, perf_counter() - started, 'escalated')
+            logger.info(f"[Thread] OCR tier {tier.name} escalating: {', '.join(problems)}")
+            continue
+        ocr_tiers.record(tier.name, perf_counter() - started, 'accepted')
+        return data, bets, matches, tier
+
+
+def claim_ticket(ticket_id):
+    """
+    Move a ticket from PENDING_OCR to PROCESSING, atomically. False if another
+    thread or `retry_pending_ocr` already took it: exactly one OCR run per claim.
+    """
+    return Ticket.objects.filter(id=ticket_id, status=Ticket.Status.PENDING_OCR).update(
+        status=Ticket.Status.PROCESSING, modified=timezone.now(),
+    ) == 1
+
+
+def process_ticket_image(ticket_id, match_cache=None):
     """
     Orchestrates the OCR process for a given ticket.
+    `match_cache` is shared by the tickets of a batch (process_ticket_batch).
+    Tickets not in PENDING_OCR (already claimed elsewhere) are skipped:
+    returns False for those, True once the ticket has been processed.
     
     Thread-safe implementation:
     - Receives only ticket_id (not object) to avoid shared memory
@@ -83,16 +198,13 @@ def process_ticket_image(ticket_id):
     - Secure match linking with PostgreSQL Trigram fuzzy search
     """
     logger.info(f"[Thread] Starting OCR processing for ticket {ticket_id}")
-    
-    try:
-        ticket = Ticket.objects.get(id=ticket_id)
-    except Ticket.DoesNotExist:
-        logger.error(f"[Thread] Ticket {ticket_id} not found in database")
-        return
 
     # Update status to PROCESSING
-    ticket.status = Ticket.Status.PROCESSING
-    ticket.save()
+    if not claim_ticket(ticket_id):
+        logger.info(f"[Thread] Ticket {ticket_id} missing or already claimed, skipping")
+        return False
+    ticket = Ticket.objects.get(id=ticket_id)
+    events.publish(ticket.id)
     logger.info(f"[Thread] Ticket {ticket_id} status updated to PROCESSING")
 
     ocr_service = GeminiOCRService()
@@ -103,17 +215,18 @@ def process_ticket_image(ticket_id):
         image_path = ticket.image.path
         
         logger.info(f"[Thread] Calling Gemini OCR for ticket {ticket_id}")
-        data = ocr_service.extract_data(image_path)
+        data, bets, matches, tier = extract_with_tiers(ocr_service, image_path, match_cache)
         
         # Save raw data
         ticket.ocr_raw_data = data
-        bets = normalize_ocr_bets(data)
-        logger.info(f"[Thread] OCR data extracted for ticket {ticket_id}: {len(bets)} bets found")
+        ticket.ocr_tier = tier.name
+        logger.info(f"[Thread] OCR data extracted for ticket {ticket_id} ({tier.name} tier): {len(bets)} bets found")
         
         # Create BetSelections with secure match linking
         # We use a transaction to ensure atomicity
         with transaction.atomic():
             unmatched_bets = []  # Track bets that couldn't be matched
+            selections = []
 
             if not bets:
                 unmatched_bets.append({
@@ -123,7 +236,7 @@ def process_ticket_image(ticket_id):
                     'reason': 'OCR returned no bets or predictions'
                 })
             
-            for bet in bets:
+            for bet, match in zip(bets, matches):
                 match_name = bet.get('match_name', '')
                 selection = bet.get('selection', 'Unknown')
                 odds = bet.get('odds', 1.0)
@@ -131,46 +244,37 @@ def process_ticket_image(ticket_id):
                 kickoff_time = parse_ocr_datetime(
                     bet.get('kickoff_time') or bet.get('match_date')
                 )
-                
-                # CRITICAL: Fuzzy match using PostgreSQL Trigram Similarity
-                # Similarity threshold: 0.6 (60% confidence minimum - strong matches only)
-                match = None
-                similarity_threshold = 0.6
-                
-                if match_name:
-                    # Calculate similarity on both home_team and away_team fields
-                    # Use the greatest (best) similarity score between the two
-                    matches = Match.objects.annotate(
-                        similarity=Greatest(
-                            TrigramSimilarity('home_team', match_name),
-                            TrigramSimilarity('away_team', match_name)
-                        )
-                    ).filter(
-                        similarity__gt=similarity_threshold
-                    ).order_by('-similarity')
-                    
-                    if matches.exists():
-                        match = matches.first()
-                        # Successfully matched with similarity > threshold
-                        BetSelection.objects.create(
-                            ticket=ticket,
-                            match=match,
-                            selection=selection,
-                            odds=Decimal(str(odds or 1.0)),
-                            stake=Decimal(str(stake or 0)),
-                            kickoff_time=kickoff_time,
-                        )
-                        logger.debug(f"[Thread] Bet matched: '{match_name}' -> {match} (similarity > {similarity_threshold})")
-                    else:
-                        # FAIL-SAFE: No match found with sufficient similarity
-                        # DO NOT create BetSelection with arbitrary match
-                        unmatched_bets.append({
-                            'match_name': match_name,
-                            'selection': selection,
-                            'odds': odds,
-                            'reason': f'No match found with similarity > {similarity_threshold}'
-                        })
-                        logger.warning(f"[Thread] No match found for '{match_name}' (threshold: {similarity_threshold})")
+
+                leg_odds = parse_ocr_odds(odds)
+                if leg_odds is None:
+                    unmatched_bets.append({
+                        'match_name': match_name or '<empty>',
+                        'selection': selection,
+                        'odds': odds,
+                        'reason': f'Unreadable odds or above {MAX_LEG_ODDS}'
+                    })
+                    logger.warning(f"[Thread] Implausible odds {odds!r} for '{match_name}'")
+                elif match is not None:
+                    # Successfully matched with similarity > threshold
+                    selections.append(BetSelection(
+                        ticket=ticket,
+                        match=match,
+                        selection=selection,
+                        odds=leg_odds,
+                        stake=Decimal(str(stake or 0)),
+                        kickoff_time=kickoff_time,
+                    ))
+                    logger.debug(f"[Thread] Bet matched: '{match_name}' -> {match} (similarity > {MATCH_SIMILARITY_THRESHOLD})")
+                elif match_name:
+                    # FAIL-SAFE: No match found with sufficient similarity
+                    # DO NOT create BetSelection with arbitrary match
+                    unmatched_bets.append({
+                        'match_name': match_name,
+                        'selection': selection,
+                        'odds': odds,
+                        'reason': f'No match found with similarity > {MATCH_SIMILARITY_THRESHOLD}'
+                    })
+                    logger.warning(f"[Thread] No match found for '{match_name}' (threshold: {MATCH_SIMILARITY_THRESHOLD})")
                 else:
                     # No match name provided by OCR
                     unmatched_bets.append({
@@ -181,6 +285,11 @@ def process_ticket_image(ticket_id):
                     })
                     logger.warning(f"[Thread] Empty match name in OCR data")
 
+            # One INSERT for all legs; totals are saved with the status below.
+            # New legs are PENDING, so skipping post_save misses no settlement work.
+            BetSelection.objects.bulk_create(selections)
+            ticket.apply_totals(selections)
+
             # If any bets couldn't be matched, mark ticket for manual review
             if unmatched_bets:
                 ticket.status = Ticket.Status.REVIEW_NEEDED
@@ -191,6 +300,7 @@ def process_ticket_image(ticket_id):
                     error_log += f"    Selection: {unmatched['selection']}, Odds: {unmatched['odds']}\n"
                 ticket.ocr_error_log = error_log
                 ticket.save()
+                events.publish(ticket.id)
                 logger.warning(
                     f"[Thread] Ticket {ticket.id} requires manual review - "
                     f"{len(unmatched_bets)} bet(s) could not be matched"
@@ -199,15 +309,58 @@ def process_ticket_image(ticket_id):
                 # All bets successfully matched
                 ticket.status = Ticket.Status.VALIDATED
                 ticket.save()
+                events.publish(ticket.id)
                 logger.info(f"[Thread] Ticket {ticket.id} processed successfully - all bets matched")
 
+    except GeminiUnavailable as e:
+        # Quota or outage: park the ticket, `retry_pending_ocr` picks it up again.
+        logger.warning(f"[Thread] Gemini unavailable, ticket {ticket_id} parked as PENDING_OCR: {e}")
+        ticket.status = Ticket.Status.PENDING_OCR
+        ticket.ocr_error_log = f"[{datetime.now().isoformat()}] OCR postponed: {str(e)}"
+        ticket.save()
+        events.publish(ticket.id)
     except Exception as e:
         logger.error(
             f"[Thread] Error processing ticket {ticket_id}: {str(e)}",
             exc_info=True
         )
+        # The rollback removed any legs apply_totals() counted: save the stored totals back.
+        ticket.refresh_from_db(fields=Ticket.TOTALS_FIELDS)
         ticket.status = Ticket.Status.REJECTED
         ticket.ocr_error_log = f"[{datetime.now().isoformat()}] Processing error: {str(e)}"
         ticket.save()
+        events.publish(ticket.id)
     
     logger.info(f"[Thread] Completed OCR processing for ticket {ticket_id} - Final status: {ticket.status}")
+    return True
+
+
+def _process_batch_ticket(ticket_id, match_cache):
+    try:
+        # bulk_create sends no post_save: variants are built here instead of core.signals.
+        ensure_variants(Ticket, ticket_id, 'image', 'image_variants')
+        process_ticket_image(ticket_id, match_cache=match_cache)
+    except Exception:
+        logger.exception(f"[Batch] Ticket {ticket_id} failed")
+    finally:
+        connection.close()
+
+
+def process_ticket_batch(ticket_ids):
+    """
+    OCR the tickets of one batch upload as a single job: at most
+    GEMINI_MAX_CONCURRENCY tickets at a time (the governor queues the rest
+    anyway), one MatchLookupCache for all of them.
+    """
+    ticket_ids = list(ticket_ids)
+    if not ticket_ids:
+        return
+    match_cache = MatchLookupCache()
+    logger.info(f"[Batch] Starting OCR for {len(ticket_ids)} tickets")
+    workers = min(len(ticket_ids), settings.GEMINI_MAX_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-batch') as pool:
+        list(pool.map(lambda ticket_id: _process_batch_ticket(ticket_id, match_cache), ticket_ids))
+    logger.info(
+        f"[Batch] Completed OCR for {len(ticket_ids)} tickets - "
+        f"{match_cache.hits}/{match_cache.lookups} match lookups served from the batch cache"
+    )
@@ -0,0 +1,59 @@
+"""
+Measure what OCR preprocessing saves on real ticket images.
+
+Usage:
+    python manage.py benchmark_ocr_preprocessing ../ticket.jpg ../tickets/*.jpg
+    python manage.py benchmark_ocr_preprocessing photo.jpg --uplink-mbps 5
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.preprocessing import preprocess_ticket_image
+
+
+class Command(BaseCommand):
+    help = 'Report byte and transfer-time savings of ticket image preprocessing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Image files to process')
+        parser.add_argument('--uplink-mbps', type=float, default=10.0,
+                            help='Bandwidth used to estimate upload time to Gemini/storage.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per image for timing.')
+
+    def handle(self, *args, **options):
+        bytes_per_ms = options['uplink_mbps'] * 1_000_000 / 8 / 1000
+        total_before = total_after = 0
+
+        for path in options['paths']:
+            if not os.path.exists(path):
+                self.stdout.write(self.style.ERROR(f"Image not found: {path}"))
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                processed = preprocess_ticket_image(data)
+                timings.append((time.perf_counter() - start) * 1000)
+            preprocess_ms = sorted(timings)[len(timings) // 2]
+
+            before, after = processed.original_size, processed.size
+            total_before += before
+            total_after += after
+            transfer_saved_ms = (before - after) / bytes_per_ms
+            self.stdout.write(
+                f"{os.path.basename(path)}: {before:,} -> {after:,} bytes "
+                f"({100 * (1 - after / before):.1f}% smaller, {processed.width}x{processed.height} "
+                f"{processed.mime_type}) | preprocess {preprocess_ms:.0f} ms | "
+                f"upload @{options['uplink_mbps']:g} Mbps {before / bytes_per_ms:.0f} -> "
+                f"{after / bytes_per_ms:.0f} ms (net {transfer_saved_ms - preprocess_ms:+.0f} ms saved)"
+            )
+
+        if total_before:
+            self.stdout.write(self.style.SUCCESS(
+                f"Total: {total_before:,} -> {total_after:,} bytes "
+                f"({100 * (1 - total_after / total_before):.1f}% smaller)"
+            ))
@@ -0,0 +1,142 @@
+"""
+Memory benchmark for ticket uploads: N concurrent multipart uploads of M MB
+each through the real WSGI stack and upload view, with OCR disabled.
+
+Requests are fed to Django's WSGIHandler from one shared, pre-encoded body
+(as gunicorn would stream them from the socket), so the numbers reflect the
+server side only. Reports the Python heap peak (tracemalloc) and process peak
+RSS. Compare with Django's in-memory handler using --handler memory; run each
+mode in its own process, since peak RSS never goes down.
+
+Usage:
+    python manage.py benchmark_upload_memory
+    python manage.py benchmark_upload_memory --concurrency 50 --size-mb 5 --handler memory
+"""
+import io
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image, ImageChops
+from rest_framework_simplejwt.tokens import AccessToken
+
+from tickets.models import Ticket
+
+SAMPLE_TICKET = os.path.join(settings.BASE_DIR.parent, 'ticket.jpg')
+
+HANDLERS = {
+    'streaming': ['core.upload_handlers.HashingFileUploadHandler'],
+    'memory': [
+        'django.core.files.uploadhandler.MemoryFileUploadHandler',
+        'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+    ],
+}
+
+
+def _phone_photo(size_bytes):
+    """
+    12 MP JPEG of roughly `size_bytes` (at most), built from the sample ticket
+    with sensor-like noise so it compresses like a real phone photo.
+    """
+    with Image.open(SAMPLE_TICKET) as sample:
+        image = sample.convert('RGB').resize((2600, 4480))
+    noise = Image.effect_noise(image.size, 12).convert('RGB')
+    image = ImageChops.add(image, noise, 1.0, -128)
+    for quality in range(95, 50, -2):
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        if buffer.tell() <= size_bytes:
+            break
+    return buffer.getvalue()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = 'Measure peak memory while N concurrent clients upload large ticket images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--size-mb', type=float, default=4.9)
+        parser.add_argument('--handler', choices=HANDLERS, default='streaming')
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        photo = _phone_photo(int(options['size_mb'] * 1024 * 1024))
+        body = encode_multipart(BOUNDARY, {'image': SimpleUploadedFile('ticket.jpg', photo, content_type='image/jpeg')})
+        del photo
+        user, _ = get_user_model().objects.get_or_create(username='upload_benchmark')
+        token = str(AccessToken.for_user(user))
+        memory_size = 5 * 1024 * 1024 if options['handler'] == 'memory' else 256 * 1024
+
+        app = WSGIHandler()
+        results = []
+        barrier = threading.Barrier(concurrency)
+
+        def upload():
+            environ = {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': '/api/tickets/upload/',
+                'SERVER_NAME': 'testserver',
+                'SERVER_PORT': '80',
+                'wsgi.url_scheme': 'http',
+                'wsgi.errors': sys.stderr,
+                # BytesIO over existing bytes shares the buffer until written to.
+                'wsgi.input': io.BytesIO(body),
+                'CONTENT_TYPE': MULTIPART_CONTENT,
+                'CONTENT_LENGTH': str(len(body)),
+                'HTTP_AUTHORIZATION': f'Bearer {token}',
+            }
+            status_holder = []
+            barrier.wait()
+            start = time.perf_counter()
+            response = app(environ, lambda status, headers: status_holder.append(status))
+            b''.join(response)
+            response.close()
+            results.append((int(status_holder[0].split()[0]), time.perf_counter() - start))
+
+        rss_before = _peak_rss_mb()
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            FILE_UPLOAD_HANDLERS=HANDLERS[options['handler']],
+            FILE_UPLOAD_MAX_MEMORY_SIZE=memory_size,
+            ALLOWED_HOSTS=['testserver'],
+        ), mock.patch('tickets.views.process_ticket_image'):
+            tracemalloc.start()
+            threads = [threading.Thread(target=upload) for _ in range(concurrency)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            _, heap_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            Ticket.objects.filter(user=user).delete()
+        user.delete()
+
+        ok = sum(1 for status_code, _ in results if status_code == 202)
+        latencies = sorted(latency for _, latency in results) or [0.0]
+        self.stdout.write(
+            f"handler={options['handler']} uploads={concurrency} x {len(body) / 1024 / 1024:.1f} MB "
+            f"accepted={ok}/{concurrency} wall={elapsed:.1f}s p50={latencies[len(latencies) // 2]:.2f}s\n"
+            f"python heap peak: {heap_peak / 1024 / 1024:.1f} MB "
+            f"({heap_peak / concurrency / 1024 / 1024:.2f} MB per upload)\n"
+            f"process peak RSS: {rss_before:.0f} -> {_peak_rss_mb():.0f} MB"
+        )
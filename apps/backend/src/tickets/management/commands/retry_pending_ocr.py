@@ -0,0 +1,70 @@
+"""
+Re-run OCR for tickets left in PENDING_OCR: parked while Gemini was over
+quota or down (tickets/gemini_governor.py), or never reached by their upload
+thread. Tickets stuck in PROCESSING for --stale-after seconds (the thread
+died with its worker mid-OCR) are put back in PENDING_OCR first.
+
+Usage:
+    python manage.py retry_pending_ocr                 # one batch, then exit
+    python manage.py retry_pending_ocr --loop          # run forever (worker container)
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from tickets.gemini_governor import governor
+from tickets.logic import process_ticket_image
+from tickets.models import Ticket
+
+
+class Command(BaseCommand):
+    help = 'Retry OCR for tickets waiting in PENDING_OCR.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep retrying parked tickets.')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between batches.')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument(
+            '--min-age', type=int, default=120,
+            help='Only tickets untouched for this many seconds (fresh uploads are still in their thread).',
+        )
+        parser.add_argument(
+            '--stale-after', type=int, default=900,
+            help='PROCESSING tickets untouched for this many seconds are retried (their thread is gone).',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            self._run_batch(options)
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def _run_batch(self, options):
+        stale = Ticket.objects.filter(
+            status=Ticket.Status.PROCESSING,
+            modified__lt=timezone.now() - timedelta(seconds=options['stale_after']),
+        ).update(status=Ticket.Status.PENDING_OCR)  # keeps the old `modified`: retried below
+        if stale:
+            self.stdout.write(f"[ocr] reclaimed={stale} stale PROCESSING ticket(s)")
+
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        ticket_ids = list(
+            Ticket.objects.filter(status=Ticket.Status.PENDING_OCR, modified__lt=cutoff)
+            .order_by('modified').values_list('id', flat=True)[:options['batch_size']]
+        )
+        processed = 0
+        for ticket_id in ticket_ids:
+            if governor.status()['breaker'] == governor.OPEN:
+                self.stdout.write('[ocr] Gemini circuit breaker open, stopping this batch')
+                break
+            # Claims the ticket (PENDING_OCR -> PROCESSING) like the upload and
+            # batch threads do: whoever loses the race skips it.
+            if process_ticket_image(ticket_id):
+                processed += 1
+        if processed:
+            self.stdout.write(f"[ocr] retried={processed}")
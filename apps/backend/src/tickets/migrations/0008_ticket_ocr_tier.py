@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tickets", "0007_ticket_image_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="ocr_tier",
+            field=models.CharField(
+                blank=True,
+                default="",
+                help_text="OCR tier that produced ocr_raw_data (tickets/ocr_tiers.py)",
+                max_length=10,
+            ),
+        ),
+    ]
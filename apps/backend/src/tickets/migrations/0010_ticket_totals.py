@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:47
+
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_totals(apps, schema_editor):
+    """Seed leg_count / combined_odds / estimated_roi from existing selections."""
+    Ticket = apps.get_model("tickets", "Ticket")
+    BetSelection = apps.get_model("tickets", "BetSelection")
+
+    odds = BetSelection.objects.order_by("ticket_id").values_list("ticket_id", "odds")
+    pending = []
+    for ticket_id, rows in groupby(odds.iterator(), key=lambda row: row[0]):
+        combined = Decimal("1.00")
+        legs = 0
+        for _, value in rows:
+            combined *= value
+            legs += 1
+        roi = (combined - Decimal("1.00")) * Decimal("100.00")
+        pending.append(
+            Ticket(
+                pk=ticket_id,
+                leg_count=legs,
+                combined_odds=combined.quantize(Decimal("0.0001")),
+                estimated_roi=round(roi, 2),
+            )
+        )
+        if len(pending) >= BATCH_SIZE:
+            Ticket.objects.bulk_update(
+                pending, ["leg_count", "combined_odds", "estimated_roi"]
+            )
+            pending = []
+    Ticket.objects.bulk_update(pending, ["leg_count", "combined_odds", "estimated_roi"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tickets", "0009_ticket_batch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="combined_odds",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=4,
+                help_text="Product of the legs' odds (null without legs)",
+                max_digits=16,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="estimated_roi",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0.00"),
+                help_text="(combined_odds - 1) * 100, for a 1-unit stake",
+                max_digits=18,
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="leg_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
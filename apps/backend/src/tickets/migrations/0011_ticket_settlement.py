@@ -0,0 +1,145 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:52
+
+from decimal import Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+COUNTERS = {
+    "PENDING": "legs_pending",
+    "WON": "legs_won",
+    "HALF_WON": "legs_won",
+    "LOST": "legs_lost",
+    "HALF_LOST": "legs_lost",
+    "VOID": "legs_void",
+}
+FIELDS = [
+    "legs_pending",
+    "legs_won",
+    "legs_lost",
+    "legs_void",
+    "effective_odds",
+    "result",
+    "settled_at",
+]
+
+
+def leg_return(odds, outcome):
+    return {
+        "WON": odds,
+        "HALF_WON": (odds + 1) / 2,
+        "HALF_LOST": Decimal("0.5"),
+        "LOST": Decimal("0"),
+    }.get(outcome, Decimal("1"))
+
+
+def backfill_settlement(apps, schema_editor):
+    """Seed the settlement counters and result of tickets from their legs."""
+    Ticket = apps.get_model("tickets", "Ticket")
+    BetSelection = apps.get_model("tickets", "BetSelection")
+
+    legs = BetSelection.objects.order_by("ticket_id").values_list(
+        "ticket_id", "odds", "outcome", "modified"
+    )
+    pending = []
+    for ticket_id, rows in groupby(legs.iterator(), key=lambda row: row[0]):
+        ticket = Ticket(pk=ticket_id, effective_odds=Decimal("1.0000"))
+        for counter in COUNTERS.values():
+            setattr(ticket, counter, 0)
+        last_modified = None
+        for _, odds, outcome, modified in rows:
+            counter = COUNTERS[outcome]
+            setattr(ticket, counter, getattr(ticket, counter) + 1)
+            ticket.effective_odds = (
+                ticket.effective_odds * leg_return(odds, outcome)
+            ).quantize(Decimal("0.0001"))
+            last_modified = max(last_modified or modified, modified)
+        if ticket.effective_odds == 0:
+            ticket.result = "LOST"
+        elif ticket.legs_pending:
+            ticket.result = "PENDING"
+        elif ticket.effective_odds > 1:
+            ticket.result = "WON"
+        elif ticket.effective_odds == 1:
+            ticket.result = "VOID"
+        else:
+            ticket.result = "LOST"
+        ticket.settled_at = last_modified if ticket.result != "PENDING" else None
+        pending.append(ticket)
+        if len(pending) >= BATCH_SIZE:
+            Ticket.objects.bulk_update(pending, FIELDS)
+            pending = []
+    Ticket.objects.bulk_update(pending, FIELDS)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("tickets", "0010_ticket_totals"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ticket",
+            name="effective_odds",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=4,
+                help_text="Return per unit staked from the settled legs (pending legs count as 1; null without legs)",
+                max_digits=16,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="legs_lost",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Lost and half-lost legs"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="legs_pending",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="legs_void",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="legs_won",
+            field=models.PositiveIntegerField(
+                default=0, help_text="Won and half-won legs"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="result",
+            field=models.CharField(
+                choices=[
+                    ("PENDING", "Pending"),
+                    ("WON", "Won"),
+                    ("LOST", "Lost"),
+                    ("VOID", "Void"),
+                ],
+                default="PENDING",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="ticket",
+            name="settled_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="ticket",
+            index=models.Index(
+                fields=["user", "-settled_at"], name="tickets_tic_user_id_17dcdf_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_settlement, migrations.RunPython.noop),
+    ]
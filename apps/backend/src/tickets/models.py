@@ -1,8 +1,19 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
 from core.models import TimeStampedModel
 from sports.models import Match
 
+class TicketBatch(TimeStampedModel):
+    """Tickets uploaded together through POST /api/tickets/batch/, OCR'd as one job."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ticket_batches')
+
+    def __str__(self):
+        return f"TicketBatch {self.id}"
+
 class Ticket(TimeStampedModel):
     class Status(models.TextChoices):
         PENDING_OCR = 'PENDING_OCR', 'Pending OCR'
@@ -11,15 +22,160 @@ class Ticket(TimeStampedModel):
         VALIDATED = 'VALIDATED', 'Validated'
         REJECTED = 'REJECTED', 'Rejected'
 
+    class Result(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        WON = 'WON', 'Won'
+        LOST = 'LOST', 'Lost'
+        VOID = 'VOID', 'Void'
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tickets')
     image = models.ImageField(upload_to='tickets/')
+    image_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True, help_text='SHA-256 of the original upload')
+    image_variants = models.JSONField(default=dict, blank=True, help_text='Resized WebP variants (core.image_variants)')
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING_OCR)
     ocr_raw_data = models.JSONField(null=True, blank=True)
     ocr_error_log = models.TextField(null=True, blank=True, help_text='Stores error details when OCR or match linking fails')
+    ocr_tier = models.CharField(max_length=10, blank=True, default='', help_text='OCR tier that produced ocr_raw_data (tickets/ocr_tiers.py)')
+    batch = models.ForeignKey(TicketBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='tickets')
+    # Denormalized from the selections (BetSelection.save(), tickets/signals.py,
+    # OCR linking) so listings read one table.
+    leg_count = models.PositiveIntegerField(default=0)
+    combined_odds = models.DecimalField(max_digits=16, decimal_places=4, null=True, blank=True, help_text='Product of the legs\' odds (null without legs)')
+    estimated_roi = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal('0.00'), help_text='(combined_odds - 1) * 100, for a 1-unit stake')
+    # Accumulator settlement, updated in the transaction that settles each leg.
+    legs_pending = models.PositiveIntegerField(default=0)
+    legs_won = models.PositiveIntegerField(default=0, help_text='Won and half-won legs')
+    legs_lost = models.PositiveIntegerField(default=0, help_text='Lost and half-lost legs')
+    legs_void = models.PositiveIntegerField(default=0)
+    effective_odds = models.DecimalField(max_digits=16, decimal_places=4, null=True, blank=True, help_text='Return per unit staked from the settled legs (pending legs count as 1; null without legs)')
+    result = models.CharField(max_length=10, choices=Result.choices, default=Result.PENDING)
+    settled_at = models.DateTimeField(null=True, blank=True)
+
+    TOTALS_FIELDS = [
+        'leg_count', 'combined_odds', 'estimated_roi',
+        'legs_pending', 'legs_won', 'legs_lost', 'legs_void', 'effective_odds', 'result', 'settled_at',
+    ]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-settled_at']),
+        ]
 
     def __str__(self):
         return f"Ticket {self.id} - {self.status}"
 
+    def apply_totals(self, legs):
+        """Set every TOTALS_FIELDS value from the ticket's legs (BetSelections, not saved)."""
+        legs = list(legs)
+        self.leg_count, self.combined_odds, self.estimated_roi = ticket_totals(leg.odds for leg in legs)
+        self.legs_pending = self.legs_won = self.legs_lost = self.legs_void = 0
+        self.effective_odds = Decimal('1.0000') if legs else None
+        for leg in legs:
+            self._count_leg(leg.odds, leg.outcome)
+        self._update_result()
+
+    def settle_leg(self, odds, outcome):
+        """A leg went from PENDING to `outcome` (not saved)."""
+        self.legs_pending -= 1
+        self._count_leg(odds, outcome)
+        self._update_result()
+
+    def _count_leg(self, odds, outcome):
+        counter = LEG_COUNTERS[outcome]
+        setattr(self, counter, getattr(self, counter) + 1)
+        self.effective_odds = min(self.effective_odds * leg_return(odds, outcome), MAX_TICKET_ODDS).quantize(Decimal('0.0001'))
+
+    def _update_result(self):
+        """
+        Lost as soon as a leg is fully lost; otherwise settled once no leg is
+        pending, as won / void / lost depending on the return per unit staked.
+        """
+        if not self.leg_count:
+            result = self.Result.PENDING
+        elif self.effective_odds == 0:
+            result = self.Result.LOST
+        elif self.legs_pending:
+            result = self.Result.PENDING
+        elif self.effective_odds > 1:
+            result = self.Result.WON
+        elif self.effective_odds == 1:
+            result = self.Result.VOID
+        else:
+            result = self.Result.LOST
+        if result == self.Result.PENDING:
+            self.settled_at = None
+        elif self.result == self.Result.PENDING or self.settled_at is None:
+            self.settled_at = timezone.now()
+        self.result = result
+
+
+# Largest odds the columns hold (BetSelection.odds, Ticket.combined_odds / effective_odds;
+# the latter kept whole so it also survives SQLite's float storage).
+MAX_LEG_ODDS = Decimal('99999999.99')
+MAX_TICKET_ODDS = Decimal('999999999999')
+
+
+def ticket_totals(odds):
+    """(leg_count, combined_odds, estimated_roi) of an accumulator with these odds."""
+    odds = list(odds)
+    if not odds:
+        return 0, None, Decimal('0.00')
+    combined = Decimal('1.00')
+    for value in odds:
+        combined *= value
+    # A few misread legs can multiply past the column: cap rather than fail the save.
+    combined = min(combined, MAX_TICKET_ODDS)
+    roi = (combined - Decimal('1.00')) * Decimal('100.00')
+    return len(odds), combined.quantize(Decimal('0.0001')), round(roi, 2)
+
+
+def leg_return(odds, outcome):
+    """What one unit carried onto a leg returns: a half outcome settles half the stake."""
+    Outcome = BetSelection.Outcome
+    return {
+        Outcome.PENDING: Decimal('1'),
+        Outcome.WON: odds,
+        Outcome.HALF_WON: (odds + 1) / 2,
+        Outcome.VOID: Decimal('1'),
+        Outcome.HALF_LOST: Decimal('0.5'),
+        Outcome.LOST: Decimal('0'),
+    }[outcome]
+
+
+def refresh_ticket_totals(ticket_id):
+    """Recompute a ticket's denormalized totals from its stored selections."""
+    with transaction.atomic():
+        ticket = Ticket.objects.select_for_update().filter(pk=ticket_id).only('id', *Ticket.TOTALS_FIELDS).first()
+        if ticket is None:
+            return
+        ticket.apply_totals(BetSelection.objects.filter(ticket_id=ticket_id).only('odds', 'outcome'))
+        ticket.save(update_fields=[*Ticket.TOTALS_FIELDS, 'modified'])
+
+
+def settle_legs(selections):
+    """
+    Apply PENDING -> final transitions of `selections` to their tickets, one
+    locked read and one UPDATE per ticket. Call it in the transaction that
+    stores the outcomes, with legs that were selected there FOR UPDATE while
+    still PENDING: a leg settled meanwhile by someone else must not be
+    counted twice.
+    """
+    by_ticket = defaultdict(list)
+    for selection in selections:
+        by_ticket[selection.ticket_id].append(selection)
+    # Lock in a stable order so concurrent settlements cannot deadlock.
+    for ticket_id in sorted(by_ticket, key=str):
+        ticket = Ticket.objects.select_for_update().filter(pk=ticket_id).only('id', *Ticket.TOTALS_FIELDS).first()
+        if ticket is None:
+            continue
+        if ticket.legs_pending < len(by_ticket[ticket_id]):
+            # Counters out of step with the legs (e.g. rows written by bulk operations).
+            ticket.apply_totals(BetSelection.objects.filter(ticket_id=ticket_id).only('odds', 'outcome'))
+        else:
+            for selection in by_ticket[ticket_id]:
+                ticket.settle_leg(selection.odds, selection.outcome)
+        ticket.save(update_fields=[*Ticket.TOTALS_FIELDS, 'modified'])
+
 class BetSelection(TimeStampedModel):
     class Outcome(models.TextChoices):
         PENDING = 'PENDING', 'Pending'
@@ -38,5 +194,60 @@ class BetSelection(TimeStampedModel):
     stats_processed = models.BooleanField(default=False)
     kickoff_time = models.DateTimeField(null=True, blank=True)
 
+    # Fields the ticket's totals and settlement depend on.
+    TRACKED_FIELDS = ('ticket', 'odds', 'outcome')
+
     def __str__(self):
         return f"{self.selection} @ {self.odds}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if {'ticket_id', 'odds', 'outcome'} <= set(field_names):
+            instance._stored = (instance.ticket_id, instance.odds, instance.outcome)
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Saves the leg and updates its ticket in the same transaction: a leg
+        leaving PENDING is applied incrementally (settle_legs), anything
+        else (new leg, odds or ticket change, corrected outcome) recomputes
+        the ticket from its legs.
+        """
+        stored = getattr(self, '_stored', None)
+        update_fields = kwargs.get('update_fields')
+        current = (self.ticket_id, self.odds, self.outcome)
+        if stored is not None and update_fields is not None:
+            # Fields left out of update_fields keep their stored value.
+            written = {name for field in update_fields for name in (field, field.removesuffix('_id'))}
+            current = tuple(new if name in written else old for name, old, new in zip(self.TRACKED_FIELDS, stored, current))
+
+        with transaction.atomic():
+            settling = (
+                stored is not None and stored != current
+                and stored[:2] == current[:2] and stored[2] == self.Outcome.PENDING
+            )
+            if settling:
+                # Only a leg still PENDING in the database is a real transition.
+                settling = BetSelection.objects.select_for_update().filter(pk=self.pk, outcome=self.Outcome.PENDING).exists()
+            super().save(*args, **kwargs)
+            if stored == current:
+                pass
+            elif settling:
+                settle_legs([self])
+            else:
+                refresh_ticket_totals(current[0])
+                if stored is not None and stored[0] != current[0]:
+                    refresh_ticket_totals(stored[0])
+        self._stored = current
+
+
+# Ticket counter each leg outcome is counted in.
+LEG_COUNTERS = {
+    BetSelection.Outcome.PENDING: 'legs_pending',
+    BetSelection.Outcome.WON: 'legs_won',
+    BetSelection.Outcome.HALF_WON: 'legs_won',
+    BetSelection.Outcome.LOST: 'legs_lost',
+    BetSelection.Outcome.HALF_LOST: 'legs_lost',
+    BetSelection.Outcome.VOID: 'legs_void',
+}
@@ -0,0 +1,100 @@
+"""
+Tiered OCR: the cheapest configuration first, escalation only when its
+output does not validate.
+
+    fast  OCR_FAST_MODEL, reduced prompt, image downscaled to OCR_FAST_MAX_DIMENSION
+    full  OCR_FULL_MODEL, full prompt, the stored image (OCR_IMAGE_MAX_DIMENSION)
+
+`tickets.logic.extract_with_tiers` runs them in order and stops at the first
+extraction without `validation_problems()`: at least one leg, odds on every
+leg, every match name linked to a Match, and the `predictions` that
+TicketStatusSerializer exposes. The last tier's result is used
+whatever it contains, as before tiers existed. OCR_TIERED=False only runs
+the full tier.
+
+Per-tier latency and escalation counts are kept per process and reported
+under the `ocr` key of /api/_perf/; each ticket records the tier that
+produced its data in `Ticket.ocr_tier`.
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+
+from tickets.services import FAST_PROMPT, FULL_PROMPT
+
+LATENCY_SAMPLES = 500
+
+
+@dataclass(frozen=True)
+class OCRTier:
+    name: str
+    model: str
+    prompt: str
+    # None sends the stored image as it is.
+    max_dimension: Optional[int] = None
+
+
+def active_tiers():
+    full = OCRTier('full', settings.OCR_FULL_MODEL, FULL_PROMPT)
+    if not settings.OCR_TIERED:
+        return [full]
+    return [OCRTier('fast', settings.OCR_FAST_MODEL, FAST_PROMPT, settings.OCR_FAST_MAX_DIMENSION), full]
+
+
+def validation_problems(data, bets, matches):
+    """Reasons an extraction should go to the next tier (empty list: accept it)."""
+    if not bets:
+        return ['no legs']
+    problems = []
+    if not isinstance(data, dict) or not isinstance(data.get('predictions'), list) or not data['predictions']:
+        problems.append('no predictions')
+    missing_odds = sum(1 for bet in bets if not bet.get('odds'))
+    if missing_odds:
+        problems.append(f'{missing_odds} leg(s) without odds')
+    unlinked = sum(1 for match in matches if match is None)
+    if unlinked:
+        problems.append(f'{unlinked} leg(s) not linked to a match')
+    return problems
+
+
+# ─── Metrics ────────────────────────────────────────────────
+_lock = threading.Lock()
+_stats = {}
+
+
+def record(tier, seconds, outcome):
+    """`outcome`: 'accepted', 'escalated' or 'error'."""
+    with _lock:
+        stats = _stats.setdefault(tier, {'latencies': deque(maxlen=LATENCY_SAMPLES), 'accepted': 0, 'escalated': 0, 'error': 0})
+        stats['latencies'].append(seconds * 1000)
+        stats[outcome] += 1
+
+
+def _percentile(values, p):
+    return round(values[min(len(values) - 1, int(len(values) * p))], 1)
+
+
+def metrics():
+    """Per tier: runs, escalation rate and p50/p95 latency (ms) of this process."""
+    with _lock:
+        snapshot = {tier: dict(stats, latencies=sorted(stats['latencies'])) for tier, stats in _stats.items()}
+    report = {}
+    for tier, stats in snapshot.items():
+        runs = stats['accepted'] + stats['escalated'] + stats['error']
+        latencies = stats.pop('latencies')
+        report[tier] = {
+            'runs': runs,
+            **stats,
+            'escalation_rate': round(stats['escalated'] / runs, 4) if runs else None,
+            'latency_ms_p50': _percentile(latencies, 0.50) if latencies else None,
+            'latency_ms_p95': _percentile(latencies, 0.95) if latencies else None,
+        }
+    return report
+
+
+def reset_metrics():
+    with _lock:
+        _stats.clear()
@@ -0,0 +1,195 @@
+"""
+Image preprocessing for ticket OCR.
+
+Uploads are decoded once with Pillow, auto-oriented, trimmed of uniform borders,
+downscaled to OCR_IMAGE_MAX_DIMENSION and re-encoded without EXIF. The result is
+what gets stored and what is sent to Gemini, instead of the raw phone photo.
+"""
+import io
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+from django.conf import settings
+from PIL import Image, ImageChops, ImageOps
+
+logger = logging.getLogger(__name__)
+
+FORMAT_INFO = {
+    'WEBP': ('image/webp', '.webp'),
+    'JPEG': ('image/jpeg', '.jpg'),
+}
+
+# Pixels of margin kept around the content when trimming borders.
+TRIM_PADDING = 8
+# Per-channel difference from the corner colour still treated as border.
+TRIM_TOLERANCE = 12
+
+_decode_slots = threading.BoundedSemaphore(settings.IMAGE_DECODE_CONCURRENCY)
+
+
+class ImageTooLargeError(ValueError):
+    """Decoded image would exceed OCR_MAX_IMAGE_PIXELS."""
+
+
+@dataclass
+class PreprocessedImage:
+    content: bytes
+    mime_type: str
+    extension: str
+    width: int
+    height: int
+    original_size: int
+
+    @property
+    def size(self):
+        return len(self.content)
+
+
+def _flatten(image):
+    """Convert to RGB, compositing any transparency on white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def _trim_borders(image):
+    """Crop uniform margins (screenshot bars, scanner borders) around the ticket."""
+    background = Image.new('RGB', image.size, image.getpixel((0, 0)))
+    diff = ImageChops.difference(image, background).convert('L')
+    bbox = diff.point(lambda p: 255 if p > TRIM_TOLERANCE else 0).getbbox()
+    if not bbox:
+        return image
+
+    left, top, right, bottom = bbox
+    bbox = (
+        max(0, left - TRIM_PADDING),
+        max(0, top - TRIM_PADDING),
+        min(image.width, right + TRIM_PADDING),
+        min(image.height, bottom + TRIM_PADDING),
+    )
+    if bbox == (0, 0, image.width, image.height):
+        return image
+    return image.crop(bbox)
+
+
+def draft_size(size, max_dimension):
+    """
+    Target for Image.draft(): the JPEG decoder picks the smallest 1/2, 1/4 or 1/8
+    scale that still covers this size, so the long edge stays >= max_dimension.
+    """
+    width, height = size
+    scale = min(1.0, max_dimension / max(width, height))
+    return (max(1, int(width * scale)), max(1, int(height * scale)))
+
+
+def preprocess_ticket_image(data):
+    """
+    Turn uploaded image bytes (or a file object) into an OCR-ready image.
+
+    File objects (e.g. uploads streamed to a temp file) are decoded straight
+    from the file, never read into memory whole.
+
+    Raises PIL.UnidentifiedImageError if the data is not a readable image and
+    ImageTooLargeError if it has more than OCR_MAX_IMAGE_PIXELS pixels.
+    """
+    if hasattr(data, 'read'):
+        data.seek(0, os.SEEK_END)
+        original_size = data.tell()
+        data.seek(0)
+        source_file = data
+    else:
+        original_size = len(data)
+        source_file = io.BytesIO(data)
+
+    max_dimension = settings.OCR_IMAGE_MAX_DIMENSION
+    image_format = settings.OCR_IMAGE_FORMAT.upper()
+    mime_type, extension = FORMAT_INFO[image_format]
+
+    # Decoded pixels dominate memory: cap how many images a worker holds at once.
+    with _decode_slots:
+        with Image.open(source_file) as source:
+            if source.width * source.height > settings.OCR_MAX_IMAGE_PIXELS:
+                raise ImageTooLargeError(f"{source.width}x{source.height} image exceeds OCR_MAX_IMAGE_PIXELS")
+            # Let the JPEG decoder skip detail we are about to throw away.
+            if source.format == 'JPEG':
+                source.draft('RGB', draft_size(source.size, max_dimension))
+            image = ImageOps.exif_transpose(source)
+            image = _flatten(image)
+
+        # Downscale first so border trimming works on the small image.
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        image = _trim_borders(image)
+
+        out = io.BytesIO()
+        save_kwargs = {'quality': settings.OCR_IMAGE_QUALITY}
+        if image_format == 'WEBP':
+            # method 2 is ~2x faster than the default 4 for ~3% larger files.
+            save_kwargs['method'] = 2
+        else:
+            save_kwargs['optimize'] = True
+        # No exif= argument: metadata (GPS, device, timestamps) is dropped.
+        image.save(out, format=image_format, **save_kwargs)
+
+    return PreprocessedImage(
+        content=out.getvalue(),
+        mime_type=mime_type,
+        extension=extension,
+        width=image.width,
+        height=image.height,
+        original_size=original_size,
+    )
+
+
+def downscale_for_ocr(content, max_dimension):
+    """
+    (bytes, mime_type) of an already preprocessed image shrunk so its long
+    edge is at most `max_dimension` (the fast OCR tier). Smaller images are
+    returned unchanged.
+    """
+    image_format = settings.OCR_IMAGE_FORMAT.upper()
+    mime_type, _ = FORMAT_INFO[image_format]
+    with _decode_slots:
+        with Image.open(io.BytesIO(content)) as image:
+            if max(image.size) <= max_dimension:
+                return content, mime_type
+            image = _flatten(image)
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format=image_format, quality=settings.OCR_IMAGE_QUALITY)
+    return out.getvalue(), mime_type
+
+
+def load_image_for_ocr(image_path):
+    """
+    Return (bytes, mime_type) for the Gemini request.
+
+    Images stored before preprocessing existed are preprocessed on the fly;
+    already-processed files are sent as they are.
+    """
+    ext = os.path.splitext(image_path)[1].lower()
+    expected_mime, expected_ext = FORMAT_INFO[settings.OCR_IMAGE_FORMAT.upper()]
+
+    with open(image_path, 'rb') as f:
+        if ext == expected_ext:
+            # Header-only read: already the right format, check it is also small enough.
+            with Image.open(f) as image:
+                small_enough = max(image.size) <= settings.OCR_IMAGE_MAX_DIMENSION
+            if small_enough:
+                f.seek(0)
+                return f.read(), expected_mime
+
+        # Legacy original: decoded from the file handle, only the result is in memory.
+        processed = preprocess_ticket_image(f)
+    logger.info(
+        f"Preprocessed legacy ticket image {os.path.basename(image_path)}: "
+        f"{processed.original_size} -> {processed.size} bytes"
+    )
+    return processed.content, processed.mime_type
@@ -2,13 +2,20 @@
 Production-grade serializers for Ticket Upload & Listing API.
 Includes validation, status mapping, and nested bet selection details.
 """
+import os
+
+from PIL import Image, UnidentifiedImageError
 from rest_framework import serializers
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import FileExtensionValidator
 from django.urls import reverse
-from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
 
-from .models import Ticket, BetSelection
+from .models import Ticket, TicketBatch, BetSelection
+from .preprocessing import ImageTooLargeError, preprocess_ticket_image
+from core.image_variants import variant_url, variant_urls
 
 
 def validate_file_size(value):
@@ -24,6 +31,34 @@ def validate_file_size(value):
         )
 
 
+TICKET_IMAGE_VALIDATORS = [
+    FileExtensionValidator(
+        allowed_extensions=['jpg', 'jpeg', 'png'],
+        message="Seuls les fichiers JPG, JPEG et PNG sont acceptés."
+    ),
+    validate_file_size
+]
+
+
+def prepare_ticket_image(value):
+    """
+    Preprocessed file to store for an uploaded ticket image, and the SHA-256
+    of the original bytes (computed while the upload was streamed).
+    """
+    try:
+        processed = preprocess_ticket_image(value)
+    except (ImageTooLargeError, Image.DecompressionBombError):
+        # Pillow refuses to open images above twice Image.MAX_IMAGE_PIXELS
+        # before our own OCR_MAX_IMAGE_PIXELS check runs.
+        raise serializers.ValidationError("Résolution de l'image trop élevée.")
+    except (UnidentifiedImageError, OSError):
+        raise serializers.ValidationError("Image illisible ou corrompue.")
+
+    name = os.path.splitext(os.path.basename(value.name))[0] + processed.extension
+    image = SimpleUploadedFile(name, processed.content, content_type=processed.mime_type)
+    return image, getattr(value, 'sha256', '')
+
+
 class BetSelectionDetailSerializer(serializers.ModelSerializer):
     """
     Detailed serializer for BetSelection with match name and outcome.
@@ -41,6 +76,13 @@ class BetSelectionDetailSerializer(serializers.ModelSerializer):
         return str(obj.match) if obj.match else "Match inconnu"
 
 
+# Internal statuses shown differently to the mobile app.
+MOBILE_STATUS_MAPPING = {
+    'REVIEW_NEEDED': 'FAILED_OCR',
+    'REJECTED': 'FAILED_OCR',
+}
+
+
 class TicketStatusSerializer(serializers.ModelSerializer):
     """
     Serializer for status polling endpoint.
@@ -59,10 +101,6 @@ class TicketStatusSerializer(serializers.ModelSerializer):
     
     def get_status(self, obj):
         """Maps internal statuses to mobile-friendly codes."""
-        MOBILE_STATUS_MAPPING = {
-            'REVIEW_NEEDED': 'FAILED_OCR',
-            'REJECTED': 'FAILED_OCR',
-        }
         return MOBILE_STATUS_MAPPING.get(obj.status, obj.status)
     
     def get_warning_message(self, obj):
@@ -93,7 +131,8 @@ class TicketStatusSerializer(serializers.ModelSerializer):
                 'stake': prediction.get('stake'),
             }
 
-        first_selection = obj.selections.first()
+        # Iterating .all() uses the views' prefetch; .first() would query again.
+        first_selection = next(iter(obj.selections.all()), None)
         return {
             'match': first_bet.get('match_name') or (
                 str(first_selection.match) if first_selection else ''
@@ -118,21 +157,16 @@ class TicketUploadSerializer(serializers.ModelSerializer):
     
     Features:
     - Image validation (format & size)
-    - Returns status_url for polling
+    - Returns status_url for polling, wait_url for long-polling
     - Immediate response (202 Accepted)
     """
     image = serializers.ImageField(
         write_only=True,
         required=True,
-        validators=[
-            FileExtensionValidator(
-                allowed_extensions=['jpg', 'jpeg', 'png'],
-                message="Seuls les fichiers JPG, JPEG et PNG sont acceptés."
-            ),
-            validate_file_size
-        ]
+        validators=TICKET_IMAGE_VALIDATORS
     )
     status_url = serializers.SerializerMethodField()
+    wait_url = serializers.SerializerMethodField()
     ticket_id = serializers.UUIDField(source='id', read_only=True)
     created_at = serializers.DateTimeField(source='created', read_only=True)
     
@@ -144,10 +178,23 @@ class TicketUploadSerializer(serializers.ModelSerializer):
             'image',
             'status',
             'created_at',
-            'status_url'
+            'status_url',
+            'wait_url',
         ]
-        read_only_fields = ['id', 'ticket_id', 'status', 'created_at', 'status_url']
+        read_only_fields = ['id', 'ticket_id', 'status', 'created_at', 'status_url', 'wait_url']
     
+    def validate_image(self, value):
+        """
+        Downscale, re-encode and strip EXIF before the image is stored.
+        The same smaller file is later sent to Gemini.
+        """
+        image, self._image_sha256 = prepare_ticket_image(value)
+        return image
+
+    def create(self, validated_data):
+        validated_data['image_sha256'] = getattr(self, '_image_sha256', '')
+        return super().create(validated_data)
+
     def get_status_url(self, obj):
         """
         Returns the absolute URL for status polling.
@@ -157,14 +204,25 @@ class TicketUploadSerializer(serializers.ModelSerializer):
         url = reverse('tickets:ticket-status', kwargs={'pk': obj.id})
         return request.build_absolute_uri(url) if request else url
 
+    def get_wait_url(self, obj):
+        """Long-poll URL answering as soon as OCR finishes (instead of polling status_url)."""
+        request = self.context.get('request')
+        url = reverse('tickets:ticket-wait', kwargs={'pk': obj.id})
+        return request.build_absolute_uri(url) if request else url
+
 
 class TicketListSerializer(serializers.ModelSerializer):
     """
     Lightweight serializer for ticket list view.
-    Optimized for performance with minimal data.
+    Optimized for performance with minimal data: totals are read from the
+    denormalized Ticket columns, no selection is loaded.
     """
     thumbnail_url = serializers.SerializerMethodField()
-    estimated_roi = serializers.SerializerMethodField()
+    image_urls = serializers.SerializerMethodField()
+    # Numbers in JSON, as when ROI was computed per request.
+    combined_odds = serializers.DecimalField(max_digits=16, decimal_places=4, read_only=True, coerce_to_string=False)
+    estimated_roi = serializers.DecimalField(max_digits=18, decimal_places=2, read_only=True, coerce_to_string=False)
+    effective_odds = serializers.DecimalField(max_digits=16, decimal_places=4, read_only=True, coerce_to_string=False)
     created_at = serializers.DateTimeField(source='created', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     
@@ -176,32 +234,130 @@ class TicketListSerializer(serializers.ModelSerializer):
             'status_display',
             'created_at',
             'thumbnail_url',
-            'estimated_roi'
+            'image_urls',
+            'leg_count',
+            'combined_odds',
+            'estimated_roi',
+            'result',
+            'legs_pending',
+            'legs_won',
+            'legs_lost',
+            'legs_void',
+            'effective_odds',
+            'settled_at'
         ]
     
     def get_thumbnail_url(self, obj):
-        """Returns the image URL from storage (S3 or media)."""
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
-    
-    def get_estimated_roi(self, obj):
-        """
-        Calculates potential return on investment based on bet selections.
-        Formula: Product of all odds - 1 (assuming €1 stake).
-        """
-        selections = obj.selections.all()
-        if not selections:
-            return Decimal('0.00')
-        
-        # Calculate combined odds (parlay/accumulator)
-        combined_odds = Decimal('1.00')
-        for selection in selections:
-            combined_odds *= selection.odds
-        
-        # ROI = (combined_odds - 1) * 100%
-        roi = (combined_odds - Decimal('1.00')) * Decimal('100.00')
-        return round(roi, 2)
+        """Returns the small WebP variant URL (original until variants exist)."""
+        return variant_url(obj.image, obj.image_variants, 'small', self.context.get('request'))
+
+    def get_image_urls(self, obj):
+        """Returns small/medium/large/original URLs."""
+        return variant_urls(obj.image, obj.image_variants, self.context.get('request'))
+
+
+class TicketBatchUploadSerializer(serializers.Serializer):
+    """
+    Serializer for multi-image upload (POST /api/tickets/batch/).
+
+    Every image goes through the same validation and preprocessing as a
+    single upload; the tickets are then inserted with one bulk_create.
+    """
+    images = serializers.ListField(
+        child=serializers.ImageField(validators=TICKET_IMAGE_VALIDATORS),
+        allow_empty=False,
+        write_only=True
+    )
+
+    def validate_images(self, value):
+        limit = settings.TICKET_BATCH_MAX_IMAGES
+        if len(value) > limit:
+            raise serializers.ValidationError(f"{limit} images maximum par envoi.")
+
+        prepared, errors = [], {}
+        for index, image in enumerate(value):
+            try:
+                prepared.append(prepare_ticket_image(image))
+            except serializers.ValidationError as e:
+                errors[index] = e.detail
+        if errors:
+            raise serializers.ValidationError(errors)
+        return prepared
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            batch = TicketBatch.objects.create(user=validated_data['user'])
+            Ticket.objects.bulk_create([
+                Ticket(
+                    user=batch.user,
+                    batch=batch,
+                    image=image,
+                    image_sha256=sha256,
+                    status=Ticket.Status.PENDING_OCR,
+                )
+                for image, sha256 in validated_data['images']
+            ])
+        return batch
+
+
+class TicketBatchItemSerializer(serializers.ModelSerializer):
+    """One ticket of a batch: mobile status code and its own polling URL."""
+    ticket_id = serializers.UUIDField(source='id', read_only=True)
+    status = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Ticket
+        fields = ['ticket_id', 'status', 'status_url']
+
+    def get_status(self, obj):
+        return MOBILE_STATUS_MAPPING.get(obj.status, obj.status)
+
+    def get_status_url(self, obj):
+        request = self.context.get('request')
+        url = reverse('tickets:ticket-status', kwargs={'pk': obj.id})
+        return request.build_absolute_uri(url) if request else url
+
+
+class TicketBatchStatusSerializer(serializers.ModelSerializer):
+    """
+    Progress of a batch upload, polled at `status_url` until `done`.
+    `counts` is keyed by internal status (PENDING_OCR, PROCESSING, …).
+    """
+    batch_id = serializers.UUIDField(source='id', read_only=True)
+    created_at = serializers.DateTimeField(source='created', read_only=True)
+    total = serializers.SerializerMethodField()
+    done = serializers.SerializerMethodField()
+    counts = serializers.SerializerMethodField()
+    tickets = serializers.SerializerMethodField()
+    status_url = serializers.SerializerMethodField()
+
+    IN_PROGRESS = {Ticket.Status.PENDING_OCR, Ticket.Status.PROCESSING}
+
+    class Meta:
+        model = TicketBatch
+        fields = ['batch_id', 'created_at', 'total', 'done', 'counts', 'tickets', 'status_url']
+
+    def _tickets(self, obj):
+        # Iterating .all() uses the view's prefetch.
+        return sorted(obj.tickets.all(), key=lambda ticket: (ticket.created, str(ticket.id)))
+
+    def get_total(self, obj):
+        return len(self._tickets(obj))
+
+    def get_done(self, obj):
+        return not any(ticket.status in self.IN_PROGRESS for ticket in self._tickets(obj))
+
+    def get_counts(self, obj):
+        counts = {}
+        for ticket in self._tickets(obj):
+            counts[ticket.status] = counts.get(ticket.status, 0) + 1
+        return counts
+
+    def get_tickets(self, obj):
+        return TicketBatchItemSerializer(self._tickets(obj), many=True, context=self.context).data
+
+    def get_status_url(self, obj):
+        request = self.context.get('request')
+        url = reverse('tickets:ticket-batch-status', kwargs={'pk': obj.id})
+        return request.build_absolute_uri(url) if request else url
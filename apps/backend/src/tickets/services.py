@@ -1,12 +1,59 @@
 import os
 import json
 import logging
-from google import genai
 from google.genai import types
 from django.conf import settings
+from tickets.gemini_governor import GeminiUnavailable, get_client, governor
+from tickets.preprocessing import downscale_for_ocr, load_image_for_ocr
 
 logger = logging.getLogger(__name__)
 
+FULL_PROMPT = """
+Extract sports betting data from this betting ticket image as JSON.
+Return ONLY valid JSON. Do not use markdown formatting.
+
+Required Keys:
+- bets (list of objects):
+    - match_name (string, e.g. "PSG vs Real Madrid", "Djokovic vs Nadal")
+    - selection (string, e.g. "Home Win", "Over 2.5", "Djokovic")
+    - odds (number if visible, otherwise null)
+    - stake (number if visible, otherwise null)
+    - match_date (string if visible, format YYYY-MM-DD, otherwise null)
+
+Optional Keys:
+- predictions (list of objects, same length as bets if possible):
+    - match_name (string)
+    - sport (string, one of: FOOTBALL, TENNIS, BASKETBALL, RUGBY, VOLLEYBALL, HANDBALL, HOCKEY, BASEBALL, FORMULA1, MMA)
+    - prediction_type (string, one of: MATCH_RESULT, OVER_UNDER, BTTS, GOALSCORER, DOUBLE_CHANCE, CORRECT_SCORE, WINNER, SET_SCORE, TOTAL_POINTS, HANDICAP, OTHER)
+    - prediction_value (string, e.g. "Home Win", "Over 2.5", "BTTS Yes", "Mbappé", "1X", "2-1", "Djokovic")
+    - match_date (string if visible, format YYYY-MM-DD, otherwise null)
+
+Guidelines for prediction_type:
+- MATCH_RESULT: 1, N, 2, Home Win, Draw, Away Win
+- OVER_UNDER: Over 2.5, Under 3.5, etc.
+- BTTS: Both Teams To Score Yes/No
+- GOALSCORER: A specific player to score
+- DOUBLE_CHANCE: 1X, X2, 12
+- CORRECT_SCORE: Exact score like 2-1
+- WINNER: Winner of a match (tennis, MMA, etc.)
+- SET_SCORE: Score in sets (tennis)
+- TOTAL_POINTS: Total points over/under (basketball)
+- HANDICAP: Handicap betting
+- OTHER: Anything else
+"""
+
+# Reduced prompt for the fast OCR tier (tickets/ocr_tiers.py): same keys as
+# FULL_PROMPT, without the guidelines.
+FAST_PROMPT = """
+Extract the bets of this betting ticket image as JSON, ONLY valid JSON, no markdown:
+{"bets": [{"match_name": "Home vs Away", "selection": string, "odds": number or null,
+"stake": number or null, "match_date": "YYYY-MM-DD" or null}],
+"predictions": [{"match_name": string, "sport": FOOTBALL|TENNIS|BASKETBALL|RUGBY|VOLLEYBALL|HANDBALL|HOCKEY|BASEBALL|FORMULA1|MMA,
+"prediction_type": MATCH_RESULT|OVER_UNDER|BTTS|GOALSCORER|DOUBLE_CHANCE|CORRECT_SCORE|WINNER|SET_SCORE|TOTAL_POINTS|HANDICAP|OTHER,
+"prediction_value": string, "match_date": "YYYY-MM-DD" or null}]}
+One prediction per bet, in the same order.
+"""
+
 
 class GeminiOCRService:
     def __init__(self):
@@ -17,63 +64,32 @@ class GeminiOCRService:
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
 
-        self.client = genai.Client(api_key=api_key)
-        self.model_name = 'gemini-2.0-flash'
+        # One client per process: building it per ticket re-creates its HTTP pool.
+        self.client = get_client(api_key)
+        self.model_name = settings.OCR_FULL_MODEL
 
-    def extract_data(self, image_path):
+    def extract_data(self, image_path, model=None, prompt=FULL_PROMPT, max_dimension=None):
         """
         Sends image to Gemini Flash and extracts structured predictions as JSON.
         Focused on prediction verification, NOT gambling data (odds/stake/payout).
+
+        The OCR tiers pass a lighter model / prompt and a smaller image
+        (`max_dimension`) for their first attempt.
         """
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found at {image_path}")
 
-        # Read image as bytes for the new SDK
-        with open(image_path, 'rb') as f:
-            image_bytes = f.read()
-
-        # Detect mime type
-        ext = os.path.splitext(image_path)[1].lower()
-        mime_map = {'.png': 'image/png', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.webp': 'image/webp'}
-        mime_type = mime_map.get(ext, 'image/jpeg')
-
-        prompt = """
-        Extract sports betting data from this betting ticket image as JSON.
-        Return ONLY valid JSON. Do not use markdown formatting.
-
-        Required Keys:
-        - bets (list of objects):
-            - match_name (string, e.g. "PSG vs Real Madrid", "Djokovic vs Nadal")
-            - selection (string, e.g. "Home Win", "Over 2.5", "Djokovic")
-            - odds (number if visible, otherwise null)
-            - stake (number if visible, otherwise null)
-            - match_date (string if visible, format YYYY-MM-DD, otherwise null)
-
-        Optional Keys:
-        - predictions (list of objects, same length as bets if possible):
-            - match_name (string)
-            - sport (string, one of: FOOTBALL, TENNIS, BASKETBALL, RUGBY, VOLLEYBALL, HANDBALL, HOCKEY, BASEBALL, FORMULA1, MMA)
-            - prediction_type (string, one of: MATCH_RESULT, OVER_UNDER, BTTS, GOALSCORER, DOUBLE_CHANCE, CORRECT_SCORE, WINNER, SET_SCORE, TOTAL_POINTS, HANDICAP, OTHER)
-            - prediction_value (string, e.g. "Home Win", "Over 2.5", "BTTS Yes", "Mbappé", "1X", "2-1", "Djokovic")
-            - match_date (string if visible, format YYYY-MM-DD, otherwise null)
-        
-        Guidelines for prediction_type:
-        - MATCH_RESULT: 1, N, 2, Home Win, Draw, Away Win
-        - OVER_UNDER: Over 2.5, Under 3.5, etc.
-        - BTTS: Both Teams To Score Yes/No
-        - GOALSCORER: A specific player to score
-        - DOUBLE_CHANCE: 1X, X2, 12
-        - CORRECT_SCORE: Exact score like 2-1
-        - WINNER: Winner of a match (tennis, MMA, etc.)
-        - SET_SCORE: Score in sets (tennis)
-        - TOTAL_POINTS: Total points over/under (basketball)
-        - HANDICAP: Handicap betting
-        - OTHER: Anything else
-        """
+        # Downscaled, EXIF-free bytes (legacy uploads are preprocessed on the fly)
+        image_bytes, mime_type = load_image_for_ocr(image_path)
+        if max_dimension:
+            image_bytes, mime_type = downscale_for_ocr(image_bytes, max_dimension)
+
 
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
+            # Concurrency/rate limits, retries on 429/503 and circuit breaker.
+            response = governor.call(
+                self.client.models.generate_content,
+                model=model or self.model_name,
                 contents=[
                     prompt,
                     types.Part.from_bytes(data=image_bytes, mime_type=mime_type),
@@ -92,6 +108,8 @@ class GeminiOCRService:
 
             return json.loads(cleaned_text.strip())
 
+        except GeminiUnavailable:
+            raise
         except Exception:
             logger.exception("Gemini OCR error")
             raise
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from tickets.models import BetSelection, refresh_ticket_totals
+
+# Saves update the ticket in BetSelection.save(); deletes also come from
+# querysets and cascades, which never call Model.delete().
+@receiver(post_delete, sender=BetSelection)
+def refresh_totals_on_delete(sender, instance, **kwargs):
+    refresh_ticket_totals(instance.ticket_id)
@@ -1,9 +1,34 @@
+import io
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from google.genai import errors as gemini_errors
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from unittest.mock import Mock, patch
 
-from tickets.logic import normalize_ocr_bets
-from tickets.models import Ticket
-from tickets.serializers import TicketStatusSerializer
+from tickets import events, ocr_tiers
+from tickets.gemini_governor import GeminiGovernor, GeminiUnavailable
+from tickets.logic import extract_with_tiers, normalize_ocr_bets, process_ticket_batch, process_ticket_image
+from tickets.models import MAX_TICKET_ODDS, BetSelection, Ticket, TicketBatch
+from sports.models import League, Match, Sport
+from tickets.preprocessing import downscale_for_ocr, load_image_for_ocr, preprocess_ticket_image
+from tickets.serializers import TicketStatusSerializer, prepare_ticket_image
 
 User = get_user_model()
 
@@ -57,3 +82,724 @@ class OCRContractTests(TestCase):
         self.assertEqual(str(data['ticket_id']), str(ticket.id))
         self.assertEqual(data['ocr_data']['match'], 'PSG vs OM')
         self.assertEqual(data['ocr_data']['selection'], 'PSG gagne')
+
+
+SAMPLE_TICKET = os.path.join(settings.BASE_DIR.parent, 'ticket.jpg')
+
+
+def _bomb_png(width=40_000, height=40_000):
+    """A few dozen bytes declaring more pixels than Pillow agrees to open."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+
+
+def _jpeg_bytes(size, orientation=None, color='white'):
+    image = Image.new('RGB', size, color)
+    # Full-width text band so border trimming leaves the aspect ratio alone.
+    image.paste((0, 0, 0), (0, size[1] // 3, size[0], size[1] // 2))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    exif[0x010F] = 'PhoneMaker'
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class ImagePreprocessingTests(TestCase):
+    def test_sample_ticket_is_downscaled_and_smaller(self):
+        with open(SAMPLE_TICKET, 'rb') as f:
+            data = f.read()
+
+        processed = preprocess_ticket_image(data)
+
+        self.assertLessEqual(max(processed.width, processed.height), settings.OCR_IMAGE_MAX_DIMENSION)
+        self.assertLess(processed.size, len(data) / 2)
+        self.assertEqual(processed.mime_type, 'image/webp')
+        with Image.open(io.BytesIO(processed.content)) as image:
+            self.assertEqual(image.format, 'WEBP')
+
+    def test_exif_is_stripped_and_orientation_applied(self):
+        # Orientation 6: stored landscape, displayed rotated 90° clockwise.
+        processed = preprocess_ticket_image(_jpeg_bytes((400, 200), orientation=6))
+
+        self.assertGreater(processed.height, processed.width)
+        with Image.open(io.BytesIO(processed.content)) as image:
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_uniform_borders_are_trimmed(self):
+        image = Image.new('RGB', (600, 600), 'black')
+        image.paste((255, 255, 255), (100, 100, 500, 500))
+        image.paste((0, 0, 0), (200, 200, 300, 300))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+
+        processed = preprocess_ticket_image(buffer.getvalue())
+
+        self.assertLess(processed.width, 450)
+        self.assertLess(processed.height, 450)
+
+    @override_settings(OCR_IMAGE_FORMAT='JPEG')
+    def test_jpeg_output(self):
+        processed = preprocess_ticket_image(_jpeg_bytes((3000, 2000)))
+        self.assertEqual(processed.mime_type, 'image/jpeg')
+        self.assertEqual(processed.width, settings.OCR_IMAGE_MAX_DIMENSION)
+
+    def test_legacy_image_is_preprocessed_for_ocr(self):
+        data, mime_type = load_image_for_ocr(SAMPLE_TICKET)
+        self.assertEqual(mime_type, 'image/webp')
+        self.assertLess(len(data), os.path.getsize(SAMPLE_TICKET))
+
+
+class TicketUploadPreprocessingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+
+    @patch('tickets.views.threading.Thread')
+    def test_upload_stores_preprocessed_image(self, mock_thread):
+        with open(SAMPLE_TICKET, 'rb') as f:
+            upload = SimpleUploadedFile('ticket.jpg', f.read(), content_type='image/jpeg')
+
+        with override_settings(MEDIA_ROOT=self.media.name):
+            response = self.client.post('/api/tickets/upload/', {'image': upload}, format='multipart')
+
+            self.assertEqual(response.status_code, 202)
+            ticket = Ticket.objects.get(user=self.user)
+            self.assertTrue(ticket.image.name.endswith('.webp'))
+            self.assertLess(ticket.image.size, os.path.getsize(SAMPLE_TICKET) / 2)
+
+    def test_unreadable_image_is_rejected(self):
+        upload = SimpleUploadedFile('ticket.jpg', b'not an image', content_type='image/jpeg')
+        response = self.client.post('/api/tickets/upload/', {'image': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamingUploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='streamer', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+
+    @patch('tickets.views.threading.Thread')
+    def test_upload_is_streamed_to_disk_and_hashed(self, mock_thread):
+        import hashlib
+
+        with open(SAMPLE_TICKET, 'rb') as f:
+            data = f.read()
+        upload = SimpleUploadedFile('ticket.jpg', data, content_type='image/jpeg')
+
+        with override_settings(MEDIA_ROOT=self.media.name), \
+                patch('tickets.serializers.preprocess_ticket_image', wraps=preprocess_ticket_image) as spy:
+            response = self.client.post('/api/tickets/upload/', {'image': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        # The serializer received the temp-file upload, not an in-memory copy.
+        self.assertTrue(hasattr(spy.call_args.args[0], 'temporary_file_path'))
+        ticket = Ticket.objects.get(user=self.user)
+        self.assertEqual(ticket.image_sha256, hashlib.sha256(data).hexdigest())
+
+    @override_settings(MAX_UPLOAD_FILE_SIZE=64 * 1024)
+    def test_oversized_upload_is_rejected_without_buffering(self):
+        with open(SAMPLE_TICKET, 'rb') as f:
+            upload = SimpleUploadedFile('ticket.jpg', f.read(), content_type='image/jpeg')
+
+        response = self.client.post('/api/tickets/upload/', {'image': upload}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ticket.objects.exists())
+
+    @override_settings(OCR_MAX_IMAGE_PIXELS=1000)
+    def test_huge_resolution_is_rejected(self):
+        upload = SimpleUploadedFile('ticket.jpg', _jpeg_bytes((100, 100)), content_type='image/jpeg')
+        response = self.client.post('/api/tickets/upload/', {'image': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+    def test_decompression_bomb_is_rejected(self):
+        upload = SimpleUploadedFile('ticket.png', _bomb_png(), content_type='image/png')
+        response = self.client.post('/api/tickets/upload/', {'image': upload}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ticket.objects.exists())
+
+        # Also when it reaches preprocessing (the upload field may not decode it first).
+        with self.assertRaises(ValidationError):
+            prepare_ticket_image(SimpleUploadedFile('ticket.png', _bomb_png(), content_type='image/png'))
+
+
+class TicketBatchUploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='batcher', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+
+    def _uploads(self, count):
+        return [
+            SimpleUploadedFile(f'ticket{i}.jpg', _jpeg_bytes((200 + i, 300)), content_type='image/jpeg')
+            for i in range(count)
+        ]
+
+    @patch('tickets.views.threading.Thread')
+    def test_batch_upload_creates_tickets_in_one_insert(self, mock_thread):
+        with override_settings(MEDIA_ROOT=self.media.name), CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/tickets/batch/', {'images': self._uploads(3)}, format='multipart')
+
+        self.assertEqual(response.status_code, 202)
+        ticket_inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "tickets_ticket"')]
+        self.assertEqual(len(ticket_inserts), 1)
+
+        batch = TicketBatch.objects.get(user=self.user)
+        tickets = list(batch.tickets.all())
+        self.assertEqual(len(tickets), 3)
+        self.assertTrue(all(t.image.name.endswith('.webp') and t.image_sha256 for t in tickets))
+        self.assertEqual(response.data['batch_id'], str(batch.id))
+        self.assertEqual(response.data['total'], 3)
+        self.assertFalse(response.data['done'])
+        self.assertTrue(response.data['status_url'].endswith(f'/api/tickets/batch/{batch.id}/'))
+
+        # One OCR job for the whole batch.
+        mock_thread.assert_called_once()
+        self.assertEqual(mock_thread.call_args.kwargs['target'], process_ticket_batch)
+        self.assertCountEqual(mock_thread.call_args.kwargs['args'][0], [t.id for t in tickets])
+
+    @patch('tickets.views.threading.Thread')
+    def test_invalid_image_rejects_whole_batch(self, mock_thread):
+        uploads = self._uploads(1) + [SimpleUploadedFile('bad.jpg', b'not an image', content_type='image/jpeg')]
+        with override_settings(MEDIA_ROOT=self.media.name):
+            response = self.client.post('/api/tickets/batch/', {'images': uploads}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ticket.objects.exists())
+        mock_thread.assert_not_called()
+
+    @patch('tickets.views.threading.Thread')
+    def test_decompression_bomb_rejects_whole_batch(self, mock_thread):
+        uploads = self._uploads(1) + [SimpleUploadedFile('bomb.png', _bomb_png(), content_type='image/png')]
+        with override_settings(MEDIA_ROOT=self.media.name):
+            response = self.client.post('/api/tickets/batch/', {'images': uploads}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ticket.objects.exists())
+        mock_thread.assert_not_called()
+
+    @override_settings(TICKET_BATCH_MAX_IMAGES=2)
+    def test_batch_size_is_capped(self):
+        response = self.client.post('/api/tickets/batch/', {'images': self._uploads(3)}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_batch_status(self):
+        batch = TicketBatch.objects.create(user=self.user)
+        Ticket.objects.create(user=self.user, batch=batch, image='tickets/a.jpg', status=Ticket.Status.VALIDATED)
+        pending = Ticket.objects.create(user=self.user, batch=batch, image='tickets/b.jpg')
+
+        response = self.client.get(f'/api/tickets/batch/{batch.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['counts'], {'VALIDATED': 1, 'PENDING_OCR': 1})
+        self.assertFalse(response.data['done'])
+        self.assertEqual(len(response.data['tickets']), 2)
+
+        response = self.client.get(f'/api/tickets/batch/{batch.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        Ticket.objects.filter(pk=pending.pk).update(status=Ticket.Status.REJECTED, modified=pending.modified + timedelta(seconds=1))
+        response = self.client.get(f'/api/tickets/batch/{batch.id}/')
+        self.assertTrue(response.data['done'])
+        self.assertIn('FAILED_OCR', [t['status'] for t in response.data['tickets']])
+
+        other = User.objects.create_user(username='other-batcher', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(f'/api/tickets/batch/{batch.id}/').status_code, 404)
+
+    def test_batch_shares_match_lookups(self):
+        tickets = [Ticket.objects.create(user=self.user, image=f'tickets/{i}.jpg') for i in range(3)]
+        caches = []
+
+        def process(ticket_id, match_cache=None):
+            caches.append(match_cache)
+            match_cache.find('PSG vs OM')
+            match_cache.find('psg  VS om')
+
+        with patch('tickets.logic.process_ticket_image', side_effect=process), \
+                patch('tickets.logic.ensure_variants'), \
+                patch('tickets.logic.find_match', return_value=None) as find_match:
+            process_ticket_batch([t.id for t in tickets])
+
+        self.assertEqual(len(caches), 3)
+        self.assertEqual(len({id(cache) for cache in caches}), 1)
+        find_match.assert_called_once_with('PSG vs OM')
+        self.assertEqual((caches[0].hits, caches[0].lookups), (5, 6))
+
+    def test_ticket_retried_while_queued_in_batch_is_processed_once(self):
+        league = League.objects.create(sport=Sport.objects.create(name='Football'), name='Ligue 1')
+        match = Match.objects.create(league=league, home_team='PSG', away_team='OM', date_time=timezone.now())
+        batch = TicketBatch.objects.create(user=self.user)
+        ticket = Ticket.objects.create(user=self.user, batch=batch, image='tickets/queued.jpg')
+        # Still waiting in the batch pool when retry_pending_ocr's --min-age passes.
+        Ticket.objects.filter(pk=ticket.pk).update(modified=timezone.now() - timedelta(minutes=10))
+        payload = TieredOCRTests.VALID
+
+        with patch('tickets.logic.GeminiOCRService') as service, \
+                patch('tickets.logic.find_match', return_value=match):
+            service.return_value.extract_data.return_value = payload
+            call_command('retry_pending_ocr', stdout=io.StringIO())
+            # The batch pool finally reaches it.
+            self.assertFalse(process_ticket_image(ticket.id))
+
+        self.assertEqual(service.return_value.extract_data.call_count, 1)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, Ticket.Status.VALIDATED)
+        self.assertEqual((ticket.selections.count(), ticket.leg_count), (1, 1))
+
+
+class TicketTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='totals', password='testpass123')
+        league = League.objects.create(sport=Sport.objects.create(name='Football'), name='Ligue 1')
+        self.match = Match.objects.create(league=league, home_team='PSG', away_team='OM', date_time=timezone.now())
+        self.ticket = Ticket.objects.create(user=self.user, image='tickets/test.jpg')
+
+    def _leg(self, odds):
+        return BetSelection.objects.create(ticket=self.ticket, match=self.match, selection='PSG', odds=Decimal(odds))
+
+    def test_totals_follow_selection_changes(self):
+        self.assertEqual((self.ticket.leg_count, self.ticket.combined_odds, self.ticket.estimated_roi), (0, None, Decimal('0.00')))
+
+        self._leg('1.50')
+        second = self._leg('2.10')
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.leg_count, 2)
+        self.assertEqual(self.ticket.combined_odds, Decimal('3.1500'))
+        self.assertEqual(self.ticket.estimated_roi, Decimal('215.00'))
+
+        second.odds = Decimal('2.00')
+        second.save()
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.estimated_roi, Decimal('200.00'))
+
+        second.delete()
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.leg_count, self.ticket.combined_odds), (1, Decimal('1.5000')))
+
+    def test_ocr_sets_totals_once(self):
+        payload = {'bets': [
+            {'match_name': 'PSG vs OM', 'selection': 'PSG', 'odds': 1.8, 'stake': 10},
+            {'match_name': 'OM vs PSG', 'selection': 'OM', 'odds': 2.5, 'stake': 10},
+        ]}
+        with patch('tickets.logic.GeminiOCRService') as service, \
+                patch('tickets.logic.find_match', return_value=self.match), \
+                patch('tickets.signals.refresh_ticket_totals') as refresh:
+            service.return_value.extract_data.return_value = payload
+            process_ticket_image(self.ticket.id)
+
+        refresh.assert_not_called()
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.status, Ticket.Status.VALIDATED)
+        self.assertEqual((self.ticket.leg_count, self.ticket.combined_odds, self.ticket.estimated_roi), (2, Decimal('4.5000'), Decimal('350.00')))
+
+    def _ocr(self, bets):
+        with patch('tickets.logic.GeminiOCRService') as service, \
+                patch('tickets.logic.find_match', return_value=self.match):
+            service.return_value.extract_data.return_value = {'bets': bets}
+            process_ticket_image(self.ticket.id)
+        self.ticket.refresh_from_db()
+
+    def test_huge_combined_odds_are_capped(self):
+        self._ocr([{'match_name': 'PSG vs OM', 'selection': 'PSG', 'odds': 150, 'stake': 10}] * 6)
+        self.assertEqual(self.ticket.status, Ticket.Status.VALIDATED)
+        self.assertEqual((self.ticket.leg_count, self.ticket.combined_odds), (6, MAX_TICKET_ODDS))
+
+    def test_odds_the_column_cannot_hold_need_review(self):
+        self._ocr([
+            {'match_name': 'PSG vs OM', 'selection': 'PSG', 'odds': 1.8, 'stake': 10},
+            {'match_name': 'OM vs PSG', 'selection': 'OM', 'odds': '1e12', 'stake': 10},
+        ])
+        self.assertEqual(self.ticket.status, Ticket.Status.REVIEW_NEEDED)
+        self.assertEqual(self.ticket.leg_count, 1)
+
+    def test_rejected_ticket_keeps_stored_totals(self):
+        with patch('tickets.logic.BetSelection.objects.bulk_create', side_effect=lambda legs: legs), \
+                patch.object(Ticket, 'save', autospec=True, side_effect=[RuntimeError('boom'), None]) as save:
+            self._ocr([{'match_name': 'PSG vs OM', 'selection': 'PSG', 'odds': 1.8, 'stake': 10}])
+        rejected = save.call_args.args[0]
+        self.assertEqual(rejected.status, Ticket.Status.REJECTED)
+        self.assertEqual((rejected.leg_count, rejected.combined_odds), (0, None))
+
+    def test_list_is_single_table(self):
+        self._leg('1.50')
+        self._leg('2.00')
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/tickets/list/')
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()['results'][0]
+        self.assertEqual((result['leg_count'], result['combined_odds'], result['estimated_roi']), (2, 3.0, 200.0))
+        self.assertEqual(len(queries), 2)  # COUNT + page
+        self.assertTrue(all('tickets_betselection' not in q['sql'] for q in queries.captured_queries))
+
+
+class TicketSettlementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='settler', password='testpass123')
+        league = League.objects.create(sport=Sport.objects.create(name='Football'), name='Ligue 1')
+        self.match = Match.objects.create(league=league, home_team='PSG', away_team='OM', date_time=timezone.now())
+        self.ticket = Ticket.objects.create(user=self.user, image='tickets/test.jpg')
+
+    def _leg(self, odds, selection='Home Win'):
+        return BetSelection.objects.create(ticket=self.ticket, match=self.match, selection=selection, odds=Decimal(odds))
+
+    def _settle(self, leg, outcome):
+        leg = BetSelection.objects.get(pk=leg.pk)
+        leg.outcome = outcome
+        leg.save()
+        self.ticket.refresh_from_db()
+
+    def test_counters_start_pending(self):
+        self._leg('1.50')
+        self._leg('2.00')
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.legs_pending, self.ticket.effective_odds), (2, Decimal('1.0000')))
+        self.assertEqual(self.ticket.result, Ticket.Result.PENDING)
+
+    def test_settled_when_all_legs_final(self):
+        first, second = self._leg('1.50'), self._leg('2.00')
+        with CaptureQueriesContext(connection) as queries:
+            self._settle(first, BetSelection.Outcome.WON)
+        # Incremental: the other legs are not read again.
+        self.assertFalse([q for q in queries.captured_queries if 'WHERE "tickets_betselection"."ticket_id"' in q['sql']])
+        self.assertEqual((self.ticket.legs_pending, self.ticket.legs_won), (1, 1))
+        self.assertEqual(self.ticket.result, Ticket.Result.PENDING)
+        self.assertIsNone(self.ticket.settled_at)
+
+        self._settle(second, BetSelection.Outcome.VOID)
+        self.assertEqual((self.ticket.legs_pending, self.ticket.legs_void), (0, 1))
+        self.assertEqual(self.ticket.effective_odds, Decimal('1.5000'))
+        self.assertEqual(self.ticket.result, Ticket.Result.WON)
+        self.assertIsNotNone(self.ticket.settled_at)
+
+    def test_lost_leg_settles_at_once(self):
+        first, _ = self._leg('1.50'), self._leg('2.00')
+        self._settle(first, BetSelection.Outcome.LOST)
+        self.assertEqual((self.ticket.legs_pending, self.ticket.legs_lost), (1, 1))
+        self.assertEqual(self.ticket.effective_odds, Decimal('0.0000'))
+        self.assertEqual(self.ticket.result, Ticket.Result.LOST)
+        self.assertIsNotNone(self.ticket.settled_at)
+
+    def test_half_outcomes(self):
+        first, second = self._leg('2.00'), self._leg('1.80')
+        self._settle(first, BetSelection.Outcome.HALF_WON)
+        self._settle(second, BetSelection.Outcome.WON)
+        self.assertEqual(self.ticket.effective_odds, Decimal('2.7000'))
+        self.assertEqual(self.ticket.result, Ticket.Result.WON)
+
+        # Corrections recompute from the legs.
+        self._settle(second, BetSelection.Outcome.HALF_LOST)
+        self.assertEqual((self.ticket.legs_won, self.ticket.legs_lost), (1, 1))
+        self.assertEqual(self.ticket.effective_odds, Decimal('0.7500'))
+        self.assertEqual(self.ticket.result, Ticket.Result.LOST)
+
+        self._settle(second, BetSelection.Outcome.PENDING)
+        self.assertEqual(self.ticket.result, Ticket.Result.PENDING)
+        self.assertIsNone(self.ticket.settled_at)
+
+    def test_leg_settled_meanwhile_is_not_counted_twice(self):
+        first, _ = self._leg('1.50'), self._leg('2.00')
+        stale = BetSelection.objects.get(pk=first.pk)
+        self._settle(first, BetSelection.Outcome.WON)
+
+        stale.outcome = BetSelection.Outcome.LOST
+        stale.save()
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.legs_pending, self.ticket.legs_won, self.ticket.legs_lost), (1, 0, 1))
+        self.assertEqual(self.ticket.result, Ticket.Result.LOST)
+
+    def test_match_settlement_updates_tickets(self):
+        from sports.services.result_service import ResultSyncService
+
+        self._leg('1.50', selection='Home Win')
+        self._leg('3.20', selection='Draw')
+        Match.objects.filter(pk=self.match.pk).update(home_score=2, away_score=0)
+        self.match.refresh_from_db()
+
+        ResultSyncService().settle_bets_for_match(self.match)
+
+        self.ticket.refresh_from_db()
+        self.assertEqual((self.ticket.legs_pending, self.ticket.legs_won, self.ticket.legs_lost), (0, 1, 1))
+        self.assertEqual(self.ticket.result, Ticket.Result.LOST)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        results = client.get('/api/tickets/list/?settled=1').json()['results']
+        self.assertEqual([r['id'] for r in results], [str(self.ticket.id)])
+        self.assertEqual(results[0]['result'], 'LOST')
+
+
+class TicketWaitTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='waiter', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.ticket = Ticket.objects.create(user=self.user, image='tickets/test.jpg')
+        self.url = f'/api/tickets/{self.ticket.pk}/wait/'
+
+    def test_returns_immediately_when_ocr_finished(self):
+        Ticket.objects.filter(pk=self.ticket.pk).update(status=Ticket.Status.REJECTED)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'FAILED_OCR')
+
+    def test_times_out_with_no_content(self):
+        started = time.monotonic()
+        response = self.client.get(self.url, {'timeout': 0.1})
+        self.assertEqual(response.status_code, 204)
+        self.assertLess(time.monotonic() - started, 2)
+
+    @override_settings(TICKET_WAIT_TIMEOUT=0.2)
+    def test_non_finite_timeout_falls_back_to_default(self):
+        for value in ('nan', 'inf', '-inf'):
+            started = time.monotonic()
+            self.assertEqual(self.client.get(self.url, {'timeout': value}).status_code, 204)
+            self.assertLess(time.monotonic() - started, 2)
+
+    @override_settings(TICKET_WAIT_MAX_WAITERS=1, TICKET_WAIT_RECHECK=0.05)
+    def test_waiters_are_capped(self):
+        release = threading.Event()
+        waiter = threading.Thread(target=events.wait, args=(self.ticket.pk, release.is_set, 5))
+        waiter.start()
+        deadline = time.monotonic() + 2
+        while events.waiting() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        response = self.client.get(self.url, {'timeout': 5})
+        release.set()
+        waiter.join()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], str(settings.TICKET_WAIT_RETRY_AFTER))
+        self.assertEqual(events.waiting(), 0)
+        self.assertEqual(self.client.get(self.url, {'timeout': 0}).status_code, 204)
+
+    def test_known_status(self):
+        self.assertEqual(self.client.get(self.url, {'status': 'PENDING_OCR', 'timeout': 0}).status_code, 204)
+        self.assertEqual(self.client.get(self.url, {'status': 'PROCESSING', 'timeout': 0}).status_code, 200)
+
+    def test_other_users_ticket(self):
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self.client.get(self.url, {'timeout': 0}).status_code, 404)
+
+    def test_publish_wakes_waiter(self):
+        done = threading.Event()
+
+        def finish():
+            time.sleep(0.1)
+            done.set()
+            events.publish(self.ticket.pk)
+
+        threading.Thread(target=finish).start()
+        started = time.monotonic()
+        self.assertTrue(events.wait(self.ticket.pk, done.is_set, timeout=10))
+        # Woken by the event, not by the periodic re-check.
+        self.assertLess(time.monotonic() - started, settings.TICKET_WAIT_RECHECK)
+        self.assertEqual(events.waiting(), 0)
+
+    @override_settings(TICKET_WAIT_RECHECK=0.05)
+    def test_recheck_without_event(self):
+        deadline = time.monotonic() + 0.2
+        self.assertTrue(events.wait(self.ticket.pk, lambda: time.monotonic() > deadline, timeout=5))
+
+    def test_status_payload_reuses_prefetch(self):
+        # Ticket and its (empty) prefetched selections; get_ocr_data no longer queries again.
+        with self.assertNumQueries(2):
+            TicketStatusSerializer(
+                Ticket.objects.prefetch_related('selections', 'selections__match').get(pk=self.ticket.pk)
+            ).data
+
+
+def _gemini_error(code):
+    return gemini_errors.APIError(code, {'error': {'code': code, 'message': 'test', 'status': 'TEST'}})
+
+
+@patch('tickets.gemini_governor.time.sleep')
+class GeminiGovernorTests(TestCase):
+    def _governor(self, **kwargs):
+        options = dict(max_concurrency=2, requests_per_minute=6000, max_retries=2, breaker_threshold=2, breaker_cooldown=60)
+        options.update(kwargs)
+        return GeminiGovernor(**options)
+
+    def test_retries_quota_errors(self, sleep):
+        governor = self._governor()
+        fn = Mock(side_effect=[_gemini_error(429), _gemini_error(503), 'ok'])
+        self.assertEqual(governor.call(fn), 'ok')
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(governor.status()['retries'], 2)
+        self.assertEqual(governor.status()['breaker'], 'closed')
+
+    def test_other_errors_are_not_retried(self, sleep):
+        governor = self._governor()
+        fn = Mock(side_effect=_gemini_error(400))
+        with self.assertRaises(gemini_errors.APIError):
+            governor.call(fn)
+        self.assertEqual(fn.call_count, 1)
+        self.assertEqual(governor.status()['consecutive_failures'], 0)
+
+    def test_breaker_trips_then_recovers(self, sleep):
+        governor = self._governor()
+        failing = Mock(side_effect=_gemini_error(429))
+        for _ in range(2):
+            with self.assertRaises(GeminiUnavailable):
+                governor.call(failing)
+        self.assertTrue(governor.status()['tripped'])
+
+        calls = failing.call_count
+        with self.assertRaises(GeminiUnavailable):
+            governor.call(failing)
+        self.assertEqual(failing.call_count, calls)  # rejected without calling Gemini
+
+        governor.opened_at -= 61
+        self.assertEqual(governor.call(Mock(return_value='ok')), 'ok')
+        self.assertEqual(governor.status()['breaker'], 'closed')
+
+    def test_concurrency_limit(self, sleep):
+        governor = self._governor(max_concurrency=2)
+        peak = []
+
+        def slow():
+            peak.append(governor.status()['in_flight'])
+            time.sleep(0.05)
+
+        threads = [threading.Thread(target=governor.call, args=(slow,)) for _ in range(6)]
+        with patch('tickets.gemini_governor.time.sleep', time.sleep):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(peak), 6)
+        self.assertLessEqual(max(peak), 2)
+
+    def test_unavailable_gemini_parks_ticket(self, sleep):
+        user = User.objects.create_user(username='parked', password='testpass123')
+        ticket = Ticket.objects.create(user=user, image='tickets/test.jpg')
+        with patch('tickets.logic.GeminiOCRService') as service:
+            service.return_value.extract_data.side_effect = GeminiUnavailable('quota')
+            process_ticket_image(ticket.id)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, Ticket.Status.PENDING_OCR)
+        self.assertIn('OCR postponed', ticket.ocr_error_log)
+
+    def test_retry_command_picks_old_pending_tickets(self, sleep):
+        user = User.objects.create_user(username='retry', password='testpass123')
+        old = Ticket.objects.create(user=user, image='tickets/old.jpg')
+        fresh = Ticket.objects.create(user=user, image='tickets/fresh.jpg')
+        Ticket.objects.filter(pk=old.pk).update(modified=old.modified - timedelta(minutes=10))
+        with patch('tickets.management.commands.retry_pending_ocr.process_ticket_image') as process:
+            call_command('retry_pending_ocr', stdout=io.StringIO())
+        process.assert_called_once_with(old.id)
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, Ticket.Status.PENDING_OCR)
+
+    def test_retry_command_reclaims_stale_processing_tickets(self, sleep):
+        user = User.objects.create_user(username='stale', password='testpass123')
+        stuck = Ticket.objects.create(user=user, image='tickets/stuck.jpg', status=Ticket.Status.PROCESSING)
+        running = Ticket.objects.create(user=user, image='tickets/running.jpg', status=Ticket.Status.PROCESSING)
+        Ticket.objects.filter(pk=stuck.pk).update(modified=stuck.modified - timedelta(hours=1))
+        with patch('tickets.management.commands.retry_pending_ocr.process_ticket_image') as process:
+            call_command('retry_pending_ocr', stdout=io.StringIO())
+        process.assert_called_once_with(stuck.id)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Ticket.Status.PROCESSING)
+
+
+@patch('tickets.logic.find_match', return_value=object())
+class TieredOCRTests(TestCase):
+    PREDICTIONS = [{'match_name': 'PSG vs OM', 'sport': 'FOOTBALL', 'prediction_type': 'MATCH_RESULT', 'prediction_value': 'Home Win'}]
+    VALID = {'bets': [{'match_name': 'PSG vs OM', 'selection': 'PSG', 'odds': 1.8, 'stake': 10}], 'predictions': PREDICTIONS}
+    NO_ODDS = {'bets': [{'match_name': 'PSG vs OM', 'selection': 'PSG', 'odds': None, 'stake': 10}], 'predictions': PREDICTIONS}
+    NO_PREDICTIONS = {'bets': VALID['bets']}
+
+    def setUp(self):
+        ocr_tiers.reset_metrics()
+        self.addCleanup(ocr_tiers.reset_metrics)
+        self.service = Mock()
+
+    def _models_called(self):
+        return [call.kwargs['model'] for call in self.service.extract_data.call_args_list]
+
+    def test_fast_tier_accepted(self, find_match):
+        self.service.extract_data.return_value = self.VALID
+        data, bets, matches, tier = extract_with_tiers(self.service, '/tmp/ticket.webp')
+        self.assertEqual(tier.name, 'fast')
+        self.assertEqual(self._models_called(), [settings.OCR_FAST_MODEL])
+        self.assertEqual(self.service.extract_data.call_args.kwargs['max_dimension'], settings.OCR_FAST_MAX_DIMENSION)
+        self.assertEqual(ocr_tiers.metrics()['fast']['accepted'], 1)
+
+    def test_escalates_on_missing_odds(self, find_match):
+        self.service.extract_data.side_effect = [self.NO_ODDS, self.VALID]
+        _, bets, _, tier = extract_with_tiers(self.service, '/tmp/ticket.webp')
+        self.assertEqual(tier.name, 'full')
+        self.assertEqual(bets[0]['odds'], 1.8)
+        self.assertIsNone(self.service.extract_data.call_args.kwargs['max_dimension'])
+        metrics = ocr_tiers.metrics()
+        self.assertEqual(metrics['fast']['escalation_rate'], 1.0)
+        self.assertEqual(metrics['full']['accepted'], 1)
+
+    def test_escalates_on_missing_predictions(self, find_match):
+        self.service.extract_data.side_effect = [self.NO_PREDICTIONS, self.VALID]
+        data, _, _, tier = extract_with_tiers(self.service, '/tmp/ticket.webp')
+        self.assertEqual(tier.name, 'full')
+        self.assertEqual(data['predictions'], self.PREDICTIONS)
+
+    def test_escalates_on_unlinked_match_and_keeps_last_result(self, find_match):
+        find_match.return_value = None
+        self.service.extract_data.return_value = self.VALID
+        _, _, matches, tier = extract_with_tiers(self.service, '/tmp/ticket.webp')
+        self.assertEqual(tier.name, 'full')
+        self.assertEqual(matches, [None])
+
+    def test_escalates_on_fast_tier_error(self, find_match):
+        self.service.extract_data.side_effect = [ValueError('invalid JSON'), self.VALID]
+        self.assertEqual(extract_with_tiers(self.service, '/tmp/ticket.webp')[3].name, 'full')
+        self.assertEqual(ocr_tiers.metrics()['fast']['error'], 1)
+
+    def test_quota_errors_are_not_escalated(self, find_match):
+        self.service.extract_data.side_effect = GeminiUnavailable('quota')
+        with self.assertRaises(GeminiUnavailable):
+            extract_with_tiers(self.service, '/tmp/ticket.webp')
+        self.assertEqual(self.service.extract_data.call_count, 1)
+
+    @override_settings(OCR_TIERED=False)
+    def test_untiered(self, find_match):
+        self.service.extract_data.return_value = self.VALID
+        self.assertEqual(extract_with_tiers(self.service, '/tmp/ticket.webp')[3].name, 'full')
+        self.assertEqual(self._models_called(), [settings.OCR_FULL_MODEL])
+
+    def test_ticket_records_tier(self, find_match):
+        find_match.return_value = None
+        user = User.objects.create_user(username='tiered', password='testpass123')
+        ticket = Ticket.objects.create(user=user, image='tickets/test.jpg')
+        with patch('tickets.logic.GeminiOCRService') as service:
+            service.return_value.extract_data.return_value = self.VALID
+            process_ticket_image(ticket.id)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.ocr_tier, 'full')
+        self.assertEqual(ticket.status, Ticket.Status.REVIEW_NEEDED)
+
+    def test_downscale_for_ocr(self, find_match):
+        processed = preprocess_ticket_image(_jpeg_bytes((3000, 2000)))
+        content, mime_type = downscale_for_ocr(processed.content, 768)
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual(max(image.size), 768)
+        self.assertEqual(mime_type, processed.mime_type)
+        # Already small enough: sent as is.
+        self.assertIs(downscale_for_ocr(content, 1024)[0], content)
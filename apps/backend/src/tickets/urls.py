@@ -3,17 +3,25 @@ URL Configuration for Tickets API.
 
 Endpoints:
 - POST   /api/tickets/upload/         - Upload and process ticket image (async)
+- POST   /api/tickets/batch/          - Upload several ticket images in one request (async)
+- GET    /api/tickets/batch/<uuid>/   - Poll a batch upload's OCR progress
 - GET    /api/tickets/<uuid>/status/  - Poll ticket OCR status
-- GET    /api/tickets/list/           - List user's tickets (paginated)
+- GET    /api/tickets/<uuid>/wait/    - Long-poll until OCR status changes
+- GET    /api/tickets/list/           - List user's tickets (paginated, ?settled=1 for settled ones)
 """
 from django.urls import path
-from .views import TicketUploadView, TicketStatusView, TicketListView
+from .views import (
+    TicketUploadView, TicketBatchUploadView, TicketBatchStatusView, TicketStatusView, TicketWaitView, TicketListView,
+)
 
 
 app_name = 'tickets'
 
 urlpatterns = [
     path('upload/', TicketUploadView.as_view(), name='ticket-upload'),
+    path('batch/', TicketBatchUploadView.as_view(), name='ticket-batch-upload'),
+    path('batch/<uuid:pk>/', TicketBatchStatusView.as_view(), name='ticket-batch-status'),
     path('<uuid:pk>/status/', TicketStatusView.as_view(), name='ticket-status'),
+    path('<uuid:pk>/wait/', TicketWaitView.as_view(), name='ticket-wait'),
     path('list/', TicketListView.as_view(), name='ticket-list'),
 ]
@@ -2,16 +2,25 @@
 Production-ready API Views for Ticket Upload & Listing.
 Includes asynchronous OCR processing with threading and status polling.
 """
+import math
 import threading
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch
+from django.http import Http404
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.pagination import PageNumberPagination
 import logging
 
-from .models import Ticket
-from .serializers import TicketUploadSerializer, TicketStatusSerializer, TicketListSerializer
-from .logic import process_ticket_image
+from core.conditional import conditional_response, latest
+from . import events
+from .models import Ticket, TicketBatch
+from .serializers import (
+    MOBILE_STATUS_MAPPING, TicketUploadSerializer, TicketStatusSerializer, TicketListSerializer,
+    TicketBatchUploadSerializer, TicketBatchStatusSerializer,
+)
+from .logic import process_ticket_batch, process_ticket_image
 
 
 logger = logging.getLogger(__name__)
@@ -88,6 +97,85 @@ class TicketUploadView(generics.CreateAPIView):
         )
 
 
+def batch_queryset(user):
+    """User's batches with the few ticket columns the batch status needs."""
+    return TicketBatch.objects.filter(user=user).prefetch_related(
+        Prefetch('tickets', queryset=Ticket.objects.only('id', 'status', 'created', 'batch_id'))
+    )
+
+
+class TicketBatchUploadView(generics.CreateAPIView):
+    """
+    API endpoint for uploading several ticket images at once (Async).
+
+    Workflow:
+    1. Validate and preprocess every image (multipart field `images`, repeated)
+    2. Create all tickets with one bulk_create, PENDING_OCR, in a TicketBatch
+    3. Launch one background OCR job for the batch (shared match lookups)
+    4. Return 202 Accepted with the batch status_url for polling
+
+    Response:
+    - 202 Accepted with TicketBatchStatusSerializer payload
+    - 400 if any image is invalid (nothing is created)
+    """
+    serializer_class = TicketBatchUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        batch = serializer.save(user=request.user)
+        batch = batch_queryset(request.user).get(pk=batch.pk)
+        ticket_ids = [ticket.id for ticket in batch.tickets.all()]
+        logger.info(f"Batch {batch.id} created for user {request.user.id} with {len(ticket_ids)} tickets")
+
+        thread = threading.Thread(
+            target=process_ticket_batch,
+            args=(ticket_ids,),
+            daemon=True
+        )
+        thread.start()
+
+        return Response(
+            TicketBatchStatusSerializer(batch, context=self.get_serializer_context()).data,
+            status=status.HTTP_202_ACCEPTED
+        )
+
+
+class TicketBatchStatusView(generics.RetrieveAPIView):
+    """
+    API endpoint for polling the progress of a batch upload.
+
+    Response:
+    - 200 OK with per-status counts, `done`, and each ticket's status_url
+    - 304 Not Modified while no ticket of the batch changed
+    - 404 if the batch doesn't exist or doesn't belong to user
+    """
+    serializer_class = TicketBatchStatusSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return batch_queryset(self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        marker = (
+            TicketBatch.objects.filter(user=request.user, pk=kwargs['pk'])
+            .annotate(ticket_count=Count('tickets'), tickets_modified=Max('tickets__modified'))
+            .values_list('modified', 'ticket_count', 'tickets_modified')
+            .first()
+        )
+        if marker is None:
+            raise Http404
+        return conditional_response(
+            request,
+            version=marker,
+            last_modified=latest(marker[0], marker[2]),
+            build=lambda: super(TicketBatchStatusView, self).retrieve(request, *args, **kwargs),
+        )
+
+
 class TicketStatusView(generics.RetrieveAPIView):
     """
     API endpoint for polling ticket OCR status.
@@ -120,6 +208,84 @@ class TicketStatusView(generics.RetrieveAPIView):
             'selections__match'
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        # Polled every few seconds during OCR: one aggregate query answers the
+        # unchanged polls with a 304, the prefetching retrieve only runs on change.
+        marker = (
+            Ticket.objects.filter(user=request.user, pk=kwargs['pk'])
+            .annotate(
+                selection_count=Count('selections'),
+                selections_modified=Max('selections__modified'),
+                matches_modified=Max('selections__match__modified'),
+            )
+            .values_list('modified', 'status', 'selection_count', 'selections_modified', 'matches_modified')
+            .first()
+        )
+        if marker is None:
+            raise Http404
+        return conditional_response(
+            request,
+            version=marker,
+            last_modified=latest(marker[0], marker[3], marker[4]),
+            build=lambda: super(TicketStatusView, self).retrieve(request, *args, **kwargs),
+        )
+
+
+class TicketWaitView(TicketStatusView):
+    """
+    Long-poll variant of TicketStatusView: blocks until the ticket's status
+    changes, then answers with the same payload.
+
+    Query params:
+    - status: last status seen by the client (mobile code, e.g. PROCESSING).
+      Without it, waits until OCR is finished (neither PENDING_OCR nor PROCESSING).
+    - timeout: seconds to wait, capped at TICKET_WAIT_TIMEOUT.
+
+    Response:
+    - 200 OK with the TicketStatusSerializer payload once the status changed
+    - 204 No Content on timeout (the client calls again)
+    - 429 with Retry-After when this worker already has
+      TICKET_WAIT_MAX_WAITERS long-polls open
+    - 404 if ticket doesn't exist or doesn't belong to user
+
+    Waiting costs one status query per wake-up (tickets/events.py), not a
+    full serialization per poll.
+    """
+    IN_PROGRESS = {Ticket.Status.PENDING_OCR, Ticket.Status.PROCESSING}
+
+    def retrieve(self, request, *args, **kwargs):
+        known = request.query_params.get('status')
+        try:
+            timeout = float(request.query_params.get('timeout', settings.TICKET_WAIT_TIMEOUT))
+        except ValueError:
+            timeout = settings.TICKET_WAIT_TIMEOUT
+        if not math.isfinite(timeout):
+            # nan would slip through the clamp and never time out.
+            timeout = settings.TICKET_WAIT_TIMEOUT
+        timeout = min(max(timeout, 0), settings.TICKET_WAIT_TIMEOUT)
+
+        statuses = Ticket.objects.filter(user=request.user, pk=kwargs['pk']).values_list('status', flat=True)
+        if not statuses.exists():
+            raise Http404
+
+        def changed():
+            current = statuses.first()
+            if known:
+                return MOBILE_STATUS_MAPPING.get(current, current) != known
+            return current not in self.IN_PROGRESS
+
+        try:
+            if not events.wait(kwargs['pk'], changed, timeout):
+                return Response(status=status.HTTP_204_NO_CONTENT)
+        except events.TooManyWaiters:
+            # Keep the worker's threads for the rest of the API; the client polls /status/ or retries.
+            return Response(
+                {'error': 'Too many pending waits, retry shortly'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(settings.TICKET_WAIT_RETRY_AFTER)},
+            )
+        return super().retrieve(request, *args, **kwargs)
+
 
 class TicketListView(generics.ListAPIView):
     """
@@ -129,7 +295,8 @@ class TicketListView(generics.ListAPIView):
     - User isolation (only shows authenticated user's tickets)
     - Pagination (10 items per page, configurable)
     - Sorted by creation date (newest first)
-    - Lightweight response (thumbnail + ROI, no full data)
+    - ?settled=1: settled tickets only, latest settlement first
+    - Lightweight response (thumbnail + ROI + settlement, no full data)
     
     Security:
     - Requires authentication
@@ -142,13 +309,16 @@ class TicketListView(generics.ListAPIView):
     def get_queryset(self):
         """
         Returns tickets for authenticated user only.
-        Ordered by creation date (newest first).
+        Ordered by creation date (newest first); ?settled=1 lists settled
+        tickets by settlement date instead.
         """
-        return Ticket.objects.filter(
+        queryset = Ticket.objects.filter(
             user=self.request.user
-        ).select_related(
-            # Optimize query - avoid N+1
-        ).prefetch_related(
-            'selections',  # For ROI calculation
-            'selections__match'
-        ).order_by('-created')
\ No newline at end of file
+        ).only(
+            # Single-table query: ROI, legs and settlement are Ticket columns
+            'id', 'status', 'created', 'image', 'image_variants', *Ticket.TOTALS_FIELDS,
+        )
+        if self.request.query_params.get('settled') in ('1', 'true'):
+            # Settled tickets, most recently settled first (user, -settled_at index).
+            return queryset.filter(settled_at__isnull=False).order_by('-settled_at')
+        return queryset.order_by('-created')
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_customuser_avatar_customuser_bio_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="stripe_customer_id",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                default="",
+                help_text="Stripe Customer ID (set on first checkout or from webhooks)",
+                max_length=128,
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# pg_trgm GIN indexes for GET /api/users/search/ (users.search).
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Django compiles icontains/istartswith to UPPER(col) LIKE UPPER(…), the
+# trigram operators (%, %>) and similarity() work on the raw column.
+INDEXES = {
+    'users_customuser_username_trgm': 'users_customuser USING gin (username gin_trgm_ops)',
+    'users_customuser_username_upper_trgm': 'users_customuser USING gin (UPPER(username) gin_trgm_ops)',
+    'users_customuser_bio_trgm': 'users_customuser USING gin (bio gin_trgm_ops)',
+    'users_tipsterprofile_bio_trgm': 'users_tipsterprofile USING gin (bio gin_trgm_ops)',
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ("users", "0005_customuser_avatar_variants"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
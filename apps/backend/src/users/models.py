@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from core.models import TimeStampedModel
+from core.image_variants import variant_url, variant_urls
 
 
 class CustomUser(AbstractUser, TimeStampedModel):
@@ -13,12 +14,24 @@ class CustomUser(AbstractUser, TimeStampedModel):
         null=True,
         help_text='User profile picture (max 5MB)'
     )
+    avatar_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Resized WebP variants of the avatar (core.image_variants)'
+    )
     bio = models.TextField(
         blank=True,
         default='',
         max_length=500,
         help_text='Short user biography (max 500 chars)'
     )
+    stripe_customer_id = models.CharField(
+        max_length=128,
+        blank=True,
+        default='',
+        db_index=True,
+        help_text='Stripe Customer ID (set on first checkout or from webhooks)'
+    )
 
     @property
     def is_tipster(self):
@@ -26,9 +39,20 @@ class CustomUser(AbstractUser, TimeStampedModel):
 
     @property
     def avatar_url(self):
-        """Return real avatar URL or fallback to UI-Avatars."""
+        """Return the medium avatar variant (or original) or fallback to UI-Avatars."""
+        return self.avatar_variant_url('medium')
+
+    @property
+    def avatar_urls(self):
+        """Small/medium/large/original avatar URLs, or None without an uploaded avatar."""
+        if self.avatar and hasattr(self.avatar, 'url'):
+            return variant_urls(self.avatar, self.avatar_variants)
+        return None
+
+    def avatar_variant_url(self, size):
+        """Avatar URL for a variant size ('small', 'medium', 'large', 'original')."""
         if self.avatar and hasattr(self.avatar, 'url'):
-            return self.avatar.url
+            return variant_url(self.avatar, self.avatar_variants, size)
         return f"https://ui-avatars.com/api/?name={self.username}&background=10b981&color=fff"
 
 
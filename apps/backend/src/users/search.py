@@ -0,0 +1,110 @@
+"""
+Tipster discovery search, behind GET /api/users/search/?q=….
+
+Candidates come from a few index-backed lookups (pg_trgm GIN indexes from
+users/0006 on Postgres), capped at CANDIDATE_LIMIT each, and only those rows
+are ranked: similarity to the query blended with the author's reputation.
+
+Queries shorter than a trigram cannot use those indexes, so they fall back to
+a username prefix match whose results are cached per prefix for
+USER_SEARCH_CACHE_TIMEOUT seconds: the first keystrokes in the search box are
+the most repeated ones across users. Results hold no per-viewer data.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, Greatest, Least
+
+from core import cache
+from users.models import TipsterProfile
+
+User = get_user_model()
+
+MAX_RESULTS = 20
+CANDIDATE_LIMIT = 200
+# Shorter queries have no full trigram: prefix match + cache instead.
+MIN_TRIGRAM_LENGTH = 3
+# Share of the score coming from reputation (0-100, normalised); the rest is similarity.
+REPUTATION_WEIGHT = 0.3
+# A bio match counts for less than the same match on the username.
+BIO_WEIGHT = 0.5
+
+
+def _use_trigram():
+    return connection.vendor == 'postgresql'
+
+
+def _candidate_ids(q):
+    """Ids of users matching `q`, each lookup kept separate so it can use its own index."""
+    if len(q) < MIN_TRIGRAM_LENGTH:
+        # Many users share a short prefix: keep the most reputed ones.
+        lookups = [
+            User.objects.filter(username__istartswith=q)
+            .order_by(F('global_stats__reputation_score').desc(nulls_last=True)).values_list('pk', flat=True)
+        ]
+    elif _use_trigram():
+        lookups = [
+            User.objects.filter(Q(username__icontains=q) | Q(username__trigram_similar=q)).order_by().values_list('pk', flat=True),
+            User.objects.filter(bio__trigram_word_similar=q).order_by().values_list('pk', flat=True),
+            TipsterProfile.objects.filter(bio__trigram_word_similar=q).order_by().values_list('user_id', flat=True),
+        ]
+    else:
+        lookups = [
+            User.objects.filter(Q(username__icontains=q) | Q(bio__icontains=q)).order_by().values_list('pk', flat=True),
+            TipsterProfile.objects.filter(bio__icontains=q).order_by().values_list('user_id', flat=True),
+        ]
+    ids = set()
+    for lookup in lookups:
+        ids.update(lookup[:CANDIDATE_LIMIT])
+    return ids
+
+
+def _similarity(q):
+    if _use_trigram():
+        return Greatest(
+            TrigramSimilarity('username', q),
+            TrigramSimilarity('bio', q) * BIO_WEIGHT,
+            Coalesce(TrigramSimilarity('tipster_profile__bio', q), Value(0.0)) * BIO_WEIGHT,
+        )
+    return Case(
+        When(username__iexact=q, then=Value(1.0)),
+        When(username__istartswith=q, then=Value(0.8)),
+        When(username__icontains=q, then=Value(0.6)),
+        default=Value(0.6 * BIO_WEIGHT),
+        output_field=FloatField(),
+    )
+
+
+def rank(q, ids):
+    """Users in `ids`, best match first."""
+    reputation = Least(Greatest(Coalesce('global_stats__reputation_score', Value(0)), Value(0)), Value(100))
+    return (
+        User.objects.filter(pk__in=ids)
+        .select_related('global_stats', 'tipster_profile')
+        .annotate(similarity=_similarity(q))
+        .annotate(search_score=(
+            F('similarity') * (1 - REPUTATION_WEIGHT)
+            + Cast(reputation, FloatField()) / 100.0 * REPUTATION_WEIGHT
+        ))
+        .order_by('-search_score', 'username')[:MAX_RESULTS]
+    )
+
+
+def search_users(q, serialize):
+    """
+    Serialized results for `q` (`serialize` takes the ranked queryset).
+    Prefix queries are cached; longer ones go straight to the indexes.
+    """
+    q = q.strip()
+    if not q:
+        return []
+
+    def compute():
+        ids = _candidate_ids(q)
+        return serialize(rank(q, ids)) if ids else []
+
+    if len(q) < MIN_TRIGRAM_LENGTH:
+        return cache.get_or_set('user_search', q.lower(), compute, settings.USER_SEARCH_CACHE_TIMEOUT)
+    return compute()
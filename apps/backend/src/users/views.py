@@ -1,8 +1,13 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import viewsets, filters
 from django.contrib.auth import get_user_model
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from api.serializers import UserProfileSerializer
+from api.serializers import PROFILE_RELATED, UserProfileSerializer, UserSearchSerializer
+from core import cache
+from core.conditional import conditional_response
+from users.search import search_users
 
 User = get_user_model()
 
@@ -11,7 +16,7 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     ViewSet pour la Discovery : Recherche et Leaderboard des Tipsters.
     ReadOnly car les utilisateurs ne peuvent modifier que leur propre profil (via /api/me/).
     """
-    queryset = User.objects.all()
+    queryset = User.objects.select_related(*PROFILE_RELATED)
     serializer_class = UserProfileSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['username']
@@ -28,26 +33,54 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         
         Endpoint: GET /api/users/leaderboard/
         """
-        # MVP-friendly cap: only users with bets can rank, and the candidate
-        # pool stays bounded until ROI is cached in DB.
-        users = (
-            User.objects.filter(bets__isnull=False)
-            .distinct()
-            .select_related('global_stats', 'tipster_profile')
-            .prefetch_related('followers')
-            .order_by('-global_stats__reputation_score', 'username')[:500]
+        # Same payload for every caller (no request in the serializer context),
+        # so one cached copy serves everyone for LEADERBOARD_CACHE_TIMEOUT seconds.
+        # Its generation time is the snapshot version: unchanged polls get a 304.
+        snapshot = cache.get_or_set('leaderboard', 'top50', _compute_leaderboard, settings.LEADERBOARD_CACHE_TIMEOUT)
+        return conditional_response(
+            request,
+            version=snapshot['generated_at'],
+            last_modified=snapshot['generated_at'],
+            build=lambda: Response(snapshot['results']),
         )
-        
-        # Sérialise pour calculer les stats (ROI, win_rate, etc.)
-        data = UserProfileSerializer(users, many=True).data
-        
-        # Tri en Python par ROI décroissant
-        # Note: users sans bets auront ROI=0 et seront en fin de liste
-        sorted_data = sorted(
-            data, 
-            key=lambda u: u['stats']['roi'] if u['stats'] else -999, 
-            reverse=True
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Recherche Discovery pour la barre de recherche mobile (appelée à chaque frappe).
+
+        Trigram sur username + bios (index GIN pg_trgm), classement
+        similarité + réputation, 20 résultats max, sans pagination.
+
+        Endpoint: GET /api/users/search/?q=<texte>
+        """
+        results = search_users(
+            request.query_params.get('q', ''),
+            lambda users: list(UserSearchSerializer(users, many=True).data),
         )
-        
-        # Retourne uniquement le Top 50
-        return Response(sorted_data[:50])
+        return Response(results)
+
+
+def _compute_leaderboard():
+    # MVP-friendly cap: only users with bets can rank, and the candidate
+    # pool stays bounded until ROI is cached in DB.
+    users = (
+        User.objects.filter(bets__isnull=False)
+        .distinct()
+        .select_related(*PROFILE_RELATED)
+        .order_by('-global_stats__reputation_score', 'username')[:500]
+    )
+
+    # Sérialise pour calculer les stats (ROI, win_rate, etc.)
+    data = UserProfileSerializer(users, many=True).data
+
+    # Tri en Python par ROI décroissant
+    # Note: users sans bets auront ROI=0 et seront en fin de liste
+    sorted_data = sorted(
+        data,
+        key=lambda u: u['stats']['roi'] if u['stats'] else -999,
+        reverse=True
+    )
+
+    # Retourne uniquement le Top 50
+    return {'generated_at': timezone.now(), 'results': sorted_data[:50]}